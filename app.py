@@ -1,75 +1,719 @@
-import random
-import string
+import atexit
+import hmac
+import os
+import re
+import threading
+import time
 import uuid
-from flask import Flask, render_template, request, session
-from flask_socketio import SocketIO, emit, join_room, leave_room
+from functools import wraps
+from bots import (
+    DEFAULT_BOT_POLICY, DEFAULT_THINK_TIME, BotTurns, TimerWheel,
+    choose_bot_action, create_bot_player, forget_bots, is_bot
+)
+from flask import Flask, Response, abort, copy_current_request_context, g, jsonify, render_template, request, session
+from flask_socketio import SocketIO, disconnect, emit, join_room, leave_room
+from itsdangerous import BadSignature, URLSafeSerializer
 
 # Importeer de kern spelregels en logica vanuit game_logic.py
-from game_logic import (
-    create_new_game,
-    make_play,
-    call_liar,
-    roll_mystic_dice,
-    believe_claim,
-    check_win_condition,
-    _get_player_by_id, # Deze is handig voor logging en namen
-    _get_next_active_player_id # Deze is nodig om beurtvolgorde te beheren bij disconnect
-)
+import game_logic
+from game_logic import replay_game, _get_player_by_id
+from game_log import GameLog, DEFAULT_LOG_CAPACITY
+from game_model import GameState, Player, card_codes, card_names
+from lobby_actor import LobbyActors
+from lobby_reaper import DEFAULT_IDLE_TTLS, DEFAULT_REAPER_INTERVAL, EVICT_IDLE, LobbyReaper
+from lobby_store import LobbyRecord, LobbyLockError, create_lobby_store
+from metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, DEFAULT_SIZE_BUCKETS, MetricsRegistry
+from odds import elimination_probability, estimate_lie_probability
+from odds_table import DEFAULT_TABLE_PATH, open_odds_table
+from rate_limit import DEFAULT_LOBBY_LIMITS, DEFAULT_SOCKET_LIMITS, RateLimiter
+from profiler import DEFAULT_SAMPLE_INTERVAL, LobbyTracer, SamplingProfiler
+from persistence import DEFAULT_FSYNC_INTERVAL, DEFAULT_SNAPSHOT_INTERVAL, LobbyJournal
+from replay_archive import ReplayArchive
+from server_log import DEFAULT_FLUSH_INTERVAL as DEFAULT_LOG_FLUSH_INTERVAL, DEFAULT_LOG_LEVEL, DEFAULT_SAMPLING, ServerLog
+from sharding import create_lobby_router
+from state_sync import LobbyStateStream
+from wire_codec import DEFAULT_WIRE_ENCODING, encoded_size, get_wire_codec, packet_json
 
 app = Flask(__name__)
 # De secret key is nodig voor sessies in Flask, inclusief voor SocketIO.
 # In een productomgeving zou dit een complexe, willekeurige string moeten zijn
 # en op een veilige manier geladen moeten worden (bijv. uit een omgevingsvariabele).
 app.config['SECRET_KEY'] = 'een_zeer_geheime_sleutel_voor_liars_bar'
-socketio = SocketIO(app, cors_allowed_origins="*")
+# Maximaal aantal logregels dat per lobby in het geheugen (en in de GameState) blijft.
+app.config['GAME_LOG_CAPACITY'] = DEFAULT_LOG_CAPACITY
+# Optionele map waarin logregels die uit de buffer vallen bewaard worden (None = niet bewaren).
+app.config['GAME_LOG_ARCHIVE_DIR'] = None
+# Codering van GameState payloads: 'json', 'orjson' of 'msgpack' (zie wire_codec.py).
+app.config['WIRE_ENCODING'] = DEFAULT_WIRE_ENCODING
+# Opslag van de lobbies (zie lobby_store.py). Standaard in het geheugen van dit proces;
+# met een gedeelde store (bijv. 'redis://localhost:6379/0') kunnen meerdere workers draaien.
+app.config['LOBBY_STORE_URL'] = os.environ.get('LOBBY_STORE_URL')
+# Message queue waarmee workers elkaars Socket.IO emits naar rooms doorgeven
+# (bijv. 'redis://localhost:6379/1'). Nodig zodra er meer dan één worker draait.
+app.config['SOCKETIO_MESSAGE_QUEUE'] = os.environ.get('SOCKETIO_MESSAGE_QUEUE')
+# Verdeling van lobbies over workers zonder gedeelde store (zie sharding.py):
+# komma-gescheiden adressen van alle workers, en het adres van deze worker.
+app.config['LOBBY_SHARDS'] = os.environ.get('LOBBY_SHARDS')
+app.config['LOBBY_SHARD'] = os.environ.get('LOBBY_SHARD')
+# Map waarin de lobbies van deze worker bewaard worden, zodat ze een herstart overleven
+# (zie persistence.py). None = niet bewaren.
+app.config['PERSISTENCE_DIR'] = None
+app.config['PERSISTENCE_FSYNC_INTERVAL'] = DEFAULT_FSYNC_INTERVAL # Seconden tussen twee fsyncs
+app.config['PERSISTENCE_SNAPSHOT_INTERVAL'] = DEFAULT_SNAPSHOT_INTERVAL # Seconden tussen twee snapshots
+# Map van het archief met afgelopen spellen, te bekijken via /replay (zie replay_archive.py).
+# None = spellen niet archiveren.
+app.config['REPLAY_ARCHIVE_DIR'] = None
+app.config['REPLAY_PAGE_SIZE'] = 50 # Maximaal aantal stappen per /replay request
+# Bots (zie bots.py): de policy van een bot als de client er geen kiest, en de gemiddelde
+# tijd in seconden voordat een bot zijn zet doet.
+app.config['BOT_DEFAULT_POLICY'] = DEFAULT_BOT_POLICY
+app.config['BOT_THINK_TIME'] = DEFAULT_THINK_TIME
+# Seconden dat de stoel van een speler na een verbroken verbinding vastgehouden wordt.
+# Binnen die tijd kan de client met zijn resume token terugkomen (zie 'resume_session');
+# daarna wordt hij uit de lobby verwijderd. 0 = direct verwijderen.
+app.config['RESUME_GRACE_PERIOD'] = 60
+# Exacte kansentabel voor de 'kansen' weergave en de odds bots, vooraf gegenereerd met
+# 'python odds_table.py'. Ontbreekt hij, dan worden de kansen geschat (zie odds.py).
+app.config['ODDS_TABLE_PATH'] = DEFAULT_TABLE_PATH
+# Opruimen van inactieve lobbies (zie lobby_reaper.py): seconden zonder events per fase
+# voordat een lobby verwijderd wordt, en seconden tussen twee rondes (0 = nooit opruimen).
+app.config['LOBBY_IDLE_TTLS'] = DEFAULT_IDLE_TTLS
+app.config['REAPER_INTERVAL'] = DEFAULT_REAPER_INTERVAL
+# Maximaal geschat aantal bytes voor alle lobbies van deze worker samen; daarboven worden
+# de minst recent actieve lobbies verwijderd. None = geen budget.
+app.config['LOBBY_MEMORY_BUDGET'] = None
+# Of opgeruimde lobbies eerst in het replay archief gezet worden (als dat ingesteld is).
+app.config['REAPER_ARCHIVE'] = True
+# Gestructureerde log van de server (zie server_log.py): laagste niveau, bestand (None = stdout),
+# seconden tussen twee batches en sampling van drukke events ({ "event": 1 op n }).
+app.config['LOG_LEVEL'] = DEFAULT_LOG_LEVEL
+app.config['LOG_PATH'] = None
+app.config['LOG_FLUSH_INTERVAL'] = DEFAULT_LOG_FLUSH_INTERVAL
+app.config['LOG_SAMPLING'] = DEFAULT_SAMPLING
+# Rate limits (zie rate_limit.py): per socket en per lobby { "event": [per seconde, burst] },
+# met "default" voor de overige events.
+app.config['RATE_LIMITS_ENABLED'] = True
+app.config['RATE_LIMITS_PER_SOCKET'] = DEFAULT_SOCKET_LIMITS
+app.config['RATE_LIMITS_PER_LOBBY'] = DEFAULT_LOBBY_LIMITS
+# Beheer endpoints onder /admin (profilen, zie profiler.py) vereisen dit token in de header
+# 'Authorization: Bearer <token>'. None = de endpoints staan uit.
+app.config['ADMIN_TOKEN'] = None
+# Map waarin profielen en traces geschreven worden, en seconden tussen twee samples.
+app.config['PROFILE_DIR'] = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'profiles')
+app.config['PROFILE_SAMPLE_INTERVAL'] = DEFAULT_SAMPLE_INTERVAL
+# Instellingen van de Socket.IO server (zie ook server.py, de entry point voor productie).
+# async_mode None kiest automatisch eventlet of gevent als die geïnstalleerd zijn, anders threading.
+app.config['SOCKETIO_ASYNC_MODE'] = None
+app.config['SOCKETIO_PING_INTERVAL'] = 25 # Seconden tussen pings naar een client
+app.config['SOCKETIO_PING_TIMEOUT'] = 20 # Seconden wachten op een pong voordat de client ontkoppeld wordt
+app.config['SOCKETIO_MAX_HTTP_BUFFER_SIZE'] = 100_000 # Maximale grootte van één bericht van een client (bytes)
+# Elke instelling hierboven kan overschreven worden met een omgevingsvariabele met het
+# voorvoegsel LIARSBAR_, bijv. LIARSBAR_SOCKETIO_PING_INTERVAL=60 of LIARSBAR_WIRE_ENCODING=msgpack.
+app.config.from_prefixed_env('LIARSBAR')
+# packet_json plakt al gecodeerde GameState payloads ongewijzigd in de Socket.IO packets
+socketio = SocketIO(app, cors_allowed_origins="*", json=packet_json,
+                    message_queue=app.config['SOCKETIO_MESSAGE_QUEUE'],
+                    async_mode=app.config['SOCKETIO_ASYNC_MODE'],
+                    ping_interval=app.config['SOCKETIO_PING_INTERVAL'],
+                    ping_timeout=app.config['SOCKETIO_PING_TIMEOUT'],
+                    max_http_buffer_size=app.config['SOCKETIO_MAX_HTTP_BUFFER_SIZE'])
+
+# Alle actieve lobbies, elk als LobbyRecord: de GameState plus de revisiestroom van de
+# GameState (deze blijft bestaan bij een herstart van het spel, zodat de revisie blijft oplopen).
+# De store bevat ook de reverse index van socket naar lobby: { "sid": "lobby_code" }.
+# Hiermee vinden we bij een disconnect direct de lobby, zonder alle lobbies te doorzoeken.
+# De speler zelf vinden we daarna via de speler index van de GameState.
+lobby_store = create_lobby_store(app.config['LOBBY_STORE_URL'])
+
+# Bepaalt welke worker eigenaar is van een lobbycode (één worker als LOBBY_SHARDS leeg is)
+lobby_router = create_lobby_router(app.config['LOBBY_SHARDS'], app.config['LOBBY_SHARD'])
+
+# JSON log van wat de server doet, weggeschreven door een achtergrond thread;
+# ook de andere modules (mailboxen, timers, persistentie) loggen hierheen
+server_log = ServerLog(app.config['LOG_PATH'], app.config['LOG_LEVEL'], app.config['LOG_FLUSH_INTERVAL'], app.config['LOG_SAMPLING'])
+
+# Profilen op verzoek (zie /admin/profile): het hele proces, of alle events van één lobby
+sampling_profiler = SamplingProfiler(app.config['PROFILE_SAMPLE_INTERVAL'])
+lobby_tracer = LobbyTracer()
+
+# Per lobby een mailbox, zodat events voor één lobby na elkaar verwerkt worden (zie lobby_actor.py).
+# Elke job gaat langs de tracer, die alleen iets doet als zijn lobby getraceerd wordt.
+lobby_actors = LobbyActors(lobby_tracer.run, server_log.log)
+
+# WAL en snapshots van de lobbies van deze worker, of None als persistentie uit staat
+lobby_journal = None
+
+# Archief van afgelopen spellen van deze worker, of None als archiveren uit staat
+replay_archive = None
+
+# Houdt bij wanneer elke lobby voor het laatst actief was en kiest welke lobbies opgeruimd worden
+lobby_reaper = LobbyReaper(app.config['LOBBY_IDLE_TTLS'], app.config['LOBBY_MEMORY_BUDGET'])
+
+# Token buckets per socket en per lobby; lege buckets worden bij elke ronde van de reaper opgeruimd
+socket_rate_limits = RateLimiter(app.config['RATE_LIMITS_PER_SOCKET'])
+lobby_rate_limits = RateLimiter(app.config['RATE_LIMITS_PER_LOBBY'])
+UNLIMITED_EVENTS = ('connect', 'disconnect') # Een disconnect moet altijd verwerkt worden
+
+# Events waarvan alle wijzigingen via apply_action lopen; daarvan worden alleen de acties vastgelegd
+GAME_ACTION_EVENTS = ('make_play', 'call_liar', 'believe_claim', 'roll_dice', 'bot_turn', 'seat_expired')
+
+MAX_LOBBY_PLAYERS = 4 # Mensen en bots samen
+
+# Wordt gezet als de server afsluit (zie server.py): er komen dan geen nieuwe lobbies of
+# spelers meer bij, lopende spellen mogen nog uitgespeeld worden.
+server_draining = threading.Event()
+
+
+# Beurten van bots en het vrijgeven van stoelen na een verbroken verbinding worden op één
+# timer wheel ingepland en via de mailbox van hun lobby uitgevoerd. De mailbox wordt in een
+# eigen achtergrond taak afgeleverd: wie aflevert verwerkt de mailbox zelf leeg, en dat mag
+# de timer wheel (en daarmee alle andere timers) niet ophouden.
+timer_wheel = TimerWheel(socketio.start_background_task, socketio.sleep, log=server_log.log)
+bot_turns = BotTurns(
+    timer_wheel,
+    lambda lobby_code: socketio.start_background_task(lobby_actors.submit, lobby_code, lambda: _run_bot_turn(lobby_code)),
+    app.config['BOT_THINK_TIME']
+)
 
-# Globale variabele om alle actieve lobbies en hun GameState op te slaan.
-# Elke entry in 'lobbies' is: { "lobby_code": GameState_object }
-lobbies = {}
+# Metrics voor /metrics (zie metrics.py). De metrics worden één keer aangemaakt; in de hot
+# path wordt alleen geteld en geobserveerd.
+metrics = MetricsRegistry()
+events_received = metrics.counter(
+    'liarsbar_socketio_events_total', "Ontvangen Socket.IO events.", ('event',))
+event_seconds = metrics.histogram(
+    'liarsbar_socketio_event_seconds', "Verwerkingstijd van een Socket.IO event (of een job van de server) in zijn lobby.", ('event',))
+broadcast_fanout = metrics.histogram(
+    'liarsbar_broadcast_recipients', "Aantal spelers dat een GameState broadcast ontvangt.", buckets=(0, 1, 2, 3, 4, 6, 8))
+broadcast_encode_seconds = metrics.histogram(
+    'liarsbar_broadcast_encode_seconds', "Tijd om de payloads van één GameState broadcast op te bouwen en te coderen.")
+payload_bytes = metrics.histogram(
+    'liarsbar_emit_payload_bytes', "Grootte van verstuurde GameState payloads.", ('event',), DEFAULT_SIZE_BUCKETS)
+game_logic_seconds = metrics.histogram(
+    'liarsbar_game_logic_seconds', "Duur van de spellogica (game_logic.py) per functie en actie.", ('function', 'action'))
+rate_limited_events = metrics.counter(
+    'liarsbar_rate_limited_events_total', "Events die over hun rate limit gingen en niet verwerkt zijn.", ('event', 'scope'))
+connected_sockets = metrics.gauge(
+    'liarsbar_connected_sockets', "Verbonden Socket.IO clients op deze worker.")
+metrics.gauge('liarsbar_lobbies', "Lobbies van deze worker per fase.", ('phase',),
+              lambda: {(phase,): count for phase, count in lobby_reaper.stats()['lobbiesByPhase'].items()})
+metrics.gauge('liarsbar_lobby_estimated_bytes', "Geschatte grootte van alle lobbies van deze worker (zie lobby_reaper.py).",
+              collect=lambda: {(): lobby_reaper.stats()['estimatedBytes']})
+metrics.gauge('liarsbar_lobbies_evicted', "Door de reaper opgeruimde lobbies per reden.", ('reason',),
+              lambda: {(reason,): count for reason, count in lobby_reaper.stats()['evictions'].items()})
+metrics.gauge('liarsbar_busy_lobbies', "Lobbies waarvoor op dit moment een event verwerkt wordt.",
+              collect=lambda: {(): lobby_actors.active_lobbies()})
+
+# Resume tokens zijn ondertekend met de secret key: de server hoeft ze niet te bewaren en
+# elke worker kan ze controleren. Een token bevat alleen de lobbycode en de speler id.
+resume_tokens = URLSafeSerializer(app.config['SECRET_KEY'], salt='liarsbar-resume')
 
 
 # --- Helper functies voor SocketIO en communicatie ---
 
 def generate_lobby_code():
-    """Genereert een unieke 4-letterige lobbycode."""
-    while True:
-        code = ''.join(random.choices(string.ascii_uppercase, k=4))
-        if code not in lobbies:
-            return code
+    """
+    Genereert een 4-letterige lobbycode die nog niet in gebruik is (zie ook add_lobby)
+    en die bij deze worker hoort.
+    """
+    return lobby_router.generate_code(lobby_store.exists)
+
+def create_lobby_log(lobby_code):
+    """Maakt de begrensde log voor een nieuwe lobby aan, met optioneel een archiefbestand."""
+    archive_dir = app.config['GAME_LOG_ARCHIVE_DIR']
+    archive_path = None
+    if archive_dir:
+        # De lobbycode kan later hergebruikt worden, dus maak de bestandsnaam uniek
+        archive_path = os.path.join(archive_dir, f"{lobby_code}-{uuid.uuid4().hex[:8]}.jsonl")
+    return GameLog(capacity=app.config['GAME_LOG_CAPACITY'], archive_path=archive_path)
+
+# --- Toegang tot lobbies tijdens een event ---
 
-def get_public_game_state(game_state, current_player_id=None):
+def lobby_event(get_lobby_code):
+    """
+    Decorator voor SocketIO handlers die een lobby gebruiken. Het event wordt afgeleverd bij
+    de mailbox van de lobby (bepaald door get_lobby_code, aangeroepen met dezelfde argumenten
+    als de handler), zodat events voor één lobby na elkaar verwerkt worden. Tijdens de handler
+    is de lobby ook in de store vergrendeld, voor als meerdere workers een store delen.
+    Lobbies die de handler geladen heeft, worden daarna opgeslagen.
+    """
+    def decorator(handler):
+        @wraps(handler)
+        def wrapper(*args):
+            event_name = request.event['message']
+            events_received.labels(event_name).inc()
+            lobby_code = get_lobby_code(*args)
+            if rate_limited(event_name, lobby_code):
+                return
+            if not lobby_code:
+                return _run_lobby_handler(handler, args)
+            # De job kan later in een andere thread draaien, dus neem de request context
+            # (request.sid, session) mee
+            job = copy_current_request_context(lambda: _run_locked_lobby_handler(lobby_code, handler, args))
+            lobby_actors.submit(lobby_code, job)
+        return wrapper
+    return decorator
+
+def _run_locked_lobby_handler(lobby_code, handler, args):
+    try:
+        with lobby_store.lock(lobby_code):
+            _run_lobby_handler(handler, args)
+    except LobbyLockError:
+        emit('error_message', {'message': 'De lobby is bezet, probeer het opnieuw.'})
+
+def _run_lobby_handler(handler, args, event_name=None):
+    started = time.perf_counter()
+    g.lobby_records = {} # { "lobby_code": LobbyRecord of None } geladen tijdens dit event
+    result = handler(*args)
+    event_name = event_name or request.event['message']
+    for lobby_code, record in g.lobby_records.items():
+        if record is not None:
+            lobby_store.save(lobby_code, record)
+            if lobby_journal and event_name in GAME_ACTION_EVENTS:
+                lobby_journal.record_game_actions(lobby_code, record.game_state) # Alleen de nieuwe acties
+            elif lobby_journal:
+                lobby_journal.record(lobby_code, record.game_state)
+            bot_turns.schedule(lobby_code, record.game_state) # Als er nu een bot aan de beurt is
+            lobby_reaper.touch(lobby_code, record.game_state.phase)
+    event_seconds.labels(event_name).observe(time.perf_counter() - started)
+    return result
+
+def rate_limited(event_name, lobby_code=None):
+    """
+    True als een event van deze socket (of voor deze lobby) over zijn rate limit gaat en
+    niet verwerkt moet worden. De client krijgt één melding per reeks afgewezen events.
+    """
+    if not app.config['RATE_LIMITS_ENABLED'] or event_name in UNLIMITED_EVENTS:
+        return False
+    scope = 'socket'
+    rejected = socket_rate_limits.hit(request.sid, event_name)
+    if not rejected and lobby_code:
+        scope = 'lobby'
+        rejected = lobby_rate_limits.hit(lobby_code, event_name)
+    if not rejected:
+        return False
+    rate_limited_events.labels(event_name, scope).inc()
+    if rejected == 1:
+        emit('error_message', {'message': 'Je stuurt te veel berichten, wacht even.'})
+        server_log.warning('rate_limited', lobby_code, sid=request.sid, limited_event=event_name, scope=scope)
+    return True
+
+def timed_event(handler):
+    """Decorator voor SocketIO handlers zonder lobby: telt het event en meet de verwerkingstijd (zoals lobby_event)."""
+    @wraps(handler)
+    def wrapper(*args):
+        event_name = request.event['message']
+        events_received.labels(event_name).inc()
+        if rate_limited(event_name):
+            return
+        started = time.perf_counter()
+        try:
+            return handler(*args)
+        finally:
+            event_seconds.labels(event_name).observe(time.perf_counter() - started)
+    return wrapper
+
+def apply_action(game_state, action, player_id, cards=None):
+    """game_logic.apply_action, met de duur per actie in de metrics (alleen voor live spellen, niet voor replays en herstel)."""
+    started = time.perf_counter()
+    try:
+        return game_logic.apply_action(game_state, action, player_id, cards)
+    finally:
+        game_logic_seconds.labels('apply_action', action).observe(time.perf_counter() - started)
+
+def create_new_game(lobby_code, player_data_list, log=None):
+    """game_logic.create_new_game, met de duur in de metrics."""
+    started = time.perf_counter()
+    try:
+        return game_logic.create_new_game(lobby_code, player_data_list, log=log)
+    finally:
+        game_logic_seconds.labels('create_new_game', '').observe(time.perf_counter() - started)
+
+def emit_game_state(event_name, payload, room):
+    """Verstuurt een GameState payload naar een room en telt zijn grootte mee in de metrics."""
+    payload_bytes.labels(event_name).observe(encoded_size(payload))
+    socketio.emit(event_name, payload, room=room)
+
+def _run_bot_turn(lobby_code):
+    """Job in de mailbox van een lobby (zonder request): de bot die aan de beurt is speelt."""
+    with app.app_context():
+        try:
+            with lobby_store.lock(lobby_code):
+                _run_lobby_handler(play_bot_turn, (lobby_code,), 'bot_turn')
+        except LobbyLockError:
+            pass # Een andere worker verwerkt een event van deze lobby en plant daarna zelf de bot in
+
+def _run_seat_expiry(lobby_code, player_id):
+    """Job in de mailbox van een lobby (zonder request): geeft een stoel vrij als de speler niet terugkwam."""
+    with app.app_context():
+        try:
+            with lobby_store.lock(lobby_code):
+                _run_lobby_handler(expire_seat, (lobby_code, player_id), 'seat_expired')
+        except LobbyLockError:
+            hold_seat(lobby_code, player_id, timer_wheel.tick) # Probeer het zo opnieuw
+
+def _run_eviction(lobby_code, reason, last_active):
+    """Job in de mailbox van een lobby (zonder request): ruimt de lobby op als hij sindsdien niet actief was."""
+    with app.app_context():
+        try:
+            with lobby_store.lock(lobby_code):
+                if lobby_reaper.last_active(lobby_code) != last_active:
+                    return # Intussen een event gehad (of al verwijderd)
+                _run_lobby_handler(evict_lobby, (lobby_code, reason), 'lobby_evicted')
+        except LobbyLockError:
+            pass # Een andere worker verwerkt een event, dus de lobby is niet inactief
+
+def _run_measurement(lobby_code):
+    """Job in de mailbox van een lobby: meet de geschatte grootte van de lobby voor het geheugenbudget."""
+    try:
+        with lobby_store.lock(lobby_code):
+            lobby_reaper.set_size(lobby_code, lobby_store.size_of(lobby_code))
+    except LobbyLockError:
+        pass # De volgende ronde opnieuw
+
+def _get_lobby_record(lobby_code):
+    """Laadt het LobbyRecord van een lobby (één keer per event), of None."""
+    records = g.setdefault('lobby_records', {})
+    if lobby_code not in records:
+        records[lobby_code] = lobby_store.load(lobby_code) if lobby_code else None
+    return records[lobby_code]
+
+def get_game_state(lobby_code):
+    """Retourneert de GameState van een lobby, of None als de lobby niet bestaat."""
+    record = _get_lobby_record(lobby_code)
+    return record.game_state if record else None
+
+def set_game_state(lobby_code, game_state):
+    """Vervangt de GameState van een bestaande lobby (bij het starten of herstarten van het spel)."""
+    _get_lobby_record(lobby_code).game_state = game_state
+
+def add_lobby(lobby_code, game_state):
+    """
+    Voegt een nieuwe lobby toe aan de store.
+    Returns:
+        bool: False als de lobbycode intussen door een andere worker in gebruik is genomen.
+    """
+    record = LobbyRecord(game_state, LobbyStateStream(get_wire_codec(app.config['WIRE_ENCODING'], server_log.log)))
+    if not lobby_store.add(lobby_code, record):
+        return False
+    g.setdefault('lobby_records', {})[lobby_code] = record
+    return True
+
+def remove_lobby(lobby_code):
+    """Verwijdert een lobby uit de store."""
+    lobby_store.delete(lobby_code)
+    lobby_reaper.forget(lobby_code)
+    server_log.forget_lobby(lobby_code)
+    g.setdefault('lobby_records', {})[lobby_code] = None
+    if lobby_journal:
+        lobby_journal.record_removed(lobby_code)
+
+def _owned_lobby_code(lobby_code):
+    """Retourneert de lobbycode als deze worker de eigenaar is, anders None (niets te vergrendelen)."""
+    return lobby_code if lobby_router.owner_of(lobby_code) is None else None
+
+def _worker_directory(directory):
+    """Retourneert de eigen submap van deze worker in 'directory' (elke worker heeft zijn eigen lobbies)."""
+    if directory and app.config['LOBBY_SHARD']:
+        return os.path.join(directory, re.sub(r'\W+', '_', app.config['LOBBY_SHARD']))
+    return directory
+
+def open_replay_archive():
+    """Opent het archief van afgelopen spellen als REPLAY_ARCHIVE_DIR ingesteld is."""
+    global replay_archive
+    directory = _worker_directory(app.config['REPLAY_ARCHIVE_DIR'])
+    if directory:
+        replay_archive = ReplayArchive(directory)
+
+def archive_game(game_state):
+    """
+    Zet het GameRecord van een afgelopen (of afgebroken) spel in het replay archief.
+    Returns:
+        int: Het nummer van de replay, of None als er niets gearchiveerd is.
+    """
+    if replay_archive is None or not game_state.record:
+        return None
+    if all(action == 'leave' for action, _, _ in game_state.record.actions):
+        return None # Geen enkele zet gedaan, niets om terug te kijken
+    try:
+        return replay_archive.append(game_state.record) # Een spel dat al gearchiveerd is, wordt niet herhaald
+    except ValueError as error:
+        server_log.warning('replay_not_archived', game_state.lobby_code, error=str(error))
+        return None
+
+def restore_lobbies():
+    """
+    Start de persistentie als PERSISTENCE_DIR ingesteld is, en zet de bewaarde lobbies van
+    een vorige run terug in de store.
+    """
+    global lobby_journal
+    directory = _worker_directory(app.config['PERSISTENCE_DIR'])
+    if not directory:
+        return
+    journal = LobbyJournal(directory, app.config['PERSISTENCE_FSYNC_INTERVAL'], app.config['PERSISTENCE_SNAPSHOT_INTERVAL'],
+                           server_log.log)
+    restored = journal.recover(game_logic.apply_action) # Herstel telt niet mee in de metrics van live spellen
+    restored_at = time.time()
+    for lobby_code, game_state in restored.items():
+        lobby_store.add(lobby_code, LobbyRecord(game_state, LobbyStateStream(get_wire_codec(app.config['WIRE_ENCODING'], server_log.log))))
+        # De sockets van de vorige run bestaan niet meer: de spelers kunnen binnen de
+        # grace period terugkomen met hun resume token
+        for player in game_state.players:
+            if is_bot(player.id):
+                player.connection, player.disconnected_at = player.id, None
+            else:
+                player.connection, player.disconnected_at = None, restored_at
+                lobby_store.set_lobby_of(player.id, lobby_code)
+                hold_seat(lobby_code, player.id)
+        bot_turns.schedule(lobby_code, game_state)
+        lobby_reaper.touch(lobby_code, game_state.phase) # De TTL begint opnieuw bij de herstart
+    journal.start()
+    lobby_journal = journal
+    server_log.info('lobbies_restored', count=len(restored), directory=directory)
+
+def close_lobbies():
+    """Sluit de logs van alle lobbies in deze worker af (bij het afsluiten van de server)."""
+    if lobby_journal:
+        lobby_journal.close()
+    server_log.close()
+    if replay_archive is not None:
+        replay_archive.close()
+    if lobby_store.shared:
+        return # De lobbies blijven in de gedeelde store bestaan
+    for lobby_code in lobby_store.lobby_codes():
+        record = lobby_store.load(lobby_code)
+        if record:
+            record.game_state.log.close()
+
+def _get_state_stream(lobby_code):
+    """Haalt de revisiestroom van een lobby op."""
+    return _get_lobby_record(lobby_code).stream
+
+def current_player_id():
     """
-    Filtert de GameState om alleen publiek zichtbare informatie te retourneren.
-    De handkaarten van de huidige speler worden wel meegegeven, maar niet die van anderen.
+    De speler id van de client van dit event: de sid van de socket waarmee hij de lobby
+    binnenkwam. Na een resume (met een nieuwe socket) blijft dat dezelfde stoel.
     """
-    public_state = game_state.copy()
-    public_players = []
+    return session.get('player_id', request.sid)
+
+def issue_resume_token(lobby_code, player_id):
+    """Retourneert het token waarmee een client na een verbroken verbinding zijn stoel terugkrijgt."""
+    return resume_tokens.dumps([lobby_code, player_id])
+
+def _resume_seat(data):
+    """Retourneert (lobbycode, speler id) uit het resume token van een client, of (None, None)."""
+    try:
+        lobby_code, player_id = resume_tokens.loads(data.get('resumeToken') or '')
+    except (BadSignature, TypeError, ValueError):
+        return None, None
+    return lobby_code, player_id
+
+def hold_seat(lobby_code, player_id, delay=None):
+    """Plant het vrijgeven van de stoel van een speler zonder verbinding in (na de grace period)."""
+    if delay is None:
+        delay = app.config['RESUME_GRACE_PERIOD']
+    timer_wheel.schedule(delay, lambda: socketio.start_background_task(
+        lobby_actors.submit, lobby_code, lambda: _run_seat_expiry(lobby_code, player_id)))
+
+def expire_seat(lobby_code, player_id):
+    """Verwijdert een speler wiens verbinding langer dan de grace period verbroken is."""
+    game_state = get_game_state(lobby_code)
+    player = _get_player_by_id(game_state, player_id)
+    if not player or player.connected:
+        return # Intussen teruggekomen (of al weg)
+    remaining = player.disconnected_at + app.config['RESUME_GRACE_PERIOD'] - time.time()
+    if remaining > timer_wheel.tick:
+        hold_seat(lobby_code, player_id, remaining) # Na een eerdere resume opnieuw verbroken
+        return
+    remove_player(lobby_code, game_state, player_id)
+
+def remove_player(lobby_code, game_state, player_id):
+    """Verwijdert een speler uit zijn lobby; een lobby zonder mensen wordt opgeruimd."""
+    lobby_store.pop_lobby_of(player_id)
+    player_name = _get_player_by_id(game_state, player_id).name
+
+    # game_logic controleert ook de winconditie
+    was_game_over = game_state.phase == 'gameOver'
+    success, _ = apply_action(game_state, 'leave', player_id)
+    if not success:
+        return
+    _get_state_stream(lobby_code).drop_viewer(player_id)
+    server_log.info('player_removed', lobby_code, player=player_name)
+
+    # Als er geen mensen meer in de lobby zitten, verwijder deze volledig (bots spelen niet alleen verder)
+    if lobby_host(game_state) is None:
+        archive_game(game_state) # Ook een spel dat niet uitgespeeld is
+        forget_bots(p.id for p in game_state.players)
+        server_log.info('lobby_removed', lobby_code, reason='empty')
+        remove_lobby(lobby_code)
+        game_state.log.close() # Schrijf de resterende log naar het archief (indien ingesteld)
+        return
 
-    for player in public_state['players']:
-        player_copy = player.copy()
-        if player_copy['id'] != current_player_id:
-            # Verberg de hand van andere spelers
-            player_copy['hand'] = []
-        public_players.append(player_copy)
+    if game_state.phase == 'gameOver' and not was_game_over:
+        end_game(lobby_code, game_state)
 
-    public_state['players'] = public_players
-    return public_state
+    # Stuur update naar de overgebleven spelers
+    broadcast_game_state(lobby_code)
+    socketio.emit('lobby_update', {'players': [p.name for p in game_state.players]}, room=lobby_code)
 
-def broadcast_game_state(lobby_code):
-    """Verstuurt de bijgewerkte publieke GameState naar alle spelers in een lobby, levend of niet."""
-    game_state = lobbies.get(lobby_code)
+def evict_lobby(lobby_code, reason):
+    """
+    Verwijdert een lobby die de reaper gekozen heeft (zie lobby_reaper.py), met alle spelers
+    erin. De spelers krijgen 'lobby_closed' en kunnen daarna een nieuwe lobby kiezen.
+    """
+    game_state = get_game_state(lobby_code)
+    if not game_state:
+        lobby_reaper.forget(lobby_code)
+        return
+    if app.config['REAPER_ARCHIVE']:
+        archive_game(game_state)
+    message = ('De lobby is gesloten omdat er te lang niets gebeurde.' if reason == EVICT_IDLE
+               else 'De lobby is gesloten omdat de server vol is.')
+    socketio.emit('lobby_closed', {'lobbyCode': lobby_code, 'reason': reason, 'message': message}, room=lobby_code)
+    for player in game_state.players:
+        if not is_bot(player.id):
+            lobby_store.pop_lobby_of(player.id)
+    socketio.server.close_room(lobby_code, namespace='/') # Een nieuwe lobby met dezelfde code begint leeg
+    forget_bots(p.id for p in game_state.players)
+    server_log.info('lobby_removed', lobby_code, reason=reason)
+    remove_lobby(lobby_code)
+    game_state.log.close()
+    lobby_reaper.record_eviction(lobby_code, reason)
+
+def sweep_lobbies():
+    """
+    Eén ronde van de reaper: meet de lobbies die sinds de vorige ronde veranderd zijn en ruimt
+    inactieve lobbies (en bij een vol geheugenbudget de minst recent actieve) op. Ruimt ook
+    volle rate limit buckets op. Plant daarna de volgende ronde in.
+    """
+    try:
+        socket_rate_limits.prune()
+        lobby_rate_limits.prune()
+        for lobby_code in lobby_reaper.unmeasured():
+            lobby_actors.submit(lobby_code, lambda lobby_code=lobby_code: _run_measurement(lobby_code))
+        for lobby_code, reason, last_active in lobby_reaper.candidates():
+            lobby_actors.submit(lobby_code, lambda lobby_code=lobby_code, reason=reason, last_active=last_active:
+                                _run_eviction(lobby_code, reason, last_active))
+    finally:
+        schedule_lobby_sweep()
+
+def schedule_lobby_sweep():
+    """Plant de volgende ronde van de reaper in op de timer wheel (niet als REAPER_INTERVAL 0 is)."""
+    interval = app.config['REAPER_INTERVAL']
+    if interval and interval > 0:
+        # De ronde draait in een eigen taak, zodat de timers van de bots niet hoeven te wachten
+        timer_wheel.schedule(interval, lambda: socketio.start_background_task(sweep_lobbies))
+
+def seated_game_state(lobby_code, player_id):
+    """
+    Retourneert de GameState van een lobby als 'player_id' er een stoel in heeft. Anders krijgt
+    de client een foutmelding en is het resultaat None: wie niet in de lobby zit, kan geen
+    acties doen die het spel (en het GameRecord) van de lobby raken.
+    """
+    game_state = get_game_state(lobby_code)
+    if not game_state:
+        emit('error_message', {'message': 'Lobby of spel niet gevonden.'})
+        return None
+    if _get_player_by_id(game_state, player_id) is None:
+        emit('error_message', {'message': 'Je zit niet in deze lobby.'})
+        return None
+    return game_state
+
+def carry_over_connections(previous_state, new_state):
+    """Neemt bij het (her)starten van een spel over welke spelers verbonden zijn, en via welke socket."""
+    for player in new_state.players:
+        previous = _get_player_by_id(previous_state, player.id)
+        if previous is not None:
+            player.connection = previous.connection
+            player.disconnected_at = previous.disconnected_at
+
+def lobby_host(game_state):
+    """Retourneert de id van de maker van de lobby: de eerste speler die geen bot is."""
+    return next((p.id for p in game_state.players if not is_bot(p.id)), None)
+
+def play_bot_turn(lobby_code):
+    """Laat de bot die in een lobby aan de beurt is zijn actie doen (zie bots.py)."""
+    game_state = get_game_state(lobby_code)
+    if not game_state:
+        return
+    chosen = choose_bot_action(game_state) # Kan intussen een mens aan de beurt zijn
+    if chosen is None:
+        return
+    action, bot_id, cards = chosen
+    success, message = apply_action(game_state, action, bot_id, cards)
+    if not success:
+        server_log.warning('bot_action_rejected', lobby_code, bot=bot_id, action=action, message=message)
+        return
+    if game_state.phase == 'gameOver':
+        end_game(lobby_code, game_state)
+    broadcast_game_state(lobby_code)
+
+def end_game(lobby_code, game_state):
+    """
+    Archiveert het afgelopen spel en meldt alle spelers in de lobby dat het voorbij is,
+    met de winnaar (of 'geen') en het nummer van de replay (of None).
+    """
+    alive_players = [p for p in game_state.players if p.alive]
+    winner_name = alive_players[0].name if len(alive_players) == 1 else 'geen'
+    replay_id = archive_game(game_state)
+    socketio.emit('game_over', {'winner': winner_name, 'replayId': replay_id}, room=lobby_code)
+
+def broadcast_game_state(lobby_code, new_revision=True):
+    """
+    Verstuurt de bijgewerkte publieke GameState naar alle spelers in een lobby, levend of niet.
+    Elke broadcast is een nieuwe revisie. Spelers die de vorige revisie al hebben
+    krijgen alleen een patch ('game_state_patch'), anderen een volledige snapshot.
+    Het publieke deel van de staat wordt één keer opgebouwd en gecodeerd; per speler
+    komt alleen zijn eigen hand erbij.
+    Args:
+        new_revision (bool): False om de huidige revisie te versturen aan wie hem nog niet heeft
+                             (de wijziging is dan al als revisie opgebouwd, bijv. bij een resume).
+    """
+    game_state = get_game_state(lobby_code)
     if game_state:
+        stream = _get_state_stream(lobby_code)
+        if new_revision:
+            stream.mark_dirty()
+        recipients = 0
+        encode_time = 0.0
         # Loop door ALLE spelers in de lobby (verwijderde de 'if player['alive']' check)
-        for player in game_state['players']:
-            player_id = player['id']
-            # Gebruik de helper functie om de publieke staat te krijgen,
-            # maar met de hand van de specifieke speler zichtbaar.
-            public_state = get_public_game_state(game_state, player_id)
-            socketio.emit('game_state_update', public_state, room=player_id) # Emit naar de individuele speler_id (wat hun sid is)
+        for player in game_state.players:
+            player_id = player.id
+            if is_bot(player_id) or not player.connected:
+                continue # Bots hebben geen socket; wie terugkomt krijgt bij de resume alles in één keer
+            started = time.perf_counter()
+            event_name, payload = stream.message_for(player_id, game_state)
+            encode_time += time.perf_counter() - started
+            if event_name:
+                # Emit naar de room van de speler id: de sid waarmee hij binnenkwam, en na een resume ook zijn nieuwe socket
+                emit_game_state(event_name, payload, player_id)
+                recipients += 1
+        broadcast_fanout.observe(recipients)
+        broadcast_encode_seconds.observe(encode_time)
     else:
-        print(f"Waarschuwing: Geen GameState gevonden voor lobby {lobby_code} bij broadcast.")
+        server_log.warning('broadcast_without_lobby', lobby_code)
+
+def send_game_state_snapshot(lobby_code, player_id, acknowledged_log_seq=None):
+    """
+    Verstuurt een volledige snapshot van de huidige revisie naar één speler (bijv. na een resync).
+    Als de client aangeeft tot welk log volgnummer hij al regels heeft, worden alleen nieuwere regels meegestuurd.
+    """
+    game_state = get_game_state(lobby_code)
+    if not game_state:
+        return
+    stream = _get_state_stream(lobby_code)
+    snapshot = stream.snapshot_for(player_id, game_state, acknowledged_log_seq)
+    emit_game_state('game_state_update', snapshot, player_id)
 
 
+# Zet de lobbies van een vorige run terug (als persistentie aan staat)
+server_log.start()
+atexit.register(server_log.close) # Schrijf wachtende records weg bij het afsluiten
+restore_lobbies()
+open_replay_archive()
+schedule_lobby_sweep()
+if open_odds_table(app.config['ODDS_TABLE_PATH'], server_log.log) is None:
+    server_log.info('odds_table_missing', path=app.config['ODDS_TABLE_PATH'])
+
 # --- Flask Routes ---
 
 @app.route('/')
@@ -77,234 +721,478 @@ def index():
     """Rendert de hoofd HTML pagina."""
     return render_template('index.html')
 
+@app.route('/metrics')
+def get_metrics():
+    """Retourneert de metrics van deze worker in het Prometheus tekstformaat."""
+    return Response(metrics.render(), content_type=METRICS_CONTENT_TYPE)
+
+def _require_admin():
+    """Breekt het request af als het geen geldig ADMIN_TOKEN heeft (404 als er geen token ingesteld is)."""
+    token = app.config['ADMIN_TOKEN']
+    if not token:
+        abort(404)
+    supplied = request.headers.get('Authorization', '').removeprefix('Bearer ')
+    if not hmac.compare_digest(supplied.encode(), str(token).encode()):
+        abort(403)
+
+def _profile_path(kind, lobby_code=None):
+    name = f"{kind}-{lobby_code}-" if lobby_code else f"{kind}-"
+    return os.path.join(app.config['PROFILE_DIR'], f"{name}{time.strftime('%Y%m%d-%H%M%S')}.folded")
+
+def _profile_seconds():
+    return max(request.args.get('seconds', 10, type=float), 0.1)
+
+@app.route('/admin/profile', methods=['POST'])
+def start_profile():
+    """
+    Start een sampling profiel van deze worker (query parameter 'seconds', standaard 10).
+    Het collapsed stack bestand staat na afloop op het geretourneerde pad.
+    """
+    _require_admin()
+    seconds = _profile_seconds()
+    path = _profile_path('sample')
+    started = sampling_profiler.start(
+        seconds, path, socketio.start_background_task, socketio.sleep,
+        lambda path, samples: server_log.info('profile_written', path=path, samples=samples)
+    )
+    if not started:
+        return jsonify({'error': 'Er loopt al een profiel.'}), 409
+    server_log.info('profile_started', seconds=seconds, path=path)
+    return jsonify({'path': path, 'seconds': seconds}), 202
+
+@app.route('/admin/trace/<lobby_code>', methods=['POST'])
+def start_lobby_trace(lobby_code):
+    """
+    Traceert alle events van één lobby (query parameter 'seconds', standaard 10), inclusief
+    de beurten van bots en alles wat de handlers aanroepen (spellogica, broadcast, codering).
+    """
+    _require_admin()
+    lobby_code = lobby_code.upper()
+    if not lobby_store.exists(lobby_code):
+        abort(404)
+    seconds = _profile_seconds()
+    path = _profile_path('trace', lobby_code)
+    if not lobby_tracer.start(lobby_code, seconds, path):
+        return jsonify({'error': f'Lobby {lobby_code} wordt al getraceerd.'}), 409
+    timer_wheel.schedule(seconds, lambda: socketio.start_background_task(finish_lobby_trace, lobby_code))
+    server_log.info('trace_started', lobby_code, seconds=seconds, path=path)
+    return jsonify({'path': path, 'seconds': seconds}), 202
+
+def finish_lobby_trace(lobby_code):
+    """Schrijft de trace van een lobby weg als zijn tijd om is."""
+    result = lobby_tracer.stop(lobby_code)
+    if result:
+        path, events = result
+        server_log.info('trace_written', lobby_code, path=path, events=events)
+
+@app.route('/lobbies/stats')
+def lobby_stats():
+    """Retourneert het aantal lobbies van deze worker (per fase), hun geschatte grootte en het aantal opgeruimde lobbies."""
+    return jsonify(lobby_reaper.stats())
+
+@app.route('/replays')
+def list_replays():
+    """Retourneert de laatst gearchiveerde spellen van deze worker (nieuwste eerst)."""
+    if replay_archive is None:
+        abort(404)
+    return jsonify(replay_archive.recent(request.args.get('limit', 20, type=int)))
+
+@app.route('/replay/<int:game_id>')
+def get_replay(game_id):
+    """
+    Retourneert een reeks stappen uit een gearchiveerd spel, die de frontend één voor één
+    kan tonen. Stap n is de staat na n acties (stap 0 is de start), met alle handen zichtbaar.
+    Query parameters: 'start' (eerste stap, standaard 0) en 'count' (aantal stappen).
+    """
+    info = replay_archive.game_info(game_id) if replay_archive is not None else None
+    if not info:
+        abort(404)
+    start = min(max(request.args.get('start', 0, type=int), 0), info['actionCount'])
+    count = min(max(request.args.get('count', app.config['REPLAY_PAGE_SIZE'], type=int), 1), app.config['REPLAY_PAGE_SIZE'])
+    end = min(start + count - 1, info['actionCount']) # Laatste stap in deze reeks
+
+    # Alleen de acties tot en met de laatste stap worden uit het archief gelezen
+    record = replay_archive.load(game_id, end)
+    player_names = dict(record.players)
+    game_state = replay_game(record, start)
+    log = game_state.log.entries() # De log bij de eerste stap; daarna alleen de nieuwe regels per stap
+    steps = [{
+        "action": _replay_action(player_names, record.actions[start - 1]) if start > 0 else None,
+        "state": _replay_state(game_state),
+        "logAppend": []
+    }]
+    for action in record.actions[start:end]:
+        log_seq = game_state.log.last_seq
+        action_name, player_id, cards = action
+        # Rechtstreeks naar game_logic: de metrics zijn voor de live spellen, niet voor replays
+        game_logic.apply_action(game_state, action_name, player_id, list(cards) if cards is not None else None)
+        steps.append({
+            "action": _replay_action(player_names, action),
+            "state": _replay_state(game_state),
+            "logAppend": game_state.log.entries_since(log_seq)
+        })
+    info.update(start=start, players=list(player_names.values()), log=log, steps=steps)
+    return jsonify(info)
+
+def _replay_state(game_state):
+    """De staat van een replay stap: zoals spelers hem zien, maar met alle handen zichtbaar."""
+    state = game_state.to_wire()
+    for player_wire, player in zip(state["players"], game_state.players):
+        player_wire["hand"] = card_names(player.hand)
+    return state
+
+def _replay_action(player_names, action):
+    """Beschrijft een actie uit een GameRecord voor de replay viewer."""
+    action_name, player_id, cards = action
+    return {
+        "action": action_name,
+        "playerName": player_names.get(player_id),
+        "cards": card_names(cards) if cards is not None else None
+    }
+
 
 # --- SocketIO Event Handlers ---
 
 @socketio.on('connect')
-def handle_connect():
+@timed_event
+def handle_connect(auth=None):
     """Behandelt nieuwe client verbindingen."""
+    connected_sockets.inc()
     # Gebruik request.sid als een unieke ID voor de socket.
     # We slaan de speler naam tijdelijk in de sessie op.
-    print(f"Client {request.sid} verbonden.")
+    server_log.info('socket_connected', sid=request.sid)
 
 @socketio.on('disconnect')
-def handle_disconnect():
-    """Behandelt client ontkoppelingen."""
+@lobby_event(lambda reason=None: lobby_store.lobby_of(current_player_id()))
+def handle_disconnect(reason=None):
+    """
+    Behandelt client ontkoppelingen. De stoel van de speler blijft RESUME_GRACE_PERIOD
+    seconden bezet, zodat hij met een nieuwe socket kan terugkomen (zie 'resume_session').
+    """
+    connected_sockets.dec()
     player_sid = request.sid
+    player_id = current_player_id()
     # Probeer de naam op te halen, standaard naar 'Onbekende speler'
     player_name = session.get(player_sid, 'Onbekende speler') 
 
-    print(f"Client {player_sid} ({player_name}) ontkoppeld.")
-
-    # Zoek en verwijder de speler uit zijn lobby
-    # Loop over een kopie van de items om wijzigingen tijdens iteratie toe te staan
-    for lobby_code, game_state in list(lobbies.items()): 
-        player_found_in_lobby = False
-        # Vind de speler in de game_state.players lijst
-        player_obj = next((p for p in game_state['players'] if p['id'] == player_sid), None)
-        
-        if player_obj:
-            game_state['players'].remove(player_obj)
-            game_state['log'].append(f"{player_name} heeft de lobby verlaten.")
-            print(f"{player_name} verwijderd uit lobby {lobby_code}.")
-            player_found_in_lobby = True
-        
-        if player_found_in_lobby:
-            # Als de lobby leeg is, verwijder deze volledig
-            if not game_state['players']:
-                del lobbies[lobby_code]
-                print(f"Lobby {lobby_code} is leeg en verwijderd.")
-            else:
-                # Als het spel al gestart was, controleer de winconditie na een disconnect
-                if "turnOrder" in game_state: # Dit betekent dat initialize_game_state al is aangeroepen
-                    # Verwijder de speler ook uit turnOrder als deze daar nog in zit
-                    game_state['turnOrder'] = [p_id for p_id in game_state['turnOrder'] if p_id != player_sid]
-                    
-                    # Als het zijn beurt was, zet de beurt op de volgende actieve speler
-                    if game_state['currentTurn'] == player_sid:
-                        game_state['currentTurn'] = _get_next_active_player_id(game_state, player_sid)
-                        # Als er niemand is om de beurt door te geven maar er zijn nog actieve spelers,
-                        # geef de beurt aan de eerste in de (nieuwe) turnOrder.
-                        if not game_state['currentTurn'] and len([p for p in game_state['players'] if p['alive']]) > 0:
-                             game_state['currentTurn'] = game_state['turnOrder'][0] if game_state['turnOrder'] else None
-
-
-                    # Controleer de winconditie als een speler disconnect
-                    win_check_result = check_win_condition(game_state)
-                    if win_check_result['game_over']:
-                        game_state['phase'] = 'gameOver'
-                        if win_check_result['winner']:
-                            game_state['log'].append(f"{win_check_result['winner_name']} heeft het spel gewonnen!")
-                            socketio.emit('game_over', {'winner': win_check_result['winner_name']}, room=lobby_code)
-                        else:
-                            game_state['log'].append("Alle spelers zijn uitgeschakeld. Geen winnaar.")
-                            socketio.emit('game_over', {'winner': 'geen'}, room=lobby_code)
-
-                # Stuur update naar de overgebleven spelers
-                broadcast_game_state(lobby_code)
-            return
+    # Zoek de lobby van de speler direct op via de reverse index
+    lobby_code = lobby_store.lobby_of(player_id)
+    server_log.info('socket_disconnected', lobby_code, sid=player_sid, player=player_name, reason=reason)
+    game_state = get_game_state(lobby_code)
+    player = _get_player_by_id(game_state, player_id)
+    if not player or player.connection != player_sid:
+        return # De stoel is al overgenomen door een nieuwere socket van dezelfde speler
+
+    if app.config['RESUME_GRACE_PERIOD'] <= 0:
+        remove_player(lobby_code, game_state, player_id)
+        return
+
+    player.connection = None
+    player.disconnected_at = time.time()
+    game_state.log.append(f"{player.name} heeft de verbinding verloren.")
+    hold_seat(lobby_code, player_id)
+    broadcast_game_state(lobby_code) # De anderen krijgen alleen een patch met de gewijzigde speler
+
+
+@socketio.on('resume_session')
+@lobby_event(lambda data: _owned_lobby_code(_resume_seat(data)[0] or ''))
+def handle_resume_session(data):
+    """
+    Geeft een client na een verbroken verbinding (of een herladen pagina) zijn stoel terug.
+    De client stuurt zijn resume token en de revisie en het log volgnummer van de staat die
+    hij nog heeft; als het kan krijgt hij alleen wat er sindsdien veranderd is.
+    """
+    lobby_code, player_id = _resume_seat(data)
+    # Hoort de lobby bij een andere worker, stuur de client dan door; daar krijgt hij zijn stoel terug
+    owner = lobby_router.owner_of(lobby_code) if lobby_code else None
+    if owner:
+        emit('lobby_redirect', {'lobbyCode': lobby_code, 'url': owner, 'resumeToken': data.get('resumeToken')})
+        return
+    game_state = get_game_state(lobby_code)
+    player = _get_player_by_id(game_state, player_id)
+    if not player:
+        emit('resume_failed', {'message': 'Je plaats in de lobby bestaat niet meer.'})
+        return
+    current_lobby_code = lobby_store.lobby_of(current_player_id())
+    if current_player_id() != player_id and current_lobby_code:
+        emit('error_message', {'message': 'Je zit al in een andere lobby.'})
+        return
+
+    previous_connection = player.connection
+    player.connection = request.sid
+    player.disconnected_at = None
+    session['player_id'] = player_id
+    session[request.sid] = player.name
+    lobby_store.set_lobby_of(player_id, lobby_code)
+    join_room(lobby_code)
+    join_room(player_id) # Berichten aan de speler gaan naar de room van zijn id
+    if previous_connection not in (None, request.sid):
+        # Een oudere socket van deze speler (bijv. een verbinding waarvan de server het
+        # verbreken nog niet gemerkt heeft) krijgt niets meer
+        disconnect(sid=previous_connection, namespace='/')
+    server_log.info('player_resumed', lobby_code, player=player.name, sid=request.sid)
+
+    emit('session_resumed', {
+        'lobbyCode': lobby_code,
+        'playerId': player_id,
+        'players': [p.name for p in game_state.players],
+        'isHost': lobby_host(game_state) == player_id,
+        'started': game_state.started
+    })
+    if not game_state.started:
+        return
+
+    stream = _get_state_stream(lobby_code)
+    if previous_connection is None:
+        game_state.log.append(f"{player.name} is weer verbonden.")
+        stream.mark_dirty()
+    revision = data.get('revision')
+    log_seq = data.get('logSeq')
+    event_name, payload = stream.resume_for(player_id, game_state,
+                                            revision if isinstance(revision, int) else None,
+                                            log_seq if isinstance(log_seq, int) else None)
+    payload_bytes.labels(event_name).observe(encoded_size(payload))
+    emit(event_name, payload)
+    # De anderen zien dat de speler weer verbonden is (de teruggekomen speler is al bij)
+    broadcast_game_state(lobby_code, new_revision=False)
 
 
 @socketio.on('set_player_name')
+@timed_event
 def handle_set_player_name(data):
     """Slaat de spelernaam op in de sessie voor deze client."""
     player_name = data.get('name')
     if player_name:
         session[request.sid] = player_name
-        print(f"Speler {request.sid} naam ingesteld op: {player_name}")
+        server_log.info('player_name_set', sid=request.sid, player=player_name)
         emit('name_set', {'name': player_name})
     else:
         emit('error_message', {'message': 'Naam is verplicht.'})
 
 
 @socketio.on('create_lobby')
+@lobby_event(lambda: None) # Een nieuwe lobby hoeft niet vergrendeld te worden
 def handle_create_lobby():
     """Behandelt de aanvraag om een nieuwe lobby aan te maken."""
-    player_sid = request.sid
-    player_name = session.get(player_sid)
+    player_sid = current_player_id()
+    player_name = session.get(request.sid)
     if not player_name:
         emit('error_message', {'message': 'Stel eerst je naam in.'})
         return
 
-    lobby_code = generate_lobby_code()
-    
-    # Initialiseer een basis lobby met de aanmaker als eerste speler
-    # De volledige game state wordt geïnitialiseerd bij 'start_game_request'
-    lobbies[lobby_code] = {
-        "lobbyCode": lobby_code,
-        "players": [
-            { "id": player_sid, "name": player_name, "alive": True }
-        ],
-        "log": [f"{player_name} heeft lobby {lobby_code} aangemaakt."]
-    }
+    if lobby_store.lobby_of(player_sid):
+        emit('error_message', {'message': 'Je zit al in een lobby.'})
+        return
+
+    if server_draining.is_set():
+        emit('error_message', {'message': 'De server wordt herstart. Probeer het zo opnieuw.'})
+        return
+
+    while True:
+        lobby_code = generate_lobby_code()
+
+        # Initialiseer een basis lobby met de aanmaker als eerste speler
+        # De volledige game state wordt geïnitialiseerd bij 'start_game_request'
+        lobby_log = create_lobby_log(lobby_code)
+        lobby_log.append(f"{player_name} heeft lobby {lobby_code} aangemaakt.")
+        # De log blijft de hele levensduur van de lobby bestaan, ook bij herstarts
+        if add_lobby(lobby_code, GameState(lobby_code, [Player(player_sid, player_name)], lobby_log)):
+            break
+    lobby_store.set_lobby_of(player_sid, lobby_code)
     join_room(lobby_code) # Voeg de speler toe aan de SocketIO room
-    print(f"{player_name} heeft lobby {lobby_code} aangemaakt.")
-    emit('lobby_created', {'lobbyCode': lobby_code, 'players': [p['name'] for p in lobbies[lobby_code]['players']]})
+    server_log.bind_lobby(lobby_code)
+    server_log.info('lobby_created', lobby_code, player=player_name)
+    emit('lobby_created', {'lobbyCode': lobby_code, 'players': [p.name for p in get_game_state(lobby_code).players],
+                           'playerId': player_sid, 'resumeToken': issue_resume_token(lobby_code, player_sid)})
     
     # Stuur een update naar de aanmaker over de spelers in de lobby
-    emit('lobby_update', {'players': [p['name'] for p in lobbies[lobby_code]['players']]}, room=lobby_code)
+    emit('lobby_update', {'players': [p.name for p in get_game_state(lobby_code).players]}, room=lobby_code)
 
 
 @socketio.on('join_lobby')
+@lobby_event(lambda data: _owned_lobby_code(data.get('lobbyCode', '').upper()))
 def handle_join_lobby(data):
     """Behandelt de aanvraag om een bestaande lobby te joinen."""
     lobby_code = data.get('lobbyCode', '').upper()
-    player_sid = request.sid
-    player_name = session.get(player_sid)
+    player_sid = current_player_id()
+    player_name = session.get(request.sid)
 
     if not player_name:
         emit('error_message', {'message': 'Stel eerst je naam in.'})
         return
 
-    if lobby_code not in lobbies:
-        emit('error_message', {'message': 'Lobby bestaat niet.'})
+    # Hoort de lobby bij een andere worker, stuur de client dan door naar die worker
+    owner = lobby_router.owner_of(lobby_code)
+    if owner:
+        if lobby_store.lobby_of(player_sid):
+            emit('error_message', {'message': 'Je zit al in een andere lobby.'})
+            return
+        emit('lobby_redirect', {'lobbyCode': lobby_code, 'url': owner, 'name': player_name})
+        return
+
+    if server_draining.is_set():
+        emit('error_message', {'message': 'De server wordt herstart. Probeer het zo opnieuw.'})
         return
 
-    game_state = lobbies[lobby_code]
+    game_state = get_game_state(lobby_code)
+    if not game_state:
+        emit('error_message', {'message': 'Lobby bestaat niet.'})
+        return
 
-    # Voorkom dat dezelfde speler meerdere keren joined
-    if any(p['id'] == player_sid for p in game_state['players']):
+    # Voorkom dat dezelfde speler meerdere keren joined, of in twee lobbies tegelijk zit
+    current_lobby_code = lobby_store.lobby_of(player_sid)
+    if current_lobby_code == lobby_code:
         emit('error_message', {'message': 'Je bent al in deze lobby.'})
         return
+    if current_lobby_code:
+        emit('error_message', {'message': 'Je zit al in een andere lobby.'})
+        return
 
-    if len(game_state['players']) >= 4:
+    if len(game_state.players) >= MAX_LOBBY_PLAYERS:
         emit('error_message', {'message': 'Lobby is vol.'})
         return
     
-    if "turnOrder" in game_state: # Spel is al gestart, geen nieuwe spelers meer
+    if game_state.started: # Spel is al gestart, geen nieuwe spelers meer
         emit('error_message', {'message': 'Het spel in deze lobby is al gestart. Je kunt niet meer meedoen.'})
         return
 
-    game_state['players'].append({"id": player_sid, "name": player_name, "alive": True})
+    game_state.players.append(Player(player_sid, player_name))
+    lobby_store.set_lobby_of(player_sid, lobby_code)
     join_room(lobby_code)
-    game_state['log'].append(f"{player_name} is de lobby binnengekomen.")
-    print(f"{player_name} joined lobby {lobby_code}. Huidige spelers: {[p['name'] for p in game_state['players']]}")
+    game_state.log.append(f"{player_name} is de lobby binnengekomen.")
+    _get_state_stream(lobby_code).mark_dirty() # Er wordt geen GameState gebroadcast, maar een snapshot moet de nieuwe speler bevatten
+    server_log.info('player_joined', lobby_code, player=player_name, players=[p.name for p in game_state.players])
 
-    emit('lobby_joined', {'lobbyCode': lobby_code, 'players': [p['name'] for p in game_state['players']]})
+    emit('lobby_joined', {'lobbyCode': lobby_code, 'players': [p.name for p in game_state.players],
+                          'playerId': player_sid, 'resumeToken': issue_resume_token(lobby_code, player_sid)})
     # Stuur update naar alle spelers in de lobby
-    socketio.emit('lobby_update', {'players': [p['name'] for p in lobbies[lobby_code]['players']]}, room=lobby_code)
+    socketio.emit('lobby_update', {'players': [p.name for p in game_state.players]}, room=lobby_code)
+
+
+@socketio.on('add_bot')
+@lobby_event(lambda data: data.get('lobbyCode'))
+def handle_add_bot(data):
+    """
+    Voegt een bot toe aan een lobby die nog niet gestart is, zodat je niet op een tweede
+    speler hoeft te wachten. Alleen de maker van de lobby kan bots toevoegen.
+    Optioneel kiest 'policy' het speelgedrag van de bot (zie POLICY_PRESETS in simulation.py).
+    """
+    lobby_code = data.get('lobbyCode')
+    policy_name = data.get('policy') or app.config['BOT_DEFAULT_POLICY']
+
+    game_state = get_game_state(lobby_code)
+    if not game_state:
+        emit('error_message', {'message': 'Lobby niet gevonden.'})
+        return
+
+    if current_player_id() != lobby_host(game_state):
+        emit('error_message', {'message': 'Alleen de maker van de lobby kan bots toevoegen.'})
+        return
+
+    if len(game_state.players) >= MAX_LOBBY_PLAYERS:
+        emit('error_message', {'message': 'Lobby is vol.'})
+        return
+
+    if game_state.started:
+        emit('error_message', {'message': 'Het spel is al gestart.'})
+        return
+
+    try:
+        bot = create_bot_player(policy_name, sum(1 for p in game_state.players if is_bot(p.id)) + 1)
+    except ValueError as error:
+        emit('error_message', {'message': str(error)})
+        return
+    game_state.players.append(bot)
+    game_state.log.append(f"{bot.name} is de lobby binnengekomen.")
+    _get_state_stream(lobby_code).mark_dirty()
+    server_log.info('bot_added', lobby_code, bot=bot.name, policy=policy_name)
+
+    socketio.emit('lobby_update', {'players': [p.name for p in game_state.players]}, room=lobby_code)
 
 
 @socketio.on('start_game_request')
+@lobby_event(lambda data: data.get('lobbyCode'))
 def handle_start_game_request(data):
     """
     Behandelt de aanvraag om het spel te starten.
     Alleen de lobby maker kan starten. Minimaal 2 spelers nodig.
     """
     lobby_code = data.get('lobbyCode')
-    player_sid = request.sid
+    player_sid = current_player_id()
 
-    game_state = lobbies.get(lobby_code)
+    game_state = get_game_state(lobby_code)
     if not game_state:
         emit('error_message', {'message': 'Lobby niet gevonden.'})
         return
 
     # Controleer of de aanvrager de maker van de lobby is
-    if player_sid != game_state['players'][0]['id']:
+    if player_sid != lobby_host(game_state):
         emit('error_message', {'message': 'Alleen de maker van de lobby kan het spel starten.'})
         return
 
-    if len(game_state['players']) < 2:
+    if len(game_state.players) < 2:
         emit('error_message', {'message': 'Minimaal 2 spelers nodig om te starten.'})
         return
 
-    if "turnOrder" in game_state: # Spel is al gestart
+    if game_state.started: # Spel is al gestart
         emit('error_message', {'message': 'Spel is al gestart.'})
         return
 
     # Initialiseer de volledige GameState via game_logic.py
-    player_ids_and_names = [(p['id'], p['name']) for p in game_state['players']]
-    new_game_state = create_new_game(lobby_code, player_ids_and_names)
-    lobbies[lobby_code] = new_game_state # Overwrite de basis lobby state met de volledige game state
+    player_ids_and_names = [(p.id, p.name) for p in game_state.players]
+    new_game_state = create_new_game(lobby_code, player_ids_and_names, log=game_state.log)
+    carry_over_connections(game_state, new_game_state)
+    set_game_state(lobby_code, new_game_state) # Overwrite de basis lobby state met de volledige game state
 
-    print(f"Spel gestart in lobby {lobby_code}.")
+    server_log.info('game_started', lobby_code, players=len(new_game_state.players))
     broadcast_game_state(lobby_code) # Verstuurt de eerste GameState naar alle clients
     socketio.emit('game_started', {'lobbyCode': lobby_code}, room=lobby_code)
 
 
 @socketio.on('make_play')
+@lobby_event(lambda data: data.get('lobbyCode'))
 def handle_make_play(data):
     """Behandelt een speler die kaarten neerlegt en een claim doet."""
     lobby_code = data.get('lobbyCode')
-    player_sid = request.sid
+    player_sid = current_player_id()
     cards_played = data.get('cardsPlayed') # Lijst van kaarten die de speler zegt neer te leggen
     
-    game_state = lobbies.get(lobby_code)
+    game_state = seated_game_state(lobby_code, player_sid)
     if not game_state:
-        emit('error_message', {'message': 'Lobby of spel niet gevonden.'})
+        return
+
+    # Zet de kaartnamen van de client om naar kaartcodes
+    if not isinstance(cards_played, list) or not 1 <= len(cards_played) <= game_logic.HAND_SIZE:
+        emit('error_message', {'message': 'Je moet tussen 1 en 5 kaarten leggen.'})
+        return
+    cards_played, unknown_card = card_codes(cards_played)
+    if cards_played is None:
+        emit('error_message', {'message': f"De kaart '{unknown_card}' is niet in je hand."})
         return
     
-    # Roep de game_logic functie aan om de zet te verwerken
-    success, message = make_play(game_state, player_sid, cards_played) 
+    # Verwerk de zet; game_logic doet ook de automatische LIAR! call (speciale 2-spelers regel)
+    success, message = apply_action(game_state, 'make_play', player_sid, cards_played)
 
     if not success:
         emit('error_message', {'message': message})
         return
 
-    # Na een succesvolle zet, controleer op speciale 2-spelers regel
-    win_check_result = check_win_condition(game_state)
-    if win_check_result['forced_liar_call']:
-        # Als een automatische LIAR! call nodig is
-        calling_player_id = win_check_result['calling_player_id']
-        call_liar(game_state, calling_player_id) # De game_logic.call_liar zal de fase aanpassen
-        game_state['log'].append(f"Automatische 'LIAR!' call door {_get_player_by_id(game_state, calling_player_id)['name']} (speciale 2-spelers regel).")
-    
     broadcast_game_state(lobby_code) # Verstuurt de bijgewerkte GameState
 
 
 @socketio.on('call_liar')
+@lobby_event(lambda data: data.get('lobbyCode'))
 def handle_call_liar(data):
     """Behandelt een speler die 'LIAR!' roept."""
     lobby_code = data.get('lobbyCode')
-    calling_player_sid = request.sid
+    calling_player_sid = current_player_id()
 
-    game_state = lobbies.get(lobby_code)
+    game_state = seated_game_state(lobby_code, calling_player_sid)
     if not game_state:
-        emit('error_message', {'message': 'Lobby of spel niet gevonden.'})
         return
     
     # Roep de game_logic functie aan om de LIAR! call te verwerken
-    success, message = call_liar(game_state, calling_player_sid)
+    success, message = apply_action(game_state, 'call_liar', calling_player_sid)
 
     if not success:
         emit('error_message', {'message': message})
@@ -314,18 +1202,18 @@ def handle_call_liar(data):
 
 
 @socketio.on('believe_claim') 
+@lobby_event(lambda data: data.get('lobbyCode'))
 def handle_believe_claim(data):
     """Behandelt een speler die besluit de claim van de vorige speler te geloven."""
     lobby_code = data.get('lobbyCode')
-    believing_player_sid = request.sid
+    believing_player_sid = current_player_id()
 
-    game_state = lobbies.get(lobby_code)
+    game_state = seated_game_state(lobby_code, believing_player_sid)
     if not game_state:
-        emit('error_message', {'message': 'Lobby of spel niet gevonden.'})
         return
 
     # Roep de game_logic functie aan om de 'believe' actie te verwerken
-    success, message = believe_claim(game_state, believing_player_sid)
+    success, message = apply_action(game_state, 'believe_claim', believing_player_sid)
 
     if not success:
         emit('error_message', {'message': message})
@@ -335,86 +1223,132 @@ def handle_believe_claim(data):
 
 
 @socketio.on('roll_dice')
+@lobby_event(lambda data: data.get('lobbyCode'))
 def handle_roll_dice(data):
     """Behandelt het werpen van de mystieke dobbelsteen."""
     lobby_code = data.get('lobbyCode')
-    player_sid = data.get('playerId') # Zorg dat de player_id hier correct wordt meegegeven
+    player_sid = current_player_id() # Niet de 'playerId' van de client: die kan iemand anders zijn
 
-    game_state = lobbies.get(lobby_code)
+    game_state = seated_game_state(lobby_code, player_sid)
     if not game_state:
-        emit('error_message', {'message': 'Lobby of spel niet gevonden.'})
         return
     
-    # Roep de game_logic functie aan om de dobbelsteenworp te verwerken
-    success, message = roll_mystic_dice(game_state, player_sid)
+    # Verwerk de dobbelsteenworp; game_logic controleert daarna direct de winconditie
+    success, message = apply_action(game_state, 'roll_dice', player_sid)
 
     if not success:
         emit('error_message', {'message': message})
         return
 
-    # Controleer de winconditie direct na de dobbelsteenworp
-    win_check_result = check_win_condition(game_state)
-    if win_check_result['game_over']:
-        game_state['phase'] = 'gameOver' # Zorg dat de fase als 'gameOver' wordt gezet
-        if win_check_result['winner']:
-            game_state['log'].append(f"{win_check_result['winner_name']} heeft het spel gewonnen!")
-            socketio.emit('game_over', {'winner': win_check_result['winner_name']}, room=lobby_code)
-        else:
-            game_state['log'].append("Alle spelers zijn uitgeschakeld. Geen winnaar.")
-            socketio.emit('game_over', {'winner': 'geen'}, room=lobby_code)
-        
+    if game_state.phase == 'gameOver':
+        end_game(lobby_code, game_state)
+
     # Na een succesvolle dobbelsteenworp, of als het spel voorbij is
     # broadcast de geüpdatete state
     broadcast_game_state(lobby_code)
 
 
+@socketio.on('request_game_state')
+@lobby_event(lambda data: data.get('lobbyCode'))
+def handle_request_game_state(data):
+    """
+    Stuurt een volledige snapshot als de client een revisie gemist heeft (resync).
+    De client kan in 'logSeq' het laatste log volgnummer meesturen dat hij al heeft.
+    """
+    lobby_code = data.get('lobbyCode')
+    player_sid = current_player_id()
+    acknowledged_log_seq = data.get('logSeq')
+
+    game_state = get_game_state(lobby_code)
+    if not game_state or lobby_store.lobby_of(player_sid) != lobby_code:
+        emit('error_message', {'message': 'Lobby of spel niet gevonden.'})
+        return
+
+    if not isinstance(acknowledged_log_seq, int):
+        acknowledged_log_seq = None
+    send_game_state_snapshot(lobby_code, player_sid, acknowledged_log_seq)
+
+
+@socketio.on('request_odds')
+@lobby_event(lambda data: data.get('lobbyCode'))
+def handle_request_odds(data):
+    """
+    Stuurt de kans dat de laatste claim een leugen is (zie odds.py), berekend met alleen de
+    informatie die de vrager zelf heeft, en per speler de kans dat zijn volgende worp met de
+    dobbelsteen een 6 is. Voor de optionele 'kansen' weergave.
+    """
+    lobby_code = data.get('lobbyCode')
+    player_sid = current_player_id()
+
+    game_state = get_game_state(lobby_code)
+    if not game_state or lobby_store.lobby_of(player_sid) != lobby_code:
+        emit('error_message', {'message': 'Lobby of spel niet gevonden.'})
+        return
+
+    # De claim waar de kans bij hoort (zonder de werkelijke kaarten), zodat de client een
+    # antwoord op een intussen vervangen claim kan negeren
+    last_claim = game_state.last_claim
+    emit('odds_update', {
+        'lobbyCode': lobby_code,
+        'claimPlayer': last_claim.player,
+        'pileSize': len(game_state.pile),
+        'lieProbability': estimate_lie_probability(game_state, player_sid),
+        'eliminationOdds': {player.id: elimination_probability(player) for player in game_state.players if player.alive}
+    })
+
+
 @socketio.on('chat_message')
+@lobby_event(lambda data: data.get('lobbyCode'))
 def handle_chat_message(data):
     """Behandelt chatberichten."""
     lobby_code = data.get('lobbyCode')
     message = data.get('message')
     player_name = session.get(request.sid) # Gebruik de opgeslagen naam
 
-    if lobby_code not in lobbies:
+    game_state = get_game_state(lobby_code)
+    if not game_state:
         emit('error_message', {'message': 'Lobby niet gevonden voor chat.'})
         return
 
     if player_name and message:
         full_message = f"{player_name}: {message}"
-        lobbies[lobby_code]['log'].append(f"CHAT: {full_message}")
+        game_state.log.append(f"CHAT: {full_message}")
         # Verstuur het chatbericht alleen als 'chat_message' event
         socketio.emit('chat_message', {'message': full_message}, room=lobby_code)
     else:
         emit('error_message', {'message': 'Bericht of naam ontbreekt.'})
 
 @socketio.on('restart_game_request')
+@lobby_event(lambda data: data.get('lobbyCode'))
 def handle_restart_game_request(data):
     """
     Behandelt de aanvraag om het spel opnieuw te starten in dezelfde lobby.
     """
     lobby_code = data.get('lobbyCode')
-    player_sid = request.sid
+    player_sid = current_player_id()
 
-    game_state = lobbies.get(lobby_code)
+    # Alleen spelers met een stoel in de lobby kunnen het lopende spel beëindigen
+    game_state = seated_game_state(lobby_code, player_sid)
     if not game_state:
-        emit('error_message', {'message': 'Lobby niet gevonden.'})
         return
 
     # Optioneel: Controleer of de aanvrager de maker van de lobby is
-    # if player_sid != game_state['players'][0]['id']:
+    # if player_sid != game_state.players[0].id:
     #     emit('error_message', {'message': 'Alleen de maker van de lobby kan het spel opnieuw starten.'})
     #     return
 
     # Reset de game state via game_logic.py
     # Zorg ervoor dat alle spelers die in de lobby waren (ook de "dode" spelers) opnieuw meedoen
-    player_ids_and_names = [(p['id'], p['name']) for p in game_state['players']]
-    new_game_state = create_new_game(lobby_code, player_ids_and_names)
-    lobbies[lobby_code] = new_game_state # Overschrijf de oude game state met de nieuwe
+    player_ids_and_names = [(p.id, p.name) for p in game_state.players]
+    archive_game(game_state) # Het vorige spel, ook als het niet uitgespeeld is
+    new_game_state = create_new_game(lobby_code, player_ids_and_names, log=game_state.log)
+    carry_over_connections(game_state, new_game_state)
+    set_game_state(lobby_code, new_game_state) # Overschrijf de oude game state met de nieuwe
 
-    print(f"Spel opnieuw gestart in lobby {lobby_code}.")
+    server_log.info('game_restarted', lobby_code, players=len(new_game_state.players))
     broadcast_game_state(lobby_code) # Verstuurt de nieuwe GameState naar alle clients
     socketio.emit('game_restarted', {'lobbyCode': lobby_code}, room=lobby_code) # Nieuw event voor client-side
 
 if __name__ == '__main__':
-    # Start de Flask-SocketIO server
+    # Start de Flask-SocketIO development server (voor productie: zie server.py)
     socketio.run(app, debug=True, port=5000)
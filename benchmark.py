@@ -0,0 +1,208 @@
+import argparse
+import json
+import platform
+import time
+import tracemalloc
+
+from simulation import DEFAULT_MAX_ACTIONS, policy_names, simulate_game
+
+# --- Benchmark van game_logic.py ---
+# Speelt een vast aantal geseede spellen af met simulation.py en rapporteert
+# games/sec, acties/sec, latency per actie (p50/p99) en geheugenallocaties per actie.
+# Met --save wordt het resultaat als baseline bewaard; met --compare wordt een eerdere
+# baseline ernaast gezet, zodat elke wijziging aan de engine voor en na gemeten kan worden.
+#
+# Gebruik:
+#   python benchmark.py --games 500 --players 2 3 4 --save baseline.json
+#   python benchmark.py --games 500 --players 2 3 4 --compare baseline.json
+
+DEFAULT_GAMES = 300
+
+
+def _percentile(sorted_values, fraction):
+    """Retourneert het percentiel 'fraction' (0..1) uit een gesorteerde lijst."""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def run_throughput(games, player_counts, seat_policies, max_actions, seed):
+    """
+    Meet de doorvoer zonder extra meetcode per actie.
+    Returns:
+        dict: games, acties, duur en afgeleide games/sec en acties/sec.
+    """
+    total_actions = 0
+    finished = 0
+    started = time.perf_counter()
+    for game_index in range(games):
+        result = simulate_game(player_counts[game_index % len(player_counts)], seed + game_index,
+                               seat_policies, max_actions)
+        total_actions += result['actions']
+        finished += result['finished']
+    duration = time.perf_counter() - started
+    return {
+        'games': games,
+        'finished_games': finished,
+        'actions': total_actions,
+        'seconds': duration,
+        'games_per_sec': games / duration if duration else 0.0,
+        'actions_per_sec': total_actions / duration if duration else 0.0
+    }
+
+
+def run_latency(games, player_counts, seat_policies, max_actions, seed):
+    """
+    Meet de duur van elke actie afzonderlijk.
+    Returns:
+        dict: Per actie type en in totaal het aantal, p50, p99 en max in microseconden.
+    """
+    durations = {}
+
+    def record(action, duration):
+        durations.setdefault(action, []).append(duration)
+
+    for game_index in range(games):
+        simulate_game(player_counts[game_index % len(player_counts)], seed + game_index,
+                      seat_policies, max_actions, action_hook=record)
+
+    all_durations = sorted(d for values in durations.values() for d in values)
+    report = {'all': _latency_summary(all_durations)}
+    for action, values in sorted(durations.items()):
+        report[action] = _latency_summary(sorted(values))
+    return report
+
+
+def _latency_summary(sorted_durations):
+    return {
+        'count': len(sorted_durations),
+        'p50_us': _percentile(sorted_durations, 0.50) * 1e6,
+        'p99_us': _percentile(sorted_durations, 0.99) * 1e6,
+        'max_us': (sorted_durations[-1] if sorted_durations else 0.0) * 1e6
+    }
+
+
+def run_allocations(games, player_counts, seat_policies, max_actions, seed):
+    """
+    Meet geheugenallocaties per actie met tracemalloc: de piek aan gealloceerd geheugen
+    tijdens een actie en wat er na de actie netto bij is gekomen.
+    Returns:
+        dict: Gemiddelde piek- en netto allocatie per actie in bytes.
+    """
+    totals = {'actions': 0, 'peak_bytes': 0, 'net_bytes': 0}
+    before = [0]
+
+    def record(action, duration):
+        current, peak = tracemalloc.get_traced_memory()
+        totals['actions'] += 1
+        totals['peak_bytes'] += peak - before[0]
+        totals['net_bytes'] += current - before[0]
+        tracemalloc.reset_peak()
+        before[0] = tracemalloc.get_traced_memory()[0]
+
+    tracemalloc.start()
+    try:
+        for game_index in range(games):
+            tracemalloc.reset_peak()
+            before[0] = tracemalloc.get_traced_memory()[0]
+            simulate_game(player_counts[game_index % len(player_counts)], seed + game_index,
+                          seat_policies, max_actions, action_hook=record)
+    finally:
+        tracemalloc.stop()
+
+    actions = totals['actions'] or 1
+    return {
+        'actions': totals['actions'],
+        'peak_bytes_per_action': totals['peak_bytes'] / actions,
+        'net_bytes_per_action': totals['net_bytes'] / actions
+    }
+
+
+def run_benchmark(games=DEFAULT_GAMES, player_counts=(2, 3, 4), seat_policies=('random',),
+                  max_actions=DEFAULT_MAX_ACTIONS, seed=0):
+    """Voert alle metingen uit en retourneert het rapport als dict."""
+    # De latency en allocatie metingen hebben meetcode per actie, dus die draaien apart
+    # met minder spellen, zodat de doorvoer meting niet beïnvloed wordt.
+    detail_games = max(1, games // 3)
+    return {
+        'config': {
+            'games': games,
+            'player_counts': list(player_counts),
+            'policies': list(seat_policies),
+            'max_actions': max_actions,
+            'seed': seed,
+            'python': platform.python_version()
+        },
+        'throughput': run_throughput(games, player_counts, seat_policies, max_actions, seed),
+        'latency': run_latency(detail_games, player_counts, seat_policies, max_actions, seed),
+        'allocations': run_allocations(detail_games, player_counts, seat_policies, max_actions, seed)
+    }
+
+
+def _format_change(current, baseline, higher_is_better):
+    if not baseline:
+        return ""
+    change = (current - baseline) / baseline * 100
+    better = change > 0 if higher_is_better else change < 0
+    return f"  ({change:+.1f}% t.o.v. baseline{', beter' if better and abs(change) >= 1 else ''})"
+
+
+def print_report(report, baseline=None):
+    """Print het rapport leesbaar, optioneel met de verandering ten opzichte van een baseline."""
+    config = report['config']
+    print(f"Benchmark: {config['games']} spellen, spelers {config['player_counts']}, "
+          f"policies {config['policies']}, max {config['max_actions']} acties, seed {config['seed']}")
+
+    throughput = report['throughput']
+    base_throughput = baseline['throughput'] if baseline else {}
+    print(f"  Spellen uitgespeeld: {throughput['finished_games']}/{throughput['games']}, "
+          f"{throughput['actions']} acties in {throughput['seconds']:.3f}s")
+    print(f"  games/sec:   {throughput['games_per_sec']:10.1f}"
+          f"{_format_change(throughput['games_per_sec'], base_throughput.get('games_per_sec'), True)}")
+    print(f"  acties/sec:  {throughput['actions_per_sec']:10.1f}"
+          f"{_format_change(throughput['actions_per_sec'], base_throughput.get('actions_per_sec'), True)}")
+
+    print("  Latency per actie (microseconden):")
+    base_latency = baseline['latency'] if baseline else {}
+    for action, summary in report['latency'].items():
+        base_summary = base_latency.get(action, {})
+        print(f"    {action:14s} n={summary['count']:7d}  p50={summary['p50_us']:8.1f}"
+              f"{_format_change(summary['p50_us'], base_summary.get('p50_us'), False)}"
+              f"  p99={summary['p99_us']:8.1f}"
+              f"{_format_change(summary['p99_us'], base_summary.get('p99_us'), False)}")
+
+    allocations = report['allocations']
+    base_allocations = baseline['allocations'] if baseline else {}
+    print(f"  Allocaties per actie: piek {allocations['peak_bytes_per_action']:.0f} bytes"
+          f"{_format_change(allocations['peak_bytes_per_action'], base_allocations.get('peak_bytes_per_action'), False)}"
+          f", netto {allocations['net_bytes_per_action']:.0f} bytes")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark van de Liar's Bar spellogica.")
+    parser.add_argument('--games', type=int, default=DEFAULT_GAMES, help="Aantal spellen voor de doorvoer meting.")
+    parser.add_argument('--players', type=int, nargs='+', default=[2, 3, 4], help="Aantallen spelers (afwisselend gebruikt).")
+    parser.add_argument('--policy', nargs='+', default=['random'], choices=policy_names(), help="Policy per stoel.")
+    parser.add_argument('--max-actions', type=int, default=DEFAULT_MAX_ACTIONS, help="Maximaal aantal acties per spel.")
+    parser.add_argument('--seed', type=int, default=0, help="Seed van het eerste spel.")
+    parser.add_argument('--save', help="Bewaar het rapport als JSON (baseline).")
+    parser.add_argument('--compare', help="Vergelijk met een eerder bewaarde baseline.")
+    args = parser.parse_args()
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as baseline_file:
+            baseline = json.load(baseline_file)
+
+    report = run_benchmark(args.games, tuple(args.players), tuple(args.policy), args.max_actions, args.seed)
+    print_report(report, baseline)
+
+    if args.save:
+        with open(args.save, 'w', encoding='utf-8') as report_file:
+            json.dump(report, report_file, indent=2)
+        print(f"Rapport bewaard in {args.save}.")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,160 @@
+import random
+import threading
+import time
+import traceback
+import uuid
+
+from game_model import Player
+from server_log import log_to_stderr
+from simulation import choose_action, make_policy, policy_names
+
+# --- Bots: spelers die door de server gespeeld worden ---
+# Een bot is een gewone Player in de GameState, met een id die met BOT_ID_PREFIX begint
+# in plaats van een socket id. Zijn acties gaan via game_logic.apply_action, net als die
+# van menselijke spelers; de keuzes komen van een policy uit simulation.py.
+#
+# Bots slapen niet elk in een eigen thread. Als een bot aan de beurt is, wordt zijn beurt
+# op een timer wheel gezet: één achtergrond taak die elke tick de timers van dat vakje
+# afgaat. Zo kost een wachtende bot alleen een entry in een lijst, hoeveel bots er ook zijn.
+
+BOT_ID_PREFIX = 'bot-'
+DEFAULT_BOT_POLICY = 'random'
+DEFAULT_THINK_TIME = 1.0 # Seconden dat een bot 'nadenkt' voor hij speelt, zodat spelers kunnen volgen
+
+DEFAULT_WHEEL_TICK = 0.05 # Seconden per vakje van de timer wheel
+DEFAULT_WHEEL_SLOTS = 512 # Aantal vakjes; langere vertragingen gaan meerdere rondes mee
+
+_policies = {} # { "bot_id": policy }, aangemaakt bij de eerste beurt van de bot
+
+
+def is_bot(player_id):
+    """True als 'player_id' bij een bot hoort."""
+    return isinstance(player_id, str) and player_id.startswith(BOT_ID_PREFIX)
+
+
+def create_bot_player(policy_name, bot_number):
+    """
+    Maakt een bot speler. De naam van de policy zit in de id, zodat elke worker de
+    policy van de bot kan maken (ook na een herstart of met een gedeelde store).
+    """
+    if policy_name not in policy_names():
+        raise ValueError(f"Onbekende policy '{policy_name}', kies uit {', '.join(policy_names())}.")
+    return Player(f"{BOT_ID_PREFIX}{policy_name}-{uuid.uuid4().hex[:12]}", f"Bot {bot_number}")
+
+
+def bot_policy(bot_id):
+    """Retourneert de policy van een bot (met een random generator geseed uit zijn id)."""
+    policy = _policies.get(bot_id)
+    if policy is None:
+        policy_name, _, suffix = bot_id[len(BOT_ID_PREFIX):].rpartition('-')
+        policy = _policies[bot_id] = make_policy(policy_name, int(suffix, 16))
+    return policy
+
+
+def forget_bots(player_ids):
+    """Ruimt de policies op van bots die niet meer meespelen (bijv. als hun lobby verwijderd is)."""
+    for player_id in player_ids:
+        _policies.pop(player_id, None)
+
+
+def choose_bot_action(game_state):
+    """
+    Bepaalt de actie van de bot die aan de beurt is.
+    Returns:
+        tuple: (str actie, str player_id, list kaarten of None), of None als er geen bot aan de beurt is.
+    """
+    if not game_state.started or game_state.phase == 'gameOver' or not is_bot(game_state.current_turn):
+        return None
+    return choose_action(game_state, bot_policy(game_state.current_turn))
+
+
+class TimerWheel:
+    """
+    Hashed timer wheel: timers worden per tick in een vakje gezet; één achtergrond taak
+    loopt de vakjes af en voert de verlopen timers uit.
+    Args:
+        start_background_task (callable): Start de achtergrond taak (bijv. socketio.start_background_task),
+                                          zodat de wheel in elke async mode werkt.
+        sleep (callable): Slaapfunctie die bij de async mode past (bijv. socketio.sleep).
+        tick (float): Seconden per vakje.
+        slot_count (int): Aantal vakjes.
+        log (callable): log(niveau, event, lobby, **velden) voor fouten in een timer (zie ServerLog.log).
+    """
+
+    def __init__(self, start_background_task, sleep=time.sleep, tick=DEFAULT_WHEEL_TICK, slot_count=DEFAULT_WHEEL_SLOTS,
+                 log=log_to_stderr):
+        self.tick = tick
+        self._log = log
+        self._start_background_task = start_background_task
+        self._sleep = sleep
+        self._slots = [[] for _ in range(slot_count)] # Per vakje: lijst van [rondes, callback]
+        self._cursor = 0 # Vakje dat bij de volgende tick afgegaan wordt
+        self._guard = threading.Lock()
+        self._started = False
+
+    def schedule(self, delay, callback):
+        """
+        Voert callback() uit na (ongeveer, afgerond op een tick) 'delay' seconden. De callback
+        draait op de taak van de wheel; langer werk hoort in een eigen achtergrond taak.
+        """
+        ticks = max(1, int(round(delay / self.tick)))
+        with self._guard:
+            rounds, offset = divmod(ticks - 1, len(self._slots))
+            self._slots[(self._cursor + offset) % len(self._slots)].append([rounds, callback])
+            start = not self._started
+            self._started = True
+        if start:
+            self._start_background_task(self._run)
+
+    def _run(self):
+        next_tick = time.monotonic()
+        while True:
+            next_tick += self.tick
+            self._sleep(max(0.0, next_tick - time.monotonic()))
+            with self._guard:
+                slot = self._slots[self._cursor]
+                due = [callback for rounds, callback in slot if rounds == 0]
+                slot[:] = [[rounds - 1, callback] for rounds, callback in slot if rounds > 0]
+                self._cursor = (self._cursor + 1) % len(self._slots)
+            for callback in due:
+                try:
+                    callback()
+                except Exception as error:
+                    # Een fout in één timer mag de wheel niet stoppen
+                    self._log('error', 'timer_failed', error=repr(error), traceback=traceback.format_exc())
+
+
+class BotTurns:
+    """
+    Plant de beurten van bots in op een TimerWheel, hooguit één per lobby tegelijk.
+    Args:
+        wheel (TimerWheel): De timer wheel.
+        play_turn (callable): play_turn(lobby_code) laat de bot die aan de beurt is spelen. Wordt
+                              op de taak van de wheel aangeroepen, dus moet het echte werk
+                              in een andere taak starten en direct terugkeren.
+        think_time (float): Gemiddelde seconden voordat een bot speelt.
+    """
+
+    def __init__(self, wheel, play_turn, think_time=DEFAULT_THINK_TIME):
+        self.wheel = wheel
+        self.think_time = think_time
+        self._play_turn = play_turn
+        self._pending = set() # Lobbies waarvoor een bot beurt ingepland staat
+        self._guard = threading.Lock()
+        self._rng = random.Random()
+
+    def schedule(self, lobby_code, game_state):
+        """Plant een beurt in als er in deze lobby een bot aan de beurt is (en er nog geen gepland staat)."""
+        if not game_state.started or game_state.phase == 'gameOver' or not is_bot(game_state.current_turn):
+            return
+        with self._guard:
+            if lobby_code in self._pending:
+                return # De geplande beurt kijkt bij het uitvoeren wie er dan aan de beurt is
+            self._pending.add(lobby_code)
+            delay = self.think_time * self._rng.uniform(0.75, 1.25)
+        self.wheel.schedule(delay, lambda: self._fire(lobby_code))
+
+    def _fire(self, lobby_code):
+        with self._guard:
+            self._pending.discard(lobby_code)
+        self._play_turn(lobby_code)
@@ -0,0 +1,101 @@
+import json
+import os
+from collections import deque
+
+# --- Begrensde spel log ---
+# De log van een lobby is een ring buffer met een vaste capaciteit. Elke regel krijgt
+# een oplopend volgnummer (seq), zodat clients alleen regels hoeven te ontvangen die
+# nieuwer zijn dan de laatste die ze al hebben. Regels die uit de buffer vallen kunnen
+# optioneel naar een archiefbestand op schijf geschreven worden.
+
+DEFAULT_LOG_CAPACITY = 200
+
+# Aantal uit de buffer gevallen regels dat verzameld wordt voordat ze naar het archief gaan
+ARCHIVE_BATCH_SIZE = 64
+
+
+class GameLog:
+    """
+    Ring buffer voor de logregels van één lobby.
+    Gedraagt zich voor game_logic.py als een lijst waar alleen aan toegevoegd wordt.
+    """
+
+    __slots__ = ('capacity', 'last_seq', '_entries', '_archive_path', '_archive_pending')
+
+    def __init__(self, capacity=DEFAULT_LOG_CAPACITY, entries=(), archive_path=None):
+        """
+        Args:
+            capacity (int): Maximaal aantal regels dat in het geheugen blijft.
+            entries (iterable): Optionele beginregels.
+            archive_path (str): Optioneel pad van een JSON-lines bestand waarin
+                                regels terechtkomen die uit de buffer vallen.
+        """
+        self.capacity = capacity
+        self.last_seq = 0 # Volgnummer van de laatst toegevoegde regel (0 = nog geen regels)
+        self._entries = deque(maxlen=capacity)
+        self._archive_path = archive_path
+        self._archive_pending = []
+        for entry in entries:
+            self.append(entry)
+
+    def append(self, text):
+        """Voegt een regel toe en retourneert het volgnummer ervan."""
+        if self._archive_path and len(self._entries) == self.capacity:
+            # De oudste regel valt zo uit de buffer, bewaar hem voor het archief
+            evicted_seq = self.last_seq - self.capacity + 1
+            self._archive_pending.append((evicted_seq, self._entries[0]))
+            if len(self._archive_pending) >= ARCHIVE_BATCH_SIZE:
+                self.flush_archive()
+        self.last_seq += 1
+        self._entries.append(text)
+        return self.last_seq
+
+    @property
+    def first_seq(self):
+        """Volgnummer van de oudste regel die nog in de buffer zit."""
+        return self.last_seq - len(self._entries) + 1
+
+    def entries(self):
+        """Retourneert alle regels in de buffer als lijst (oudste eerst)."""
+        return list(self._entries)
+
+    def entries_since(self, seq):
+        """
+        Retourneert de regels met een volgnummer groter dan 'seq'.
+        Als 'seq' ouder is dan de buffer, worden alle regels in de buffer geretourneerd.
+        """
+        newer_count = self.last_seq - seq
+        if newer_count <= 0:
+            return []
+        if newer_count >= len(self._entries):
+            return list(self._entries)
+        return list(self._entries)[-newer_count:]
+
+    def flush_archive(self):
+        """Schrijft de verzamelde uit de buffer gevallen regels naar het archiefbestand."""
+        if not self._archive_path or not self._archive_pending:
+            return
+        directory = os.path.dirname(self._archive_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(self._archive_path, 'a', encoding='utf-8') as archive_file:
+            for seq, text in self._archive_pending:
+                archive_file.write(json.dumps({"seq": seq, "text": text}, ensure_ascii=False) + "\n")
+        self._archive_pending = []
+
+    def close(self):
+        """Schrijft de resterende buffer naar het archief (bijv. als de lobby verwijderd wordt)."""
+        if not self._archive_path:
+            return
+        self._archive_pending.extend(zip(range(self.first_seq, self.last_seq + 1), self._entries))
+        self._entries.clear()
+        self.flush_archive()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __iter__(self):
+        return iter(self._entries)
+
+    def __getitem__(self, index):
+        return self._entries[index]
@@ -0,0 +1,270 @@
+# --- Compact GameState model ---
+# De GameState van een lobby bestaat uit kleine objecten met __slots__ in plaats van
+# geneste dicts. Kaarten worden intern opgeslagen als kleine integer codes; pas bij het
+# versturen naar clients (to_wire) worden ze omgezet naar de namen die de frontend kent.
+
+# Kaartcodes. De volgorde is alfabetisch op naam, zodat een gesorteerde hand
+# dezelfde volgorde heeft als voorheen met de namen als strings.
+BOER = 0
+JOKER = 1
+KONING = 2
+KONINGIN = 3
+
+CARD_NAMES = ('Boer', 'Joker', 'Koning', 'Koningin')
+CARD_CODES = {name: code for code, name in enumerate(CARD_NAMES)}
+
+# Waarden van de mystieke dobbelsteen zoals ze op de wire staan
+DICE_FACE_NAMES = ('0', '1', '2', '3', '4', '5', '6')
+DICE_TOTAL_SIDES = 6
+
+# Fase van een lobby waarvan het spel nog niet gestart is
+PHASE_WAITING = 'waitingForPlayers'
+
+
+def card_name(code):
+    """Zet een kaartcode om naar de naam die clients gebruiken."""
+    return CARD_NAMES[code]
+
+def card_names(codes):
+    """Zet een lijst kaartcodes om naar een lijst namen."""
+    return [CARD_NAMES[code] for code in codes]
+
+def card_codes(names):
+    """
+    Zet een lijst kaartnamen van een client om naar kaartcodes.
+    Returns:
+        tuple: (list codes, None) of (None, str onbekende_naam) als een naam niet bestaat.
+    """
+    codes = []
+    for name in names:
+        code = CARD_CODES.get(name)
+        if code is None:
+            return None, name
+        codes.append(code)
+    return codes, None
+
+
+class Player:
+    """Een speler (stoel) in een lobby."""
+
+    __slots__ = ('id', 'name', 'hand', 'alive', 'rolled_numbers', 'dice_roll_attempts', 'connection', 'disconnected_at')
+
+    def __init__(self, player_id, name):
+        self.id = player_id
+        self.name = name
+        self.hand = [] # Kaartcodes, gesorteerd
+        self.alive = True
+        self.rolled_numbers = [] # Dobbelsteenwaarden (int) die deze speler al gerold heeft in deze game
+        self.dice_roll_attempts = 0
+        # Sid van de socket die de stoel nu bezet, of None als de verbinding verbroken is.
+        # De id blijft de sid waarmee de speler binnenkwam; na een resume is dit een andere socket.
+        self.connection = player_id
+        self.disconnected_at = None # Tijdstip (time.time()) waarop de verbinding verbroken werd
+
+    @property
+    def connected(self):
+        return self.connection is not None
+
+    def to_wire(self, include_hand, started=True):
+        """
+        Retourneert het speler record zoals clients het verwachten.
+        Args:
+            include_hand (bool): Of de handkaarten zichtbaar zijn voor de ontvanger.
+            started (bool): Voor een lobby die nog niet gestart is bestaat een speler
+                            alleen uit id, naam en alive status.
+        """
+        if not started:
+            return {"id": self.id, "name": self.name, "alive": self.alive, "connected": self.connected}
+        return {
+            "id": self.id,
+            "name": self.name,
+            "hand": card_names(self.hand) if include_hand else [],
+            "alive": self.alive,
+            "connected": self.connected,
+            "mysticDice": {
+                "totalSides": DICE_TOTAL_SIDES,
+                "remainingSafeSides": DICE_TOTAL_SIDES,
+                "rolledNumbers": [DICE_FACE_NAMES[face] for face in self.rolled_numbers]
+            },
+            "diceRollAttempts": self.dice_roll_attempts
+        }
+
+
+class Claim:
+    """
+    Een claim van een speler: een entry op de stapel of de laatste claim (lastClaimDetails).
+    Claims worden na aanmaken niet meer gewijzigd, zodat NO_CLAIM gedeeld kan worden.
+    """
+
+    __slots__ = ('player', 'player_name', 'claimed_card_type', 'claimed_amount', 'actual_cards')
+
+    def __init__(self, player=None, player_name=None, claimed_card_type=None, claimed_amount=None, actual_cards=()):
+        self.player = player
+        self.player_name = player_name
+        self.claimed_card_type = claimed_card_type
+        self.claimed_amount = claimed_amount
+        self.actual_cards = actual_cards # Kaartcodes die werkelijk gelegd zijn
+
+    def to_wire(self):
+        """Retourneert de claim in het formaat van 'lastClaimDetails'."""
+        return {
+            "player": self.player,
+            "playerName": self.player_name,
+            "claimedCardType": card_name(self.claimed_card_type) if self.claimed_card_type is not None else None,
+            "claimedAmount": self.claimed_amount,
+            "actualCardsPlayed": card_names(self.actual_cards)
+        }
+
+    def to_pile_wire(self):
+        """Retourneert de claim in het formaat van een entry op de publieke 'pile'."""
+        return {
+            "player": self.player,
+            "claimedCardType": card_name(self.claimed_card_type),
+            "claimedAmount": self.claimed_amount
+        }
+
+# Gedeelde "geen claim" waarde, in plaats van telkens een nieuwe lege dict
+NO_CLAIM = Claim()
+
+
+class DiceRollOutcome:
+    """Het resultaat van de laatste worp met de mystieke dobbelsteen."""
+
+    __slots__ = ('face', 'is_loss')
+
+    def __init__(self, face, is_loss):
+        self.face = face
+        self.is_loss = is_loss
+
+    def to_wire(self):
+        return {"face": DICE_FACE_NAMES[self.face], "isLoss": self.is_loss}
+
+
+class RevealedCardsInfo:
+    """Informatie over onthulde kaarten en de dobbelsteenworp na een 'LIAR!' call."""
+
+    __slots__ = ('is_revealed', 'claimer_id', 'claimer_name', 'actual_cards', 'claim_was_true',
+                 'player_to_roll_dice', 'outcome_message', 'dice_roll_outcome')
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        """Zet alle velden terug naar de beginwaarden (zonder een nieuw object te maken)."""
+        self.is_revealed = False
+        self.claimer_id = None
+        self.claimer_name = None
+        self.actual_cards = ()
+        self.claim_was_true = None
+        self.player_to_roll_dice = None
+        self.outcome_message = None
+        self.dice_roll_outcome = None
+
+    def to_wire(self):
+        return {
+            "isRevealed": self.is_revealed,
+            "claimerId": self.claimer_id,
+            "claimerName": self.claimer_name,
+            "actualCards": card_names(self.actual_cards),
+            "claimWasTrue": self.claim_was_true,
+            "playerToRollDice": self.player_to_roll_dice,
+            "outcomeMessage": self.outcome_message,
+            "diceRollOutcome": self.dice_roll_outcome.to_wire() if self.dice_roll_outcome else None
+        }
+
+
+class GameState:
+    """
+    De volledige staat van één lobby. Zolang het spel niet gestart is, is 'turn_order' None
+    en bevat de staat alleen de spelers en de log.
+    """
+
+    __slots__ = ('lobby_code', 'players', 'log', 'turn_order', 'current_turn', 'deck_type', 'deck_sets',
+                 'pile', 'actual_pile_cards', 'last_claim', 'revealed', 'phase',
+                 'player_index', 'turn_ring', 'turn_ring_positions', 'rng', 'record')
+
+    def __init__(self, lobby_code, players, log):
+        self.lobby_code = lobby_code
+        self.players = players
+        self.log = log
+        self.turn_order = None
+        self.current_turn = None
+        self.deck_type = None # Kaartcode van de middenkaart
+        self.deck_sets = None # Aantal template sets in het deck van deze ronde (vastgelegd bij het delen)
+        self.pile = [] # Claims die publiek op de stapel liggen
+        self.actual_pile_cards = [] # Kaartcodes die werkelijk op de stapel liggen
+        self.last_claim = NO_CLAIM
+        self.revealed = RevealedCardsInfo()
+        self.phase = PHASE_WAITING
+        # Interne indexen, bijgehouden door game_logic (zie _rebuild_player_index)
+        self.player_index = None
+        self.turn_ring = ()
+        self.turn_ring_positions = {}
+        # Eigen random generator en GameRecord van het spel, gezet door create_new_game
+        self.rng = None
+        self.record = None
+
+    @property
+    def started(self):
+        """True als create_new_game het spel voor deze lobby geïnitialiseerd heeft."""
+        return self.turn_order is not None
+
+    def to_wire(self, viewer_id=None):
+        """
+        Retourneert de publieke staat in het formaat dat de frontend verwacht.
+        Alleen de hand van 'viewer_id' is zichtbaar. De log wordt apart toegevoegd
+        (zie project_shared_state in state_sync.py).
+        """
+        if not self.started:
+            return {
+                "lobbyCode": self.lobby_code,
+                "players": [p.to_wire(False, started=False) for p in self.players]
+            }
+        return {
+            "lobbyCode": self.lobby_code,
+            "deckType": [card_name(self.deck_type)],
+            "players": [p.to_wire(p.id == viewer_id) for p in self.players],
+            "turnOrder": list(self.turn_order),
+            "currentTurn": self.current_turn,
+            "pile": [claim.to_pile_wire() for claim in self.pile],
+            "actualPileCards": card_names(self.actual_pile_cards),
+            "lastClaimDetails": self.last_claim.to_wire(),
+            "revealedCardsInfo": self.revealed.to_wire(),
+            "phase": self.phase
+        }
+
+
+class GameRecord:
+    """
+    Alles wat nodig is om een spel exact opnieuw af te spelen (zie replay_game in game_logic.py):
+    de seed van de random generator, de spelers bij de start en de acties in volgorde.
+    """
+
+    __slots__ = ('lobby_code', 'seed', 'players', 'actions')
+
+    def __init__(self, lobby_code, seed, players, actions=None):
+        self.lobby_code = lobby_code
+        self.seed = seed
+        self.players = players # Tuple van (player_id, naam) in de volgorde bij de start
+        self.actions = actions if actions is not None else [] # Tuples (actie, player_id, kaartcodes of None)
+
+    def to_wire(self):
+        """Retourneert het record als JSON-compatibele dict (kaarten als codes)."""
+        return {
+            "lobbyCode": self.lobby_code,
+            "seed": self.seed,
+            "players": [list(player) for player in self.players],
+            "actions": [[action, player_id, list(cards) if cards is not None else None]
+                        for action, player_id, cards in self.actions]
+        }
+
+    @classmethod
+    def from_wire(cls, data):
+        """Maakt een GameRecord van een dict uit to_wire."""
+        return cls(
+            data["lobbyCode"],
+            data["seed"],
+            tuple((player_id, name) for player_id, name in data["players"]),
+            [(action, player_id, tuple(cards) if cards is not None else None)
+             for action, player_id, cards in data["actions"]]
+        )
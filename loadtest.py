@@ -0,0 +1,444 @@
+import argparse
+import asyncio
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+
+import socketio
+
+try:
+    import msgpack
+except ImportError: # Alleen nodig als de server met WIRE_ENCODING 'msgpack' draait
+    msgpack = None
+
+# --- Load test op socket niveau ---
+# Start de Flask-SocketIO app lokaal (of gebruik --url voor een draaiende server) en
+# speelt vele lobbies tegelijk af met echte socket.io clients. Elke client doorloopt
+# dezelfde events als de frontend (set_player_name, create_lobby, join_lobby,
+# start_game_request, make_play, call_liar, believe_claim, roll_dice, chat_message,
+# restart_game_request) en houdt de GameState bij uit snapshots en patches.
+#
+# Gemeten wordt de latency van een actie tot de eerstvolgende GameState update bij de
+# speler die de actie deed, hoeveel verbindingen opgezet konden worden, en het CPU- en
+# geheugengebruik van het serverproces (uit /proc, alleen als de load test de server zelf start).
+#
+# Gebruik:
+#   python loadtest.py --lobbies 500 --players 3 --actions 60
+#   python loadtest.py --url http://127.0.0.1:5000 --lobbies 100
+#
+# Vereist de asyncio client van python-socketio (pip install "python-socketio[asyncio_client]").
+
+DEFAULT_PORT = 5055
+ACTION_TIMEOUT = 10.0 # Seconden wachten op een GameState update na een actie
+CONNECT_TIMEOUT = 20.0
+SAMPLE_INTERVAL = 1.0 # Seconden tussen metingen van het serverproces
+
+
+class LoadStats:
+    """Verzamelt de metingen van alle gesimuleerde clients."""
+
+    def __init__(self):
+        self.action_latencies = [] # Seconden van actie tot GameState update
+        self.connect_latencies = []
+        self.connected = 0
+        self.connect_failures = 0
+        self.peak_connected = 0
+        self.open_connections = 0
+        self.actions = 0
+        self.timeouts = 0
+        self.error_messages = 0
+        self.games_started = 0
+        self.games_finished = 0
+        self.resyncs = 0
+        self.server_samples = [] # (tijdstip, cpu_procent, rss_bytes)
+
+    def connection_opened(self, latency):
+        self.connected += 1
+        self.open_connections += 1
+        self.peak_connected = max(self.peak_connected, self.open_connections)
+        self.connect_latencies.append(latency)
+
+    def connection_closed(self):
+        self.open_connections -= 1
+
+
+def _decode_payload(payload):
+    """Decodeert een binaire (MessagePack) payload; JSON payloads zijn al dicts."""
+    if isinstance(payload, (bytes, bytearray)):
+        if msgpack is None:
+            raise RuntimeError("De server stuurt MessagePack, installeer het 'msgpack' package.")
+        return msgpack.unpackb(payload)
+    return payload
+
+
+def _apply_patch(game_state, patch):
+    """Past een 'game_state_patch' toe zoals applyGameStatePatch in static/js/main.js."""
+    new_state = dict(game_state)
+    new_state.update(patch.get('set', {}))
+    for key in patch.get('unset', []):
+        new_state.pop(key, None)
+    if 'players' in patch:
+        new_state['players'] = [patch['players'].get(p['id'], p) for p in new_state['players']]
+    if 'logAppend' in patch:
+        new_state['log'] = (new_state['log'] + patch['logAppend'])[-200:]
+    new_state['revision'] = patch['revision']
+    return new_state
+
+
+class LoadClient:
+    """Eén gesimuleerde speler met een eigen socket.io verbinding."""
+
+    def __init__(self, url, name, stats):
+        self.url = url
+        self.name = name
+        self.stats = stats
+        self.sio = socketio.AsyncClient(reconnection=False)
+        self.game_state = None
+        self.lobby_code = None
+        self.state_event = asyncio.Event()
+        self.lobby_event = asyncio.Event()
+        self.name_event = asyncio.Event()
+        self.connected = False
+        self._register_handlers()
+
+    def _register_handlers(self):
+        sio = self.sio
+
+        @sio.on('name_set')
+        async def on_name_set(data):
+            self.name_event.set()
+
+        @sio.on('lobby_created')
+        async def on_lobby_created(data):
+            self.lobby_code = data['lobbyCode']
+            self.lobby_event.set()
+
+        @sio.on('lobby_joined')
+        async def on_lobby_joined(data):
+            self.lobby_code = data['lobbyCode']
+            self.lobby_event.set()
+
+        @sio.on('game_state_update')
+        async def on_game_state_update(payload):
+            snapshot = _decode_payload(payload)
+            if 'logBase' in snapshot and self.game_state:
+                snapshot = dict(snapshot)
+                snapshot['log'] = (self.game_state['log'] + snapshot['log'])[-200:]
+            self.game_state = snapshot
+            self.state_event.set()
+
+        @sio.on('game_state_patch')
+        async def on_game_state_patch(payload):
+            patch = _decode_payload(payload)
+            if not self.game_state or self.game_state.get('revision') != patch['baseRevision']:
+                # Revisie gemist: vraag een snapshot op, net als de frontend
+                self.stats.resyncs += 1
+                await sio.emit('request_game_state', {
+                    'lobbyCode': self.lobby_code,
+                    'logSeq': self.game_state.get('logSeq') if self.game_state else None
+                })
+                return
+            self.game_state = _apply_patch(self.game_state, patch)
+            self.state_event.set()
+
+        @sio.on('error_message')
+        async def on_error_message(data):
+            self.stats.error_messages += 1
+
+    @property
+    def sid(self):
+        return self.sio.get_sid()
+
+    async def connect(self):
+        started = time.perf_counter()
+        try:
+            await self.sio.connect(self.url, transports=['websocket'], wait_timeout=CONNECT_TIMEOUT)
+        except Exception:
+            self.stats.connect_failures += 1
+            return False
+        self.connected = True
+        self.stats.connection_opened(time.perf_counter() - started)
+        return True
+
+    async def disconnect(self):
+        if self.connected:
+            self.connected = False
+            await self.sio.disconnect()
+            self.stats.connection_closed()
+
+    async def wait_for_revision(self, revision):
+        """Wacht tot deze client minstens 'revision' van de GameState heeft."""
+        deadline = time.perf_counter() + ACTION_TIMEOUT
+        while not self.game_state or self.game_state.get('revision', 0) < revision:
+            self.state_event.clear()
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0 or not await _wait(self.state_event, remaining):
+                return False
+        return True
+
+    async def emit_and_wait(self, event, data):
+        """
+        Stuurt een actie en wacht op de eerstvolgende GameState update bij deze client.
+        Returns:
+            bool: True als er binnen ACTION_TIMEOUT een update kwam.
+        """
+        self.state_event.clear()
+        started = time.perf_counter()
+        await self.sio.emit(event, data)
+        try:
+            await asyncio.wait_for(self.state_event.wait(), ACTION_TIMEOUT)
+        except asyncio.TimeoutError:
+            self.stats.timeouts += 1
+            return False
+        self.stats.action_latencies.append(time.perf_counter() - started)
+        self.stats.actions += 1
+        return True
+
+
+async def _wait(event, timeout=ACTION_TIMEOUT):
+    try:
+        await asyncio.wait_for(event.wait(), timeout)
+        return True
+    except asyncio.TimeoutError:
+        return False
+
+
+async def run_lobby(url, lobby_index, args, stats, rng):
+    """Speelt één lobby af: aanmaken, joinen, starten, spelen en eventueel herstarten."""
+    clients = [LoadClient(url, f"L{lobby_index}P{seat}", stats) for seat in range(args.players)]
+    try:
+        for client in clients:
+            if not await client.connect():
+                return
+            await client.sio.emit('set_player_name', {'name': client.name})
+            if not await _wait(client.name_event):
+                return
+
+        host = clients[0]
+        await host.sio.emit('create_lobby')
+        if not await _wait(host.lobby_event):
+            return
+        for client in clients[1:]:
+            await client.sio.emit('join_lobby', {'lobbyCode': host.lobby_code})
+            if not await _wait(client.lobby_event):
+                return
+
+        if not await host.emit_and_wait('start_game_request', {'lobbyCode': host.lobby_code}):
+            return
+        stats.games_started += 1
+
+        clients_by_sid = {client.sid: client for client in clients}
+        for round_index in range(1 + args.restarts):
+            if round_index:
+                if not await host.emit_and_wait('restart_game_request', {'lobbyCode': host.lobby_code}):
+                    return
+                stats.games_started += 1
+            if not await play_game(host, clients_by_sid, args, stats, rng):
+                return
+    finally:
+        for client in clients:
+            await client.disconnect()
+
+
+async def play_game(host, clients_by_sid, args, stats, rng):
+    """
+    Speelt tot 'args.actions' acties of tot het spel voorbij is.
+    Returns:
+        bool: False als een actie geen antwoord kreeg (de lobby wordt dan afgebroken).
+    """
+    lobby_code = host.lobby_code
+    for _ in range(args.actions):
+        # Gebruik de nieuwste revisie die een van de clients heeft ontvangen
+        game_state = max(
+            (c.game_state for c in clients_by_sid.values() if c.game_state),
+            key=lambda state: state.get('revision', 0),
+            default=None
+        )
+        if not game_state or game_state.get('phase') == 'gameOver':
+            stats.games_finished += 1
+            return True
+        turn = game_state.get('currentTurn')
+        client = clients_by_sid.get(turn)
+        if client is None or not await client.wait_for_revision(game_state.get('revision', 0)):
+            return False
+
+        if rng.random() < args.chat_chance:
+            await client.sio.emit('chat_message', {'lobbyCode': lobby_code, 'message': 'gg'})
+
+        phase = client.game_state.get('phase')
+        if phase == 'awaitingPlay':
+            me = next(p for p in client.game_state['players'] if p['id'] == turn)
+            hand = list(me['hand'])
+            rng.shuffle(hand)
+            cards = hand[:rng.randint(1, min(3, len(hand)))] if hand else []
+            answered = await client.emit_and_wait('make_play', {'lobbyCode': lobby_code, 'cardsPlayed': cards})
+        elif phase == 'awaitingLiarCall':
+            event = 'call_liar' if rng.random() < 0.5 else 'believe_claim'
+            answered = await client.emit_and_wait(event, {'lobbyCode': lobby_code})
+        elif phase == 'resolvingDiceRoll':
+            answered = await client.emit_and_wait('roll_dice', {'lobbyCode': lobby_code, 'playerId': turn})
+        else:
+            return True
+        if not answered:
+            return False
+    return True
+
+
+async def hold_idle_connections(url, count, stats, stop_event):
+    """Houdt extra verbindingen open zonder te spelen, om de verbindingscapaciteit te testen."""
+    clients = []
+    for index in range(count):
+        client = LoadClient(url, f"idle{index}", stats)
+        if await client.connect():
+            clients.append(client)
+    await stop_event.wait()
+    for client in clients:
+        await client.disconnect()
+
+
+def _read_process_times(pid):
+    """Retourneert (cpu_seconden, rss_bytes) van een proces uit /proc, of None."""
+    try:
+        with open(f"/proc/{pid}/stat") as stat_file:
+            fields = stat_file.read().rsplit(')', 1)[1].split()
+        # utime en stime zijn velden 14 en 15 (hier index 11 en 12, na de naam)
+        cpu_seconds = (int(fields[11]) + int(fields[12])) / os.sysconf('SC_CLK_TCK')
+        with open(f"/proc/{pid}/status") as status_file:
+            for line in status_file:
+                if line.startswith('VmRSS:'):
+                    return cpu_seconds, int(line.split()[1]) * 1024
+    except (OSError, IndexError, ValueError):
+        pass
+    return None
+
+
+async def sample_server(pid, stats, stop_event):
+    """Meet periodiek het CPU-gebruik en geheugen van het serverproces."""
+    previous = _read_process_times(pid)
+    previous_time = time.perf_counter()
+    while not stop_event.is_set():
+        try:
+            await asyncio.wait_for(stop_event.wait(), SAMPLE_INTERVAL)
+        except asyncio.TimeoutError:
+            pass
+        current = _read_process_times(pid)
+        now = time.perf_counter()
+        if current and previous:
+            cpu_percent = (current[0] - previous[0]) / (now - previous_time) * 100
+            stats.server_samples.append((now, cpu_percent, current[1]))
+        previous, previous_time = current, now
+
+
+def start_server(port, wire_encoding):
+    """Start de app in een apart proces (zie --serve) en wacht tot deze verbindingen accepteert."""
+    command = [sys.executable, os.path.abspath(__file__), '--serve', '--port', str(port), '--wire-encoding', wire_encoding]
+    process = subprocess.Popen(command, stdout=subprocess.DEVNULL)
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError("De server is direct gestopt.")
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=0.5):
+                return process
+        except OSError:
+            time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError("De server accepteert geen verbindingen.")
+
+
+def serve(port, wire_encoding):
+    """Draait de app zonder debug/reloader, voor gebruik door de load test."""
+    from app import app, socketio as server_socketio
+    app.config['WIRE_ENCODING'] = wire_encoding
+    app.config['RATE_LIMITS_ENABLED'] = False # De load test speelt zo snel als de server toelaat
+    server_socketio.run(app, host='127.0.0.1', port=port, debug=False, allow_unsafe_werkzeug=True)
+
+
+def _percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))]
+
+
+def print_report(stats, duration):
+    latencies = sorted(stats.action_latencies)
+    connects = sorted(stats.connect_latencies)
+    print(f"Load test klaar in {duration:.1f}s")
+    print(f"  Verbindingen: {stats.connected} geopend, {stats.connect_failures} mislukt, piek {stats.peak_connected} tegelijk")
+    print(f"  Connect tijd (ms): p50={_percentile(connects, 0.5) * 1e3:.1f} p99={_percentile(connects, 0.99) * 1e3:.1f}")
+    print(f"  Spellen: {stats.games_started} gestart, {stats.games_finished} uitgespeeld")
+    print(f"  Acties: {stats.actions} ({stats.actions / duration if duration else 0:.1f}/s), "
+          f"{stats.timeouts} zonder antwoord, {stats.error_messages} foutmeldingen, {stats.resyncs} resyncs")
+    print(f"  Actie -> GameState latency (ms): p50={_percentile(latencies, 0.5) * 1e3:.1f} "
+          f"p90={_percentile(latencies, 0.9) * 1e3:.1f} p99={_percentile(latencies, 0.99) * 1e3:.1f} "
+          f"max={(latencies[-1] if latencies else 0) * 1e3:.1f}")
+    if stats.server_samples:
+        cpu = [sample[1] for sample in stats.server_samples]
+        rss = [sample[2] for sample in stats.server_samples]
+        print(f"  Server CPU: gemiddeld {sum(cpu) / len(cpu):.0f}%, piek {max(cpu):.0f}%")
+        print(f"  Server geheugen (RSS): eind {rss[-1] / 2**20:.1f} MiB, piek {max(rss) / 2**20:.1f} MiB")
+
+
+async def run_load_test(args):
+    stats = LoadStats()
+    process = None
+    url = args.url
+    if not url:
+        process = start_server(args.port, args.wire_encoding)
+        url = f"http://127.0.0.1:{args.port}"
+
+    stop_event = asyncio.Event()
+    background = []
+    if process:
+        background.append(asyncio.ensure_future(sample_server(process.pid, stats, stop_event)))
+    if args.idle_connections:
+        background.append(asyncio.ensure_future(hold_idle_connections(url, args.idle_connections, stats, stop_event)))
+
+    started = time.perf_counter()
+    try:
+        rng = random.Random(args.seed)
+        lobby_tasks = []
+        for lobby_index in range(args.lobbies):
+            lobby_rng = random.Random(rng.random())
+            lobby_tasks.append(asyncio.ensure_future(run_lobby(url, lobby_index, args, stats, lobby_rng)))
+            if args.ramp:
+                # Spreid het opzetten van lobbies over de tijd (lobbies per seconde)
+                await asyncio.sleep(1.0 / args.ramp)
+        await asyncio.gather(*lobby_tasks, return_exceptions=True)
+    finally:
+        duration = time.perf_counter() - started
+        stop_event.set()
+        await asyncio.gather(*background, return_exceptions=True)
+        if process:
+            process.terminate()
+            process.wait()
+    print_report(stats, duration)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test van de Liar's Bar server met echte socket.io clients.")
+    parser.add_argument('--url', help="URL van een draaiende server; zonder deze optie wordt de app lokaal gestart.")
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help="Poort voor de lokaal gestarte server.")
+    parser.add_argument('--wire-encoding', default='json', help="WIRE_ENCODING van de lokaal gestarte server.")
+    parser.add_argument('--lobbies', type=int, default=100, help="Aantal lobbies dat tegelijk speelt.")
+    parser.add_argument('--players', type=int, default=3, choices=(2, 3, 4), help="Spelers per lobby.")
+    parser.add_argument('--actions', type=int, default=60, help="Maximaal aantal acties per spel.")
+    parser.add_argument('--restarts', type=int, default=1, help="Aantal herstarts per lobby na het eerste spel.")
+    parser.add_argument('--chat-chance', type=float, default=0.05, help="Kans op een chatbericht per actie.")
+    parser.add_argument('--ramp', type=float, default=50.0, help="Nieuwe lobbies per seconde (0 = allemaal tegelijk).")
+    parser.add_argument('--idle-connections', type=int, default=0, help="Extra verbindingen die alleen open blijven.")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--serve', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args.port, args.wire_encoding)
+        return
+    asyncio.run(run_load_test(args))
+
+
+if __name__ == '__main__':
+    main()
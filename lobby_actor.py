@@ -0,0 +1,78 @@
+import threading
+import traceback
+from collections import deque
+
+from server_log import log_to_stderr
+
+# --- Per lobby een geserialiseerde event wachtrij (actor/mailbox) ---
+# Events voor dezelfde lobby mogen nooit tegelijk de GameState wijzigen (denk aan twee
+# spelers die tegelijk 'LIAR!' roepen en de claim geloven). Elke lobby heeft daarom een
+# mailbox: events worden in volgorde van binnenkomst één voor één verwerkt, terwijl
+# verschillende lobbies volledig parallel lopen.
+#
+# Er zijn geen vaste threads per lobby. De thread die een event aflevert bij een lege
+# mailbox verwerkt de mailbox zelf leeg; threads die een event afleveren terwijl de lobby
+# bezig is, zetten het event alleen in de wachtrij en zijn direct weer vrij. Zo werkt dit
+# met elke async_mode (threading, eventlet, gevent) en blokkeert er nooit een thread
+# op een andere lobby.
+
+
+class LobbyActors:
+    """
+    Houdt de mailboxen bij van alle lobbies waarvoor op dit moment events verwerkt worden.
+    Args:
+        run_job (callable): Optioneel; run_job(lobby_code, job) voert een job uit, bijv. om
+                            hem te traceren (zie profiler.LobbyTracer). Standaard job().
+        log (callable): log(niveau, event, lobby, **velden) voor fouten in een job (zie ServerLog.log).
+    """
+
+    def __init__(self, run_job=None, log=log_to_stderr):
+        self._mailboxes = {} # { "lobby_code": deque van wachtende jobs }, alleen voor actieve lobbies
+        self._guard = threading.Lock()
+        self._run_job = run_job
+        self._log = log
+
+    def submit(self, lobby_code, job):
+        """
+        Levert een job (een functie zonder argumenten) af bij de mailbox van een lobby.
+        Returns:
+            bool: True als de job direct in deze thread is uitgevoerd, False als hij in de
+                  wachtrij staat en door de thread die de lobby al verwerkt wordt uitgevoerd.
+        """
+        with self._guard:
+            mailbox = self._mailboxes.get(lobby_code)
+            if mailbox is not None:
+                mailbox.append(job)
+                return False
+            self._mailboxes[lobby_code] = deque()
+        self._drain(lobby_code, job)
+        return True
+
+    def _drain(self, lobby_code, job):
+        """Voert de job uit en daarna alle jobs die intussen voor deze lobby binnengekomen zijn."""
+        while True:
+            try:
+                if self._run_job is None:
+                    job()
+                else:
+                    self._run_job(lobby_code, job)
+            except Exception as error:
+                # Een fout in één event mag de rest van de mailbox niet blokkeren
+                self._log('error', 'lobby_job_failed', lobby_code, error=repr(error), traceback=traceback.format_exc())
+            with self._guard:
+                mailbox = self._mailboxes[lobby_code]
+                if not mailbox:
+                    del self._mailboxes[lobby_code]
+                    return
+                job = mailbox.popleft()
+
+    def pending(self, lobby_code):
+        """Retourneert het aantal jobs dat voor een lobby in de wachtrij staat."""
+        with self._guard:
+            mailbox = self._mailboxes.get(lobby_code)
+            return len(mailbox) if mailbox is not None else 0
+
+    def active_lobbies(self):
+        """Retourneert het aantal lobbies waarvoor op dit moment een event verwerkt wordt."""
+        with self._guard:
+            return len(self._mailboxes)
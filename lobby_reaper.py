@@ -0,0 +1,156 @@
+import threading
+import time
+from collections import OrderedDict
+
+from game_model import PHASE_WAITING
+
+# --- Opruimen van inactieve lobbies en een geheugenbudget ---
+# Een lobby die niemand meer gebruikt (iedereen heeft het tabblad open laten staan, of een
+# spel is afgelopen en niemand herstart het) bleef tot nu toe voor altijd in het geheugen.
+# De reaper houdt per lobby bij wanneer er voor het laatst een event was en in welke fase
+# de lobby toen zat. Elke REAPER_INTERVAL seconden (een taak op de timer wheel van de bots)
+# worden lobbies die langer dan de TTL van hun fase stil liggen verwijderd.
+#
+# Daarnaast is er een optioneel geheugenbudget voor alle lobbies van deze worker samen. De
+# grootte van een lobby wordt geschat door de lobby store (zie size_of in lobby_store.py); alleen
+# lobbies die sinds de vorige meting een event hadden worden opnieuw gemeten. Zit de worker
+# boven het budget, dan worden de lobbies die het langst niets gedaan hebben als eerste
+# verwijderd (LRU), tot het totaal weer binnen het budget valt.
+#
+# De reaper beslist alleen welke lobbies weg moeten; het meten en verwijderen zelf gebeurt in
+# app.py, via de mailbox van de lobby en onder zijn lock, net als elk ander event.
+
+DEFAULT_REAPER_INTERVAL = 30.0 # Seconden tussen twee rondes van de reaper
+# Seconden zonder events voordat een lobby verwijderd wordt, per fase. 'default' geldt voor
+# de fasen van een lopend spel.
+DEFAULT_IDLE_TTLS = {
+    PHASE_WAITING: 30 * 60,
+    'gameOver': 10 * 60,
+    'default': 2 * 60 * 60,
+}
+
+EVICT_IDLE = 'idle' # Langer dan de TTL van zijn fase geen events
+EVICT_MEMORY = 'memory' # Verwijderd om binnen het geheugenbudget te blijven
+
+
+class _LobbyActivity:
+    """Wat de reaper van één lobby bijhoudt."""
+
+    __slots__ = ('last_active', 'phase', 'size', 'measured')
+
+    def __init__(self, last_active, phase):
+        self.last_active = last_active
+        self.phase = phase
+        self.size = 0 # Geschatte grootte in bytes (0 tot de eerste meting)
+        self.measured = False # False als de lobby sinds de laatste meting een event had
+
+
+class LobbyReaper:
+    """
+    Houdt de activiteit van de lobbies van deze worker bij en kiest welke lobbies opgeruimd worden.
+    Args:
+        idle_ttls (dict): Seconden zonder events per fase (zie DEFAULT_IDLE_TTLS); ontbrekende fasen
+                          krijgen de standaardwaarde. Een TTL van None of 0 betekent nooit verwijderen.
+        memory_budget (int): Maximaal geschat aantal bytes voor alle lobbies samen, of None voor geen budget.
+        clock (callable): Klok in seconden (monotoon).
+    """
+
+    def __init__(self, idle_ttls=None, memory_budget=None, clock=time.monotonic):
+        self.idle_ttls = dict(DEFAULT_IDLE_TTLS)
+        self.idle_ttls.update(idle_ttls or {})
+        self.memory_budget = memory_budget
+        self._clock = clock
+        self._lobbies = OrderedDict() # { "lobby_code": _LobbyActivity }, minst recent actief eerst
+        self._guard = threading.Lock()
+        self.evictions = {EVICT_IDLE: 0, EVICT_MEMORY: 0}
+
+    def touch(self, lobby_code, phase):
+        """Registreert een event voor een lobby (de lobby zit nu in 'phase')."""
+        now = self._clock()
+        with self._guard:
+            activity = self._lobbies.get(lobby_code)
+            if activity is None:
+                self._lobbies[lobby_code] = _LobbyActivity(now, phase)
+                return
+            activity.last_active = now
+            activity.phase = phase
+            activity.measured = False
+            self._lobbies.move_to_end(lobby_code)
+
+    def forget(self, lobby_code):
+        """Vergeet een lobby die verwijderd is."""
+        with self._guard:
+            self._lobbies.pop(lobby_code, None)
+
+    def last_active(self, lobby_code):
+        """Retourneert het tijdstip van het laatste event van een lobby, of None als de reaper hem niet kent."""
+        with self._guard:
+            activity = self._lobbies.get(lobby_code)
+            return activity.last_active if activity else None
+
+    def unmeasured(self):
+        """Retourneert de lobbies die sinds de laatste meting een event hadden (alleen met een budget)."""
+        if not self.memory_budget:
+            return []
+        with self._guard:
+            return [code for code, activity in self._lobbies.items() if not activity.measured]
+
+    def set_size(self, lobby_code, size):
+        """Slaat de gemeten grootte van een lobby op."""
+        with self._guard:
+            activity = self._lobbies.get(lobby_code)
+            if activity is not None:
+                activity.size = size
+                activity.measured = True
+
+    def candidates(self):
+        """
+        Kiest de lobbies die opgeruimd moeten worden: eerst alle lobbies die langer dan de TTL
+        van hun fase stil liggen, daarna (boven het budget) de minst recent actieve lobbies.
+        Returns:
+            list: (lobbycode, reden, laatste activiteit) per lobby. De activiteit wordt bij het
+                  verwijderen nagekeken: een lobby die intussen een event had, blijft bestaan.
+        """
+        now = self._clock()
+        chosen = []
+        with self._guard:
+            total_size = 0
+            for lobby_code, activity in self._lobbies.items():
+                ttl = self.idle_ttls.get(activity.phase, self.idle_ttls['default'])
+                if ttl and now - activity.last_active >= ttl:
+                    chosen.append((lobby_code, EVICT_IDLE, activity.last_active))
+                else:
+                    total_size += activity.size
+            if self.memory_budget and total_size > self.memory_budget:
+                idle = {lobby_code for lobby_code, _, _ in chosen}
+                for lobby_code, activity in self._lobbies.items(): # Minst recent actief eerst
+                    if total_size <= self.memory_budget:
+                        break
+                    if lobby_code not in idle:
+                        chosen.append((lobby_code, EVICT_MEMORY, activity.last_active))
+                        total_size -= activity.size
+        return chosen
+
+    def record_eviction(self, lobby_code, reason):
+        """Vergeet een opgeruimde lobby en telt hem mee in de statistieken."""
+        with self._guard:
+            self._lobbies.pop(lobby_code, None)
+            self.evictions[reason] = self.evictions.get(reason, 0) + 1
+
+    def stats(self):
+        """
+        Returns:
+            dict: Aantal lobbies (per fase), hun geschatte grootte, het budget en het aantal
+                  opgeruimde lobbies per reden.
+        """
+        with self._guard:
+            by_phase = {}
+            for activity in self._lobbies.values():
+                by_phase[activity.phase] = by_phase.get(activity.phase, 0) + 1
+            return {
+                "lobbies": len(self._lobbies),
+                "lobbiesByPhase": by_phase,
+                "estimatedBytes": sum(activity.size for activity in self._lobbies.values()),
+                "memoryBudget": self.memory_budget,
+                "evictions": dict(self.evictions),
+            }
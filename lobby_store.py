@@ -0,0 +1,319 @@
+import pickle
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+try:
+    import redis
+except ImportError: # Optionele dependency, alleen nodig voor een gedeelde Redis store
+    redis = None
+
+# --- Opslag van lobbies ---
+# Alle lobbies (GameState plus revisiestroom) en de socket -> lobby index staan in een
+# lobby store. De standaard store houdt alles in het geheugen van één proces. Met een
+# gedeelde store (Redis, of een compatibele server) kunnen meerdere worker processen
+# dezelfde lobbies bedienen: elke worker kan een event voor elke lobby verwerken.
+# Een worker vergrendelt de lobby, laadt het record, wijzigt het en slaat het weer op.
+#
+# LOBBY_STORE_URL:
+#   None of 'memory://'  - in het geheugen van dit proces (standaard)
+#   'local://'           - gedeelde store code met LocalRedis als stand-in (één proces, voor tests)
+#   'redis://...'        - gedeelde store in Redis (vereist het 'redis' package)
+
+DEFAULT_KEY_PREFIX = 'liarsbar'
+DEFAULT_LOCK_TIMEOUT = 10.0 # Seconden dat een lock maximaal vastgehouden wordt (vangnet bij een gecrashte worker)
+DEFAULT_ACQUIRE_TIMEOUT = 5.0 # Seconden wachten op een lock voordat het event opgegeven wordt
+_LOCK_RETRY_INTERVAL = 0.005
+
+# Geschatte bytes per onderdeel van een lobby, voor InMemoryLobbyStore.size_of. Gemeten aan de
+# hand van gepickelde LobbyRecords van gesimuleerde spellen (binnen een paar procent).
+_LOBBY_BYTES = 5000 # GameState en revisiestroom zonder spelers, log en acties
+_PLAYER_BYTES = 50
+_LOG_ENTRY_BYTES = 43
+_RECORD_ACTION_BYTES = 21
+
+# Lua scripts voor de lock, zodat controleren en wijzigen één atomaire stap in Redis is.
+# Zonder script kan de lock tussen GET en DELETE (of SET) verlopen en door een andere worker
+# genomen worden, die dan zijn lock kwijtraakt of een nieuwere versie overschreven ziet.
+# KEYS[1] = lock key, ARGV[1] = token van de houder.
+_RELEASE_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+# KEYS[2] = lobby key, ARGV[2] = gepickeld record
+_SAVE_IF_LOCKED_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    redis.call('set', KEYS[2], ARGV[2])
+    return 1
+end
+return 0
+"""
+
+
+class LobbyLockError(Exception):
+    """De lock van een lobby kon niet op tijd verkregen worden, of is verlopen voordat het record opgeslagen was."""
+
+
+class LobbyRecord:
+    """Alles wat bij één lobby hoort: de GameState en de revisiestroom naar de clients."""
+
+    __slots__ = ('game_state', 'stream')
+
+    def __init__(self, game_state, stream):
+        self.game_state = game_state
+        self.stream = stream
+
+    def __getstate__(self):
+        return (self.game_state, self.stream)
+
+    def __setstate__(self, state):
+        self.game_state, self.stream = state
+
+
+class InMemoryLobbyStore:
+    """Lobby store in het geheugen van één proces. Records worden niet gekopieerd."""
+
+    shared = False
+
+    def __init__(self):
+        self._lobbies = {}
+        self._player_lobbies = {} # Reverse index van socket naar lobby: { "sid": "lobby_code" }
+        self._locks = {}
+        self._locks_guard = threading.Lock()
+
+    @contextmanager
+    def lock(self, lobby_code):
+        """Vergrendelt een lobby, zodat events voor dezelfde lobby na elkaar verwerkt worden."""
+        with self._locks_guard:
+            lobby_lock = self._locks.get(lobby_code)
+            if lobby_lock is None:
+                lobby_lock = self._locks[lobby_code] = threading.RLock()
+        with lobby_lock:
+            yield
+
+    def load(self, lobby_code):
+        return self._lobbies.get(lobby_code)
+
+    def save(self, lobby_code, record):
+        self._lobbies[lobby_code] = record
+
+    def add(self, lobby_code, record):
+        """Voegt een nieuwe lobby toe. Retourneert False als de code al in gebruik is."""
+        return self._lobbies.setdefault(lobby_code, record) is record
+
+    def delete(self, lobby_code):
+        self._lobbies.pop(lobby_code, None)
+        with self._locks_guard:
+            self._locks.pop(lobby_code, None)
+
+    def exists(self, lobby_code):
+        return lobby_code in self._lobbies
+
+    def size_of(self, lobby_code):
+        """
+        Geschatte grootte van een lobby in bytes (0 als hij niet bestaat). Het record wordt niet
+        gepickeld: de schatting telt alleen spelers, logregels en acties, met vaste kosten per stuk.
+        """
+        record = self._lobbies.get(lobby_code)
+        if record is None:
+            return 0
+        game_state = record.game_state
+        actions = len(game_state.record.actions) if game_state.record else 0
+        return (_LOBBY_BYTES + _PLAYER_BYTES * len(game_state.players)
+                + _LOG_ENTRY_BYTES * len(game_state.log) + _RECORD_ACTION_BYTES * actions)
+
+    def lobby_codes(self):
+        return list(self._lobbies)
+
+    def lobby_of(self, sid):
+        return self._player_lobbies.get(sid)
+
+    def set_lobby_of(self, sid, lobby_code):
+        self._player_lobbies[sid] = lobby_code
+
+    def pop_lobby_of(self, sid):
+        return self._player_lobbies.pop(sid, None)
+
+
+class RedisLobbyStore:
+    """
+    Gedeelde lobby store in Redis. Records worden gepickled opgeslagen; een lobby wordt
+    vergrendeld met een lock key (SET NX PX) zodat maar één worker tegelijk een lobby wijzigt.
+    Een record van een vergrendelde lobby wordt alleen opgeslagen als de lock nog van deze
+    worker is; is hij verlopen (de handler duurde langer dan lock_timeout), dan faalt de save.
+    Gebruikt alleen GET, SET, DELETE, SCAN_ITER en EVAL (met de scripts hierboven), zodat
+    LocalRedis als stand-in kan dienen.
+    """
+
+    shared = True
+
+    def __init__(self, client, prefix=DEFAULT_KEY_PREFIX, lock_timeout=DEFAULT_LOCK_TIMEOUT,
+                 acquire_timeout=DEFAULT_ACQUIRE_TIMEOUT):
+        self.client = client
+        self.prefix = prefix
+        self.lock_timeout = lock_timeout
+        self.acquire_timeout = acquire_timeout
+        self._tokens = {} # { "lobby_code": token } van de locks die deze worker nu vasthoudt
+
+    def _lobby_key(self, lobby_code):
+        return f"{self.prefix}:lobby:{lobby_code}"
+
+    def _lock_key(self, lobby_code):
+        return f"{self.prefix}:lock:{lobby_code}"
+
+    def _sid_key(self, sid):
+        return f"{self.prefix}:sid:{sid}"
+
+    @contextmanager
+    def lock(self, lobby_code):
+        lock_key = self._lock_key(lobby_code)
+        token = uuid.uuid4().hex
+        deadline = time.monotonic() + self.acquire_timeout
+        while not self.client.set(lock_key, token, nx=True, px=int(self.lock_timeout * 1000)):
+            if time.monotonic() >= deadline:
+                raise LobbyLockError(f"Lobby {lobby_code} is bezet.")
+            time.sleep(_LOCK_RETRY_INTERVAL)
+        self._tokens[lobby_code] = token
+        try:
+            yield
+        finally:
+            self._tokens.pop(lobby_code, None)
+            # Alleen vrijgeven als de lock nog van ons is (hij kan verlopen zijn)
+            self.client.eval(_RELEASE_SCRIPT, 1, lock_key, token)
+
+    def load(self, lobby_code):
+        blob = self.client.get(self._lobby_key(lobby_code))
+        return pickle.loads(blob) if blob is not None else None
+
+    def save(self, lobby_code, record):
+        blob = pickle.dumps(record, pickle.HIGHEST_PROTOCOL)
+        token = self._tokens.get(lobby_code)
+        if token is None: # Niet vergrendeld door deze worker
+            self.client.set(self._lobby_key(lobby_code), blob)
+            return
+        if not self.client.eval(_SAVE_IF_LOCKED_SCRIPT, 2, self._lock_key(lobby_code), self._lobby_key(lobby_code), token, blob):
+            raise LobbyLockError(f"De lock van lobby {lobby_code} is verlopen; het record is niet opgeslagen.")
+
+    def add(self, lobby_code, record):
+        return bool(self.client.set(self._lobby_key(lobby_code), pickle.dumps(record, pickle.HIGHEST_PROTOCOL), nx=True))
+
+    def delete(self, lobby_code):
+        self.client.delete(self._lobby_key(lobby_code))
+
+    def exists(self, lobby_code):
+        return self.client.get(self._lobby_key(lobby_code)) is not None
+
+    def size_of(self, lobby_code):
+        blob = self.client.get(self._lobby_key(lobby_code))
+        return len(blob) if blob is not None else 0
+
+    def lobby_codes(self):
+        prefix = self._lobby_key('')
+        return [_as_text(key)[len(prefix):] for key in self.client.scan_iter(match=prefix + '*')]
+
+    def lobby_of(self, sid):
+        return _as_text(self.client.get(self._sid_key(sid)))
+
+    def set_lobby_of(self, sid, lobby_code):
+        self.client.set(self._sid_key(sid), lobby_code)
+
+    def pop_lobby_of(self, sid):
+        lobby_code = self.lobby_of(sid)
+        self.client.delete(self._sid_key(sid))
+        return lobby_code
+
+
+def _as_text(value):
+    """Redis clients retourneren bytes; zet deze om naar str."""
+    if isinstance(value, bytes):
+        return value.decode('utf-8')
+    return value
+
+
+class LocalRedis:
+    """
+    Minimale stand-in voor een Redis client in het geheugen van één proces, met alleen
+    de commando's die RedisLobbyStore gebruikt. Bedoeld voor tests en lokaal ontwikkelen.
+    """
+
+    def __init__(self):
+        self._data = {}
+        self._expires = {}
+        self._guard = threading.Lock()
+
+    def _expire_if_needed(self, key):
+        expires_at = self._expires.get(key)
+        if expires_at is not None and time.monotonic() >= expires_at:
+            self._data.pop(key, None)
+            self._expires.pop(key, None)
+
+    def get(self, key):
+        with self._guard:
+            self._expire_if_needed(key)
+            return self._data.get(key)
+
+    def set(self, key, value, nx=False, px=None):
+        if isinstance(value, str):
+            value = value.encode('utf-8')
+        with self._guard:
+            self._expire_if_needed(key)
+            if nx and key in self._data:
+                return None
+            self._data[key] = value
+            if px is not None:
+                self._expires[key] = time.monotonic() + px / 1000
+            else:
+                self._expires.pop(key, None)
+            return True
+
+    def delete(self, *keys):
+        with self._guard:
+            removed = 0
+            for key in keys:
+                self._expires.pop(key, None)
+                if self._data.pop(key, None) is not None:
+                    removed += 1
+            return removed
+
+    def eval(self, script, numkeys, *keys_and_args):
+        """Voert een van de Lua scripts van RedisLobbyStore uit (andere scripts worden niet ondersteund)."""
+        if script not in (_RELEASE_SCRIPT, _SAVE_IF_LOCKED_SCRIPT):
+            raise NotImplementedError("LocalRedis ondersteunt alleen de scripts van RedisLobbyStore.")
+        keys, args = keys_and_args[:numkeys], keys_and_args[numkeys:]
+        args = [arg.encode('utf-8') if isinstance(arg, str) else arg for arg in args]
+        with self._guard:
+            self._expire_if_needed(keys[0])
+            if self._data.get(keys[0]) != args[0]:
+                return 0
+            if script == _RELEASE_SCRIPT:
+                self._data.pop(keys[0], None)
+                self._expires.pop(keys[0], None)
+                return 1
+            self._data[keys[1]] = args[1] # _SAVE_IF_LOCKED_SCRIPT
+            self._expires.pop(keys[1], None)
+            return 1
+
+    def scan_iter(self, match=None):
+        prefix = match[:-1] if match and match.endswith('*') else match
+        with self._guard:
+            keys = list(self._data)
+        for key in keys:
+            if prefix is None or key.startswith(prefix):
+                if self.get(key) is not None:
+                    yield key
+
+
+def create_lobby_store(url=None):
+    """Maakt de lobby store voor LOBBY_STORE_URL (zie bovenaan dit bestand)."""
+    if not url or url == 'memory://':
+        return InMemoryLobbyStore()
+    if url == 'local://':
+        return RedisLobbyStore(LocalRedis())
+    if url.startswith(('redis://', 'rediss://', 'unix://')):
+        if redis is None:
+            raise RuntimeError("LOBBY_STORE_URL wijst naar Redis, maar het 'redis' package is niet geïnstalleerd.")
+        return RedisLobbyStore(redis.Redis.from_url(url))
+    raise ValueError(f"Onbekende LOBBY_STORE_URL '{url}'.")
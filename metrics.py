@@ -0,0 +1,228 @@
+import bisect
+import math
+import threading
+
+# --- Metrics in het Prometheus tekstformaat ---
+# Tellers, gauges en histogrammen voor /metrics, zonder extra dependency. Ze zijn gemaakt
+# om in de hot path (elk Socket.IO event, elke broadcast) te staan:
+#   - per combinatie van labels wordt één keer een 'child' aangemaakt en gecachet;
+#   - een histogram heeft vaste buckets met een vooraf gealloceerde lijst tellers, een
+#     observatie is een bisect plus twee optellingen onder een lock.
+# Gauges waarvan de waarde al ergens anders bijgehouden wordt (aantal lobbies per fase,
+# actieve mailboxen) lezen die pas uit als /metrics opgevraagd wordt.
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Seconden; van 100 µs (een gewone zet) tot seconden (een vastgelopen lock)
+DEFAULT_LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+# Bytes per payload
+DEFAULT_SIZE_BUCKETS = (128, 256, 512, 1024, 2048, 4096, 8192, 16384, 65536)
+
+
+class _CounterChild:
+    __slots__ = ('value', '_guard')
+
+    def __init__(self):
+        self.value = 0
+        self._guard = threading.Lock()
+
+    def inc(self, amount=1):
+        with self._guard:
+            self.value += amount
+
+
+class _GaugeChild(_CounterChild):
+    __slots__ = ()
+
+    def dec(self, amount=1):
+        with self._guard:
+            self.value -= amount
+
+    def set(self, value):
+        self.value = value
+
+
+class _HistogramChild:
+    __slots__ = ('_upper_bounds', '_counts', '_sum', '_guard')
+
+    def __init__(self, upper_bounds):
+        self._upper_bounds = upper_bounds
+        self._counts = [0] * (len(upper_bounds) + 1) # Laatste bucket is +Inf
+        self._sum = 0.0
+        self._guard = threading.Lock()
+
+    def observe(self, value):
+        index = bisect.bisect_left(self._upper_bounds, value)
+        with self._guard:
+            self._counts[index] += 1
+            self._sum += value
+
+    def snapshot(self):
+        """Retourneert (cumulatieve tellers per bucket, som, aantal)."""
+        with self._guard:
+            counts = list(self._counts)
+            total = self._sum
+        cumulative = []
+        running = 0
+        for count in counts:
+            running += count
+            cumulative.append(running)
+        return cumulative, total, running
+
+
+class _Metric:
+    """Basis van een metric met (optionele) labels."""
+
+    metric_type = None
+    child_class = None
+
+    def __init__(self, name, documentation, label_names=()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self._children = {} # { (labelwaarden): child }
+        self._guard = threading.Lock()
+        self._unlabelled = self._new_child() if not self.label_names else None
+
+    def _new_child(self):
+        return self.child_class()
+
+    def labels(self, *values):
+        """Retourneert de child voor deze labelwaarden (één keer aangemaakt, daarna uit de cache)."""
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.label_names):
+                raise ValueError(f"{self.name} verwacht de labels {', '.join(self.label_names)}.")
+            with self._guard:
+                child = self._children.setdefault(values, self._new_child())
+        return child
+
+    def _items(self):
+        if self._unlabelled is not None:
+            return [((), self._unlabelled)]
+        with self._guard:
+            return list(self._children.items())
+
+    def render(self, lines):
+        lines.append(f"# HELP {self.name} {self.documentation}")
+        lines.append(f"# TYPE {self.name} {self.metric_type}")
+        for values, child in self._items():
+            lines.append(f"{self.name}{_format_labels(self.label_names, values)} {_format_value(child.value)}")
+
+
+class Counter(_Metric):
+    """Een teller die alleen oploopt."""
+
+    metric_type = 'counter'
+    child_class = _CounterChild
+
+    def inc(self, amount=1):
+        self._unlabelled.inc(amount)
+
+
+class Gauge(_Metric):
+    """
+    Een waarde die op en neer kan gaan.
+    Args:
+        collect (callable): Optioneel; collect() retourneert { (labelwaarden): waarde } en wordt
+                            pas bij het opvragen van /metrics aangeroepen.
+    """
+
+    metric_type = 'gauge'
+    child_class = _GaugeChild
+
+    def __init__(self, name, documentation, label_names=(), collect=None):
+        super().__init__(name, documentation, label_names)
+        self._collect = collect
+
+    def inc(self, amount=1):
+        self._unlabelled.inc(amount)
+
+    def dec(self, amount=1):
+        self._unlabelled.dec(amount)
+
+    def set(self, value):
+        self._unlabelled.set(value)
+
+    def render(self, lines):
+        if self._collect is None:
+            super().render(lines)
+            return
+        lines.append(f"# HELP {self.name} {self.documentation}")
+        lines.append(f"# TYPE {self.name} {self.metric_type}")
+        for values, value in self._collect().items():
+            lines.append(f"{self.name}{_format_labels(self.label_names, values)} {_format_value(value)}")
+
+
+class Histogram(_Metric):
+    """Een verdeling van waarden over vaste buckets (plus som en aantal)."""
+
+    metric_type = 'histogram'
+
+    def __init__(self, name, documentation, label_names=(), buckets=DEFAULT_LATENCY_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, label_names)
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value):
+        self._unlabelled.observe(value)
+
+    def render(self, lines):
+        lines.append(f"# HELP {self.name} {self.documentation}")
+        lines.append(f"# TYPE {self.name} {self.metric_type}")
+        bounds = [_format_value(bound) for bound in self.buckets] + ['+Inf']
+        for values, child in self._items():
+            cumulative, total, count = child.snapshot()
+            for bound, bucket_count in zip(bounds, cumulative):
+                labels = _format_labels(self.label_names + ('le',), values + (bound,))
+                lines.append(f"{self.name}_bucket{labels} {bucket_count}")
+            labels = _format_labels(self.label_names, values)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {count}")
+
+
+class MetricsRegistry:
+    """Verzameling metrics die samen op /metrics getoond worden."""
+
+    def __init__(self):
+        self._metrics = []
+
+    def counter(self, name, documentation, label_names=()):
+        return self._register(Counter(name, documentation, label_names))
+
+    def gauge(self, name, documentation, label_names=(), collect=None):
+        return self._register(Gauge(name, documentation, label_names, collect))
+
+    def histogram(self, name, documentation, label_names=(), buckets=DEFAULT_LATENCY_BUCKETS):
+        return self._register(Histogram(name, documentation, label_names, buckets))
+
+    def _register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self):
+        """Retourneert alle metrics in het Prometheus tekstformaat."""
+        lines = []
+        for metric in self._metrics:
+            metric.render(lines)
+        return '\n'.join(lines) + '\n'
+
+
+def _format_labels(names, values):
+    if not names:
+        return ''
+    pairs = []
+    for name, value in zip(names, values):
+        escaped = str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+        pairs.append(f'{name}="{escaped}"')
+    return '{' + ','.join(pairs) + '}'
+
+
+def _format_value(value):
+    if isinstance(value, float):
+        if math.isinf(value):
+            return '+Inf' if value > 0 else '-Inf'
+        return repr(value)
+    return str(value)
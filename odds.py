@@ -0,0 +1,127 @@
+import random
+import zlib
+from functools import lru_cache
+
+from game_logic import FULL_DECK_TEMPLATE, HAND_SIZE, _claim_is_true
+from game_model import JOKER
+from odds_table import exact_dice_elimination_probability, get_odds_table
+
+try:
+    import numpy
+except ImportError: # Optionele dependency
+    numpy = None
+
+# --- Schatting van de kans dat de laatste claim een leugen is ---
+# Op basis van wat een speler (of toeschouwer) kan weten: de middenkaart, de claims op de
+# stapel, de samenstelling van het deck en de eigen kaarten. De verborgen hand van de
+# claimer wordt vele keren willekeurig getrokken uit de kaarten die de kijker niet kent
+# (Monte Carlo). Per trekking wordt gekeken of de claimer de claim eerlijk had kunnen doen.
+#
+# Aanname over het gedrag: een speler legt passende kaarten (middenkaart of Joker) als hij
+# die heeft, en blufft alleen als het niet anders kan. Eerdere claims van de claimer in
+# deze ronde hebben dus eerst zijn passende kaarten opgebruikt. De schatting is daarmee de
+# kans dat de claimer moest liegen; een speler die blufft terwijl het niet hoeft, valt erbuiten.
+#
+# Als de exacte kansentabel (odds_table.py) gegenereerd is, komt de kans daaruit. Anders,
+# of buiten het bereik van de tabel, wordt hij geschat: met numpy worden alle trekkingen in
+# één keer (gevectoriseerd) gedaan, anders met de random module. Schattingen worden gecachet
+# per situatie; de trekkingen zijn geseed uit die situatie, zodat dezelfde vraag altijd
+# hetzelfde antwoord geeft (ook in een simulatie met een vaste seed).
+
+DEFAULT_SAMPLES = 2000 # Trekkingen per schatting; de standaardfout is dan hooguit ~1,1%
+CACHE_SIZE = 4096 # Aantal gecachete situaties
+
+
+def estimate_lie_probability(game_state, viewer_id=None, samples=DEFAULT_SAMPLES):
+    """
+    Schat de kans dat de laatste claim (lastClaimDetails) een leugen is, gezien vanuit 'viewer_id'.
+    Args:
+        viewer_id (str): De speler die de schatting vraagt (zijn eigen kaarten zijn bekend);
+                         None voor een toeschouwer.
+        samples (int): Aantal Monte Carlo trekkingen.
+    Returns:
+        float: Kans tussen 0 en 1, of None als er geen claim openstaat.
+    """
+    claim = game_state.last_claim
+    if game_state.phase != 'awaitingLiarCall' or not claim.player:
+        return None
+    if claim.player == viewer_id:
+        return 0.0 if _claim_is_true(claim) else 1.0 # De claimer weet het zelf
+
+    known_cards = []
+    viewer = game_state.player_index.get(viewer_id) if viewer_id is not None else None
+    if viewer:
+        known_cards.extend(viewer.hand)
+    earlier_amount = 0 # Kaarten die de claimer eerder in deze ronde gelegd heeft
+    for pile_claim in game_state.pile[:-1]:
+        if pile_claim.player == claim.player:
+            earlier_amount += pile_claim.claimed_amount
+        elif viewer and pile_claim.player == viewer_id:
+            known_cards.extend(pile_claim.actual_cards) # Eigen gelegde kaarten zitten niet meer in de hand
+
+    total, matching = unseen_cards(game_state.deck_type, game_state.deck_sets, known_cards)
+    # Passende kaarten die de claimer nodig had: de eerdere claims plus deze (zie bovenaan)
+    needed = earlier_amount + claim.claimed_amount
+    table = get_odds_table()
+    if table is not None:
+        probability = table.claim_lie_probability(total, matching, needed)
+        if probability is not None:
+            return probability
+    return _estimate(total, matching, needed, samples)
+
+
+def elimination_probability(player):
+    """Kans dat 'player' bij zijn volgende worp met de mystieke dobbelsteen een 6 gooit."""
+    table = get_odds_table()
+    if table is not None:
+        return table.dice_elimination_probability(player.rolled_numbers, player.dice_roll_attempts)
+    return exact_dice_elimination_probability(player.rolled_numbers, player.dice_roll_attempts)
+
+
+def unseen_cards(deck_type, sets_needed, known_cards):
+    """
+    Retourneert (aantal onbekende kaarten, waarvan passend) voor de kijker: het deck van
+    de ronde min de kaarten die hij kent. Passend = de middenkaart of een Joker.
+    """
+    total = sum(FULL_DECK_TEMPLATE.values()) * sets_needed
+    matching = (FULL_DECK_TEMPLATE[deck_type] + FULL_DECK_TEMPLATE[JOKER]) * sets_needed
+    for card in known_cards:
+        total -= 1
+        if card == deck_type or card == JOKER:
+            matching -= 1
+    return total, matching
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _estimate(total, matching, needed, samples):
+    """
+    De Monte Carlo schatting: de kans dat een hand getrokken uit 'total' onbekende kaarten
+    (waarvan 'matching' passend) minder dan 'needed' passende kaarten heeft.
+    """
+    hand_size = min(HAND_SIZE, total)
+    seed = zlib.crc32(repr((total, matching, needed, samples)).encode())
+
+    if numpy is not None:
+        # Het aantal passende kaarten in een getrokken hand van 5, voor alle trekkingen tegelijk
+        generator = numpy.random.default_rng(seed)
+        matching_in_hand = generator.hypergeometric(matching, total - matching, hand_size, size=samples)
+        return float(numpy.count_nonzero(matching_in_hand < needed)) / samples
+
+    # Zonder numpy: trek de hand kaart voor kaart (zonder terugleggen) en stop zodra de
+    # claimer genoeg passende kaarten heeft
+    draw = random.Random(seed).random
+    lies = 0
+    for _ in range(samples):
+        cards_left = total
+        matching_left = matching
+        found = 0
+        for _ in range(hand_size):
+            if draw() * cards_left < matching_left:
+                found += 1
+                if found == needed:
+                    break
+                matching_left -= 1
+            cards_left -= 1
+        if found < needed:
+            lies += 1
+    return lies / samples
@@ -0,0 +1,202 @@
+import argparse
+import math
+import mmap
+import os
+import struct
+import threading
+
+from game_logic import FULL_DECK_TEMPLATE, HAND_SIZE, MYSTIC_DICE_FACES, deck_sets_needed, mystic_dice_pool
+from game_model import JOKER
+from server_log import log_to_stderr
+
+# --- Exacte kansentabel voor claims en de mystieke dobbelsteen ---
+# De kans dat een claim een leugen is hangt (met de aanname uit odds.py) alleen af van
+# drie getallen: hoeveel kaarten de kijker niet kent, hoeveel daarvan passend zijn, en
+# hoeveel passende kaarten de claimer nodig had. Dat is een hypergeometrische verdeling,
+# klein genoeg om voor alle combinaties exact uit te rekenen. Hetzelfde geldt voor de
+# dobbelsteen: de kans op een 6 bij de volgende worp hangt alleen af van de al gerolde
+# nummers en het aantal worpen in deze ronde (zie game_logic.mystic_dice_pool).
+#
+# De tabel wordt vooraf (bij het bouwen/deployen) gegenereerd met:
+#     python odds_table.py [--output odds_table.bin] [--max-players 8]
+# en bij het opstarten met mmap geopend; het besturingssysteem laadt alleen de pagina's die
+# echt gelezen worden. Een opzoeking is één struct.unpack_from op een berekende positie.
+# Het bestand wordt niet in git bewaard (zie .gitignore). Zonder tabel (of buiten het
+# bereik ervan) valt odds.py terug op de Monte Carlo schatting.
+#
+# Bestand:
+#   magic, handgrootte (u8), aantal dobbelsteengezichten (u8), max onbekende kaarten (u16),
+#   max passende onbekende kaarten (u16)
+#   claims: per (onbekend 0..max, passend 0..max, nodig 0..handgrootte) de kans op een leugen (f64)
+#   dobbelsteen: per (bitmasker gerolde nummers, worpen 0..aantal gezichten) de kans op een 6 (f64)
+
+TABLE_MAGIC = b'LBOT\x01'
+DEFAULT_TABLE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'odds_table.bin')
+DEFAULT_MAX_PLAYERS = 8 # Grootste lobby waarvoor de claimkansen in de tabel staan
+
+_HEADER = struct.Struct(f'>{len(TABLE_MAGIC)}sBBHH')
+_VALUE = struct.Struct('>d')
+
+_active_table = None # De tabel die odds.py gebruikt (zie get_odds_table)
+_active_loaded = False # True zodra er een poging gedaan is om de tabel te openen
+_active_guard = threading.Lock()
+
+
+def exact_claim_lie_probability(unseen_total, unseen_matching, needed):
+    """
+    Exacte kans dat een claim een leugen is: de kans dat een hand van HAND_SIZE kaarten,
+    getrokken uit 'unseen_total' kaarten waarvan 'unseen_matching' passend, minder dan
+    'needed' passende kaarten heeft.
+    """
+    hand_size = min(HAND_SIZE, unseen_total)
+    other = unseen_total - unseen_matching
+    lie_hands = sum(math.comb(unseen_matching, found) * math.comb(other, hand_size - found)
+                    for found in range(min(needed, unseen_matching + 1, hand_size + 1)))
+    return lie_hands / math.comb(unseen_total, hand_size)
+
+
+def exact_dice_elimination_probability(rolled_numbers, attempts):
+    """Exacte kans dat een speler bij zijn volgende worp (worp 'attempts' + 1 in deze ronde) een 6 gooit."""
+    pool = mystic_dice_pool(rolled_numbers, attempts + 1)
+    if not pool:
+        return 1.0 # Geen gezichten meer over: automatisch een 6
+    return pool.count(6) / len(pool)
+
+
+class OddsTable:
+    """
+    Een gegenereerde kansentabel, gelezen via mmap.
+    Args:
+        path (str): Het bestand van build_table.
+    Raises:
+        ValueError: Als het bestand geen (passende) kansentabel is, bijv. gegenereerd met andere spelregels.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as table_file:
+            self._map = mmap.mmap(table_file.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            magic, hand_size, face_count, self.max_total, self.max_matching = _HEADER.unpack_from(self._map, 0)
+        except struct.error:
+            magic = None
+        if magic != TABLE_MAGIC or hand_size != HAND_SIZE or face_count != len(MYSTIC_DICE_FACES):
+            self._map.close()
+            raise ValueError(f"{path} is geen kansentabel voor deze spelregels; genereer hem opnieuw.")
+        self._dice_offset = _HEADER.size + _claim_entries(self.max_total, self.max_matching) * _VALUE.size
+        if len(self._map) != self._dice_offset + _dice_entries() * _VALUE.size:
+            self._map.close()
+            raise ValueError(f"{path} is onvolledig; genereer hem opnieuw.")
+
+    def claim_lie_probability(self, unseen_total, unseen_matching, needed):
+        """Kans dat een claim een leugen is (zie exact_claim_lie_probability), of None buiten het bereik van de tabel."""
+        if needed > min(HAND_SIZE, unseen_total):
+            return 1.0 # Zoveel passende kaarten passen niet in de hand
+        if not (0 <= unseen_matching <= unseen_total <= self.max_total and unseen_matching <= self.max_matching and needed >= 0):
+            return None
+        index = (unseen_total * (self.max_matching + 1) + unseen_matching) * (HAND_SIZE + 1) + needed
+        return _VALUE.unpack_from(self._map, _HEADER.size + index * _VALUE.size)[0]
+
+    def dice_elimination_probability(self, rolled_numbers, attempts):
+        """Kans dat de volgende worp een 6 is (zie exact_dice_elimination_probability)."""
+        index = _rolled_mask(rolled_numbers) * (len(MYSTIC_DICE_FACES) + 1) + min(attempts, len(MYSTIC_DICE_FACES))
+        return _VALUE.unpack_from(self._map, self._dice_offset + index * _VALUE.size)[0]
+
+    def close(self):
+        self._map.close()
+
+
+def build_table(path=DEFAULT_TABLE_PATH, max_players=DEFAULT_MAX_PLAYERS):
+    """
+    Genereert de kansentabel voor lobbies tot en met 'max_players' spelers en schrijft hem
+    (atomair, via een tijdelijk bestand) naar 'path'.
+    Returns:
+        int: De grootte van het bestand in bytes.
+    """
+    sets_needed = deck_sets_needed(max_players)
+    max_total = sum(FULL_DECK_TEMPLATE.values()) * sets_needed
+    max_matching = (max(count for card, count in FULL_DECK_TEMPLATE.items() if card != JOKER)
+                    + FULL_DECK_TEMPLATE[JOKER]) * sets_needed
+
+    values = []
+    for unseen_total in range(max_total + 1):
+        for unseen_matching in range(max_matching + 1):
+            for needed in range(HAND_SIZE + 1):
+                if unseen_matching > unseen_total:
+                    values.append(math.nan) # Kan niet voorkomen
+                else:
+                    values.append(exact_claim_lie_probability(unseen_total, unseen_matching, needed))
+    for mask in range(1 << len(MYSTIC_DICE_FACES)):
+        rolled_numbers = [face for bit, face in enumerate(MYSTIC_DICE_FACES) if mask & (1 << bit)]
+        for attempts in range(len(MYSTIC_DICE_FACES) + 1):
+            values.append(exact_dice_elimination_probability(rolled_numbers, attempts))
+
+    data = _HEADER.pack(TABLE_MAGIC, HAND_SIZE, len(MYSTIC_DICE_FACES), max_total, max_matching) \
+        + struct.pack(f'>{len(values)}d', *values)
+    temporary_path = f"{path}.tmp"
+    with open(temporary_path, 'wb') as table_file:
+        table_file.write(data)
+    os.replace(temporary_path, path)
+    return len(data)
+
+
+def open_odds_table(path=DEFAULT_TABLE_PATH, log=log_to_stderr):
+    """
+    Opent de kansentabel op 'path' en maakt hem de tabel die odds.py gebruikt.
+    Een onbruikbaar bestand wordt gemeld via log (zie ServerLog.log).
+    Returns:
+        OddsTable: De tabel, of None als het bestand niet bestaat of niet bruikbaar is.
+    """
+    global _active_table, _active_loaded
+    try:
+        table = OddsTable(path)
+    except FileNotFoundError:
+        table = None
+    except ValueError as error:
+        log('warning', 'odds_table_unusable', path=path, error=str(error))
+        table = None
+    with _active_guard:
+        previous, _active_table, _active_loaded = _active_table, table, True
+    if previous is not None:
+        previous.close()
+    return table
+
+
+def get_odds_table():
+    """Retourneert de actieve kansentabel; opent bij het eerste gebruik DEFAULT_TABLE_PATH als er nog geen geopend is."""
+    if not _active_loaded:
+        with _active_guard:
+            load = not _active_loaded
+        if load:
+            open_odds_table()
+    return _active_table
+
+
+def _claim_entries(max_total, max_matching):
+    return (max_total + 1) * (max_matching + 1) * (HAND_SIZE + 1)
+
+
+def _dice_entries():
+    return (1 << len(MYSTIC_DICE_FACES)) * (len(MYSTIC_DICE_FACES) + 1)
+
+
+def _rolled_mask(rolled_numbers):
+    mask = 0
+    for bit, face in enumerate(MYSTIC_DICE_FACES):
+        if face in rolled_numbers:
+            mask |= 1 << bit
+    return mask
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Genereert de exacte kansentabel voor claims en de mystieke dobbelsteen.")
+    parser.add_argument('--output', default=DEFAULT_TABLE_PATH, help="Pad van de tabel.")
+    parser.add_argument('--max-players', type=int, default=DEFAULT_MAX_PLAYERS,
+                        help="Grootste lobby waarvoor de claimkansen in de tabel komen.")
+    args = parser.parse_args()
+    size = build_table(args.output, args.max_players)
+    print(f"Kansentabel ({size} bytes) geschreven naar {args.output}.")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,277 @@
+import os
+import pickle
+import re
+import struct
+import threading
+import time
+import zlib
+
+from server_log import log_to_stderr
+
+# --- Persistentie van lobbies: write-ahead log met periodieke snapshots ---
+# Na elk event wordt een record aan een append-only log (WAL) toegevoegd: de volledige
+# toestand van de lobby (bij joinen, starten, ...) of alleen de spelacties van het event
+# (zetten, LIAR!, dobbelen, vertrekken). De handler serialiseert het record alleen en zet het in een buffer;
+# een achtergrond thread schrijft de buffer in batches weg en doet een fsync per
+# FSYNC_INTERVAL, zodat een zet daar niet op hoeft te wachten.
+#
+# Elke lobby heeft een eigen geseede random generator (zie create_new_game), dus de acties
+# opnieuw uitvoeren op de laatst bewaarde toestand levert exact hetzelfde spel op. Een
+# actie record is een paar bytes, tegen enkele kilobytes voor een volledige toestand. Na
+# MAX_ACTIONS_PER_STATE acties wordt toch weer een volledige toestand geschreven, zodat
+# een herstel nooit een heel spel opnieuw hoeft uit te voeren.
+#
+# Periodiek wordt een snapshot geschreven met de laatste toestand van alle lobbies, waarna
+# een nieuwe WAL begonnen wordt en de oude weg kan. Bij een herstart wordt de snapshot
+# geladen en alleen de staart van de WAL (alles na de snapshot) opnieuw toegepast.
+#
+# Bestanden in de persistentie map:
+#   snapshot.pickle   - { 'wal_generation': n, 'lobbies': { code: (toestand bytes, [acties]) } }
+#   wal-<n>.log       - records: 4 bytes lengte, 4 bytes crc32, gepickelde (soort, code, data)
+
+DEFAULT_FSYNC_INTERVAL = 1.0 # Seconden tussen twee fsyncs van de WAL
+DEFAULT_SNAPSHOT_INTERVAL = 60.0 # Seconden tussen twee snapshots
+MAX_ACTIONS_PER_STATE = 256 # Spelacties na een volledige toestand voordat er weer een geschreven wordt
+
+# Soorten WAL records
+RECORD_STATE = 'state' # data: gepickelde toestand van de lobby
+RECORD_ACTIONS = 'actions' # data: lijst met spelacties sinds het vorige record
+RECORD_REMOVED = 'removed' # data: None, de lobby is verwijderd
+
+_RECORD_HEADER = struct.Struct('>II') # lengte, crc32
+_SNAPSHOT_FILE = 'snapshot.pickle'
+_WAL_FILE_PATTERN = re.compile(r'^wal-(\d+)\.log$')
+
+
+class LobbyJournal:
+    """
+    WAL en snapshots van alle lobbies van één worker.
+    Args:
+        directory (str): Map voor de snapshot en WAL bestanden (wordt aangemaakt).
+        fsync_interval (float): Seconden tussen twee fsyncs; 0 = na elke batch direct.
+        snapshot_interval (float): Seconden tussen twee snapshots.
+        log (callable): log(niveau, event, lobby, **velden) voor waarschuwingen bij het herstel (zie ServerLog.log).
+    """
+
+    def __init__(self, directory, fsync_interval=DEFAULT_FSYNC_INTERVAL, snapshot_interval=DEFAULT_SNAPSHOT_INTERVAL,
+                 log=log_to_stderr):
+        self.directory = directory
+        self._log = log
+        self.fsync_interval = fsync_interval
+        self.snapshot_interval = snapshot_interval
+        os.makedirs(directory, exist_ok=True)
+
+        self._guard = threading.Lock()
+        self._pending = [] # Gecodeerde records die nog geschreven moeten worden
+        self._latest = {} # { "lobby_code": (bytes, [acties]) } laatste toestand en acties daarna, voor de volgende snapshot
+        self._journaled = {} # { "lobby_code": (seed, aantal acties) } van het GameRecord tot waar vastgelegd
+        self._generation = 0
+        self._wal_file = None
+        self._last_snapshot = time.monotonic()
+        self._changed = False # Zijn er records bijgekomen sinds de laatste snapshot?
+        self._wake = threading.Event()
+        self._closed = False
+        self._writer = None
+
+    # --- Herstel ---
+
+    def recover(self, apply_action):
+        """
+        Laadt de snapshot en past de WAL records daarna toe. Moet voor start() aangeroepen worden.
+        Args:
+            apply_action (callable): apply_action(state, actie, player_id, kaarten) uit game_logic,
+                                     voert een vastgelegde spelactie opnieuw uit.
+        Returns:
+            dict: { "lobby_code": object } met de laatst bewaarde toestand per lobby.
+        """
+        first_generation = 0
+        snapshot_path = os.path.join(self.directory, _SNAPSHOT_FILE)
+        if os.path.exists(snapshot_path):
+            with open(snapshot_path, 'rb') as snapshot_file:
+                snapshot = pickle.load(snapshot_file)
+            first_generation = snapshot['wal_generation']
+            self._latest = dict(snapshot['lobbies'])
+
+        generations = sorted(self._wal_generations())
+        for generation in generations:
+            if generation < first_generation:
+                continue # Al in de snapshot verwerkt
+            for kind, lobby_code, data in _read_wal(self._wal_path(generation), self._log):
+                if kind == RECORD_REMOVED:
+                    self._latest.pop(lobby_code, None)
+                elif kind == RECORD_ACTIONS:
+                    if lobby_code in self._latest:
+                        self._latest[lobby_code][1].extend(data)
+                else:
+                    self._latest[lobby_code] = (data, [])
+
+        # Nieuwe records komen in een nieuwe WAL, na alles wat er al is
+        self._generation = max([first_generation - 1] + generations) + 1
+
+        states = {}
+        for lobby_code, (data, actions) in self._latest.items():
+            state = pickle.loads(data)
+            for action in actions:
+                apply_action(state, *action)
+            states[lobby_code] = state
+            self._remember_position(lobby_code, state)
+        return states
+
+    # --- Schrijven ---
+
+    def start(self):
+        """Opent de WAL en start de achtergrond thread die records wegschrijft."""
+        self._wal_file = open(self._wal_path(self._generation), 'ab')
+        self._writer = threading.Thread(target=self._run_writer, name='lobby-journal', daemon=True)
+        self._writer.start()
+
+    def record(self, lobby_code, state):
+        """
+        Legt de volledige toestand van een lobby na een event vast. Serialiseert direct (de
+        toestand kan daarna weer veranderen), het schrijven gebeurt in de achtergrond.
+        """
+        data = pickle.dumps(state, pickle.HIGHEST_PROTOCOL)
+        encoded = _encode_record((RECORD_STATE, lobby_code, data))
+        with self._guard:
+            self._pending.append(encoded)
+            self._latest[lobby_code] = (data, [])
+            self._changed = True
+        self._remember_position(lobby_code, state)
+
+    def record_game_actions(self, lobby_code, state):
+        """
+        Legt alleen de spelacties vast die sinds het vorige record aan het GameRecord van de
+        toestand zijn toegevoegd. Valt terug op record() als de toestand niet aansluit op wat
+        al vastgelegd is (nieuw spel, of te veel acties sinds de laatste volledige toestand).
+        """
+        game_record = state.record
+        position = self._journaled.get(lobby_code)
+        if game_record is None or position is None or position[0] != game_record.seed:
+            self.record(lobby_code, state)
+            return
+        actions = game_record.actions[position[1]:]
+        if not actions:
+            return # Niets veranderd
+        with self._guard:
+            latest = self._latest.get(lobby_code)
+            if latest is None or len(latest[1]) + len(actions) > MAX_ACTIONS_PER_STATE:
+                replace_state = True
+            else:
+                replace_state = False
+                self._pending.append(_encode_record((RECORD_ACTIONS, lobby_code, actions)))
+                latest[1].extend(actions)
+                self._changed = True
+        if replace_state:
+            self.record(lobby_code, state)
+            return
+        self._journaled[lobby_code] = (game_record.seed, len(game_record.actions))
+
+    def record_removed(self, lobby_code):
+        """Legt vast dat een lobby verwijderd is."""
+        encoded = _encode_record((RECORD_REMOVED, lobby_code, None))
+        with self._guard:
+            self._pending.append(encoded)
+            self._latest.pop(lobby_code, None)
+            self._changed = True
+        self._journaled.pop(lobby_code, None)
+
+    def _remember_position(self, lobby_code, state):
+        """Onthoudt tot welke actie het GameRecord van een lobby vastgelegd is."""
+        game_record = getattr(state, 'record', None)
+        if game_record is None:
+            self._journaled.pop(lobby_code, None)
+        else:
+            self._journaled[lobby_code] = (game_record.seed, len(game_record.actions))
+
+    def close(self):
+        """Schrijft alle wachtende records weg (met fsync) en stopt de achtergrond thread."""
+        if self._closed or self._writer is None:
+            return
+        self._closed = True
+        self._wake.set()
+        self._writer.join()
+        self._wal_file.close()
+
+    def _run_writer(self):
+        while True:
+            self._wake.wait(self.fsync_interval)
+            self._wake.clear()
+            closing = self._closed # Eerst lezen: records van vóór close() komen zo altijd nog in deze batch
+            self._write_pending()
+            if closing:
+                return
+            if self._changed and time.monotonic() - self._last_snapshot >= self.snapshot_interval:
+                self._write_snapshot()
+
+    def _write_pending(self):
+        with self._guard:
+            pending, self._pending = self._pending, []
+        if pending:
+            self._wal_file.write(b''.join(pending))
+            self._wal_file.flush()
+            os.fsync(self._wal_file.fileno())
+
+    def _write_snapshot(self):
+        """
+        Schrijft de laatste toestand van alle lobbies naar een nieuwe snapshot en begint een
+        nieuwe WAL. De oude WAL is daarna niet meer nodig en wordt verwijderd.
+        """
+        with self._guard:
+            # Wachtende records, snapshot en WAL wissel in één stap: een record zit daarna óf in
+            # de snapshot (en de oude WAL), óf alleen in de nieuwe WAL. Acties die in beide
+            # zouden zitten, worden bij het herstel twee keer toegepast.
+            pending, self._pending = self._pending, []
+            lobbies = {lobby_code: (data, list(actions)) for lobby_code, (data, actions) in self._latest.items()}
+            self._changed = False
+            old_generation = self._generation
+            self._generation += 1
+            old_wal_file, self._wal_file = self._wal_file, open(self._wal_path(self._generation), 'ab')
+        if pending:
+            old_wal_file.write(b''.join(pending))
+            old_wal_file.flush()
+            os.fsync(old_wal_file.fileno())
+        old_wal_file.close()
+
+        snapshot_path = os.path.join(self.directory, _SNAPSHOT_FILE)
+        temporary_path = snapshot_path + '.tmp'
+        with open(temporary_path, 'wb') as snapshot_file:
+            pickle.dump({'wal_generation': self._generation, 'lobbies': lobbies}, snapshot_file, pickle.HIGHEST_PROTOCOL)
+            snapshot_file.flush()
+            os.fsync(snapshot_file.fileno())
+        os.replace(temporary_path, snapshot_path) # Atomair: een crash laat de vorige snapshot heel
+        for generation in self._wal_generations():
+            if generation <= old_generation:
+                os.remove(self._wal_path(generation))
+        self._last_snapshot = time.monotonic()
+
+    def _wal_path(self, generation):
+        return os.path.join(self.directory, f"wal-{generation}.log")
+
+    def _wal_generations(self):
+        generations = []
+        for name in os.listdir(self.directory):
+            match = _WAL_FILE_PATTERN.match(name)
+            if match:
+                generations.append(int(match.group(1)))
+        return generations
+
+
+def _encode_record(record):
+    payload = pickle.dumps(record, pickle.HIGHEST_PROTOCOL)
+    return _RECORD_HEADER.pack(len(payload), zlib.crc32(payload)) + payload
+
+
+def _read_wal(path, log):
+    """Leest de records uit een WAL bestand. Stopt bij een afgebroken of beschadigd record (crash tijdens schrijven)."""
+    with open(path, 'rb') as wal_file:
+        data = wal_file.read()
+    offset = 0
+    while offset + _RECORD_HEADER.size <= len(data):
+        length, checksum = _RECORD_HEADER.unpack_from(data, offset)
+        start = offset + _RECORD_HEADER.size
+        payload = data[start:start + length]
+        if len(payload) < length or zlib.crc32(payload) != checksum:
+            log('warning', 'wal_truncated', path=path, offset=offset, error="Afgebroken of beschadigd record, de rest wordt genegeerd.")
+            return
+        yield pickle.loads(payload)
+        offset = start + length
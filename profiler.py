@@ -0,0 +1,198 @@
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+# --- Profilen in productie: sampling en tracing van één lobby ---
+# Twee manieren om te zien waar de tijd heen gaat, zonder herstart en zonder alle lobbies
+# te vertragen. Beide schrijven een 'collapsed stack' bestand: per regel een stack (functies
+# gescheiden door ';', de buitenste eerst) en een gewicht. Zo'n bestand is direct te openen
+# in speedscope, of om te zetten naar een flamegraph met flamegraph.pl.
+#
+#   SamplingProfiler - kijkt elke SAMPLE_INTERVAL seconden naar de stacks van alle threads
+#                      (sys._current_frames). Gewicht = aantal samples. Kost vrijwel niets,
+#                      maar ziet onder eventlet/gevent alleen echte OS threads, niet de greenlets.
+#   LobbyTracer      - legt elke functieaanroep vast tijdens de events van één lobby (via
+#                      sys.setprofile, alleen in de thread die dat event verwerkt). Gewicht =
+#                      microseconden eigen tijd. Exact en per lobby, maar traag: alleen
+#                      tijdelijk aanzetten voor de lobby die onderzocht wordt.
+
+DEFAULT_SAMPLE_INTERVAL = 0.005 # Seconden tussen twee samples
+MAX_PROFILE_SECONDS = 300 # Langste profiel of trace dat gestart kan worden
+
+
+def _frame_label(code):
+    return f"{os.path.basename(code.co_filename)}:{code.co_name}"
+
+
+def _c_function_label(function):
+    module = getattr(function, '__module__', None) or 'builtins'
+    return f"{module}:{getattr(function, '__qualname__', function.__name__)}"
+
+
+def write_collapsed(path, stacks):
+    """Schrijft { (functies, buitenste eerst): gewicht } als collapsed stack bestand en retourneert het pad."""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    temporary_path = f"{path}.tmp"
+    with open(temporary_path, 'w', encoding='utf-8') as profile_file:
+        for stack, weight in sorted(stacks.items(), key=lambda item: -item[1]):
+            if weight > 0:
+                profile_file.write(f"{';'.join(stack)} {int(round(weight))}\n")
+    os.replace(temporary_path, path)
+    return path
+
+
+class SamplingProfiler:
+    """
+    Sampling profiler voor het hele proces; hooguit één profiel tegelijk.
+    Args:
+        interval (float): Seconden tussen twee samples.
+    """
+
+    def __init__(self, interval=DEFAULT_SAMPLE_INTERVAL):
+        self.interval = interval
+        self._running = threading.Lock()
+
+    def start(self, seconds, path, start_background_task, sleep=time.sleep, on_written=None):
+        """
+        Begint een profiel van 'seconds' seconden in een achtergrond taak, die daarna 'path' schrijft.
+        Args:
+            start_background_task (callable): Start de taak (bijv. socketio.start_background_task).
+            sleep (callable): Slaapfunctie die bij de async mode past.
+            on_written (callable): Optioneel; on_written(path, samples) als het bestand geschreven is.
+        Returns:
+            bool: False als er al een profiel loopt.
+        """
+        if not self._running.acquire(blocking=False):
+            return False
+        start_background_task(self._run, min(seconds, MAX_PROFILE_SECONDS), path, sleep, on_written)
+        return True
+
+    def _run(self, seconds, path, sleep, on_written):
+        try:
+            stacks = Counter()
+            samples = 0
+            own_thread = threading.get_ident()
+            deadline = time.monotonic() + seconds
+            while time.monotonic() < deadline:
+                for thread_id, frame in sys._current_frames().items():
+                    if thread_id == own_thread:
+                        continue
+                    stack = []
+                    while frame is not None:
+                        stack.append(_frame_label(frame.f_code))
+                        frame = frame.f_back
+                    stack.reverse()
+                    stacks[tuple(stack)] += 1
+                samples += 1
+                sleep(self.interval)
+            write_collapsed(path, stacks)
+        finally:
+            self._running.release()
+        if on_written:
+            on_written(path, samples)
+
+
+class _Trace:
+    __slots__ = ('path', 'deadline', 'stacks', 'events', 'guard')
+
+    def __init__(self, path, deadline):
+        self.path = path
+        self.deadline = deadline
+        self.stacks = Counter() # { (functies): microseconden eigen tijd }
+        self.events = 0
+        self.guard = threading.Lock()
+
+
+class LobbyTracer:
+    """Traceert alle jobs in de mailbox van gekozen lobbies (zie lobby_actor.py) tot hun trace stopt."""
+
+    def __init__(self):
+        self._traces = {} # { "lobby_code": _Trace }
+        self._guard = threading.Lock()
+
+    def start(self, lobby_code, seconds, path):
+        """
+        Traceert de events van een lobby gedurende 'seconds' seconden. stop() schrijft het bestand.
+        Returns:
+            bool: False als de lobby al getraceerd wordt.
+        """
+        with self._guard:
+            if lobby_code in self._traces:
+                return False
+            self._traces[lobby_code] = _Trace(path, time.monotonic() + min(seconds, MAX_PROFILE_SECONDS))
+        return True
+
+    def stop(self, lobby_code):
+        """
+        Stopt de trace van een lobby en schrijft het bestand.
+        Returns:
+            tuple: (pad, aantal getraceerde events), of None als de lobby niet getraceerd werd.
+        """
+        with self._guard:
+            trace = self._traces.pop(lobby_code, None)
+        if trace is None:
+            return None
+        with trace.guard:
+            stacks, events = Counter(trace.stacks), trace.events
+        return write_collapsed(trace.path, stacks), events
+
+    def run(self, lobby_code, job):
+        """Voert een job van een lobby uit, getraceerd als de lobby getraceerd wordt."""
+        trace = self._traces.get(lobby_code)
+        if trace is None or time.monotonic() >= trace.deadline or sys.getprofile() is not None:
+            return job()
+        stacks = Counter()
+        hook = _TraceHook(stacks)
+        sys.setprofile(hook)
+        try:
+            return job()
+        finally:
+            sys.setprofile(None)
+            hook.finish()
+            with trace.guard:
+                trace.stacks.update(stacks)
+                trace.events += 1
+
+
+class _TraceHook:
+    """sys.setprofile hook die de eigen tijd per stack optelt (in microseconden)."""
+
+    __slots__ = ('stacks', 'labels', 'starts', 'child_times')
+
+    def __init__(self, stacks):
+        self.stacks = stacks
+        self.labels = [] # Stack van de functies die nu lopen (sinds de hook aanstaat)
+        self.starts = []
+        self.child_times = []
+
+    def __call__(self, frame, event, arg):
+        now = time.perf_counter()
+        if event == 'call':
+            self._push(_frame_label(frame.f_code), now)
+        elif event == 'c_call':
+            self._push(_c_function_label(arg), now)
+        elif event in ('return', 'c_return', 'c_exception') and self.labels:
+            self._pop(now)
+
+    def _push(self, label, now):
+        self.labels.append(label)
+        self.starts.append(now)
+        self.child_times.append(0.0)
+
+    def _pop(self, now):
+        elapsed = now - self.starts.pop()
+        own_time = elapsed - self.child_times.pop()
+        self.stacks[tuple(self.labels)] += own_time * 1_000_000
+        self.labels.pop()
+        if self.child_times:
+            self.child_times[-1] += elapsed
+
+    def finish(self):
+        """Sluit functies af die nog liepen toen de hook uitgezet werd."""
+        now = time.perf_counter()
+        while self.labels:
+            self._pop(now)
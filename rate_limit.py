@@ -0,0 +1,90 @@
+import threading
+import time
+
+# --- Rate limiting van Socket.IO events ---
+# Per socket en per lobby mag elk soort event maar zo vaak binnenkomen: een token bucket met
+# een snelheid (events per seconde) en een burst (zoveel mag er in één keer). Een chat flood
+# of een client die 'make_play' blijft sturen kost zo alleen de eigen socket iets, in
+# plaats van elke keer een broadcast naar de hele tafel.
+#
+# De bucket is geïmplementeerd als GCRA (generic cell rate algorithm): in plaats van een
+# aantal tokens en een tijdstip wordt alleen het 'theoretische aankomsttijdstip' (TAT)
+# bewaard, één float per bucket. Het gedrag is gelijk aan een token bucket.
+#
+# Afgewezen events worden samengevoegd: per bucket telt een reeks afwijzingen (tot er weer
+# een event door mag) als één melding aan de client en één logregel.
+#
+# Limieten: { "event": [per seconde, burst] }, met "default" voor events die niet genoemd
+# worden. Een snelheid van 0 of None betekent geen limiet.
+
+DEFAULT_SOCKET_LIMITS = {
+    'default': [10, 20],
+    'chat_message': [1, 5],
+    'make_play': [3, 6],
+    'call_liar': [3, 6],
+    'believe_claim': [3, 6],
+    'roll_dice': [3, 6],
+    'create_lobby': [1, 3],
+    'join_lobby': [2, 5],
+    'add_bot': [2, 4],
+    'request_game_state': [2, 5],
+    'request_odds': [10, 20],
+}
+DEFAULT_LOBBY_LIMITS = {
+    'default': [50, 100],
+    'chat_message': [5, 10],
+}
+
+
+class RateLimiter:
+    """
+    Token buckets (GCRA) per (sleutel, event), bijv. per socket of per lobby.
+    Args:
+        limits (dict): { "event": [per seconde, burst] } (zie DEFAULT_SOCKET_LIMITS).
+        clock (callable): Klok in seconden (monotoon).
+    """
+
+    def __init__(self, limits, clock=time.monotonic):
+        self._limits = {} # { "event": (seconden per event, tolerantie in seconden) } of None
+        for event, limit in limits.items():
+            rate, burst = limit if limit else (None, None)
+            self._limits[event] = (1.0 / rate, burst / rate) if rate else None
+        self._default = self._limits.get('default')
+        self._clock = clock
+        self._buckets = {} # { (sleutel, event): TAT }
+        self._rejected = {} # { (sleutel, event): aantal afgewezen events op rij }
+        self._guard = threading.Lock()
+
+    def hit(self, key, event):
+        """
+        Telt een event mee in de bucket van (key, event).
+        Returns:
+            int: 0 als het event door mag. Anders het aantal afgewezen events op rij, dit
+                 event meegeteld; 1 is het begin van een reeks (meld die aan de client).
+        """
+        limit = self._limits.get(event, self._default)
+        if limit is None:
+            return 0
+        interval, tolerance = limit
+        bucket = (key, event)
+        now = self._clock()
+        with self._guard:
+            tat = max(self._buckets.get(bucket, now), now) + interval
+            if tat - now <= tolerance:
+                self._buckets[bucket] = tat
+                if self._rejected:
+                    self._rejected.pop(bucket, None) # Een eventuele reeks afwijzingen is voorbij
+                return 0
+            rejected = self._rejected.get(bucket, 0) + 1
+            self._rejected[bucket] = rejected
+            return rejected
+
+    def prune(self):
+        """Vergeet buckets die weer vol zijn (ze gedragen zich dan als een nieuwe bucket)."""
+        now = self._clock()
+        with self._guard:
+            self._buckets = {bucket: tat for bucket, tat in self._buckets.items() if tat > now}
+            self._rejected = {bucket: count for bucket, count in self._rejected.items() if bucket in self._buckets}
+
+    def __len__(self):
+        return len(self._buckets)
@@ -0,0 +1,311 @@
+import mmap
+import os
+import struct
+import threading
+import time
+
+from game_logic import GAME_ACTIONS
+from game_model import GameRecord
+
+# --- Archief van afgelopen spellen (replays) ---
+# Elk afgelopen spel wordt als compact binair blok aan 'games.bin' toegevoegd: de seed,
+# de spelers en de acties van het GameRecord (zie game_model.py). Met replay_game uit
+# game_logic.py wordt daaruit elke toestand van het spel exact teruggerekend, dus een spel
+# van honderden acties kost maar een paar kilobyte.
+#
+# Acties en kaarten worden als bytes opgeslagen (actie = index in GAME_ACTIONS, kaart =
+# kaartcode) en player ids staan maar één keer in een spelertabel per spel; de acties
+# verwijzen naar hun index in die tabel.
+#
+# 'games.idx' bevat per spel een record met vaste lengte (seed, offset en lengte van het
+# blok, aantal acties, tijdstip, lobbycode). Spel n staat dus op positie n * grootte in de
+# index, en de eerste N acties van een spel lezen betekent alleen het begin van één blok
+# lezen. Beide bestanden worden via mmap gelezen, zonder het hele archief in te lezen.
+#
+# append() codeert het blok en geeft direct het nummer van het spel terug; een achtergrond
+# thread schrijft de blokken per batch weg (blokken, fsync, dan de index), net als de WAL in
+# persistence.py. Zo wacht het einde van een spel nooit op de schijf. Spellen die nog niet
+# geschreven zijn worden uit het geheugen gelezen.
+#
+# Blok in games.bin:
+#   seed (u64), lobbycode (u8 lengte + ascii)
+#   spelertabel: aantal (u16), per speler: id (u8 lengte + utf-8), naam (u16 lengte + utf-8, 0xFFFF = geen naam)
+#   aantal startspelers (u16): de eerste n spelers uit de tabel, in de volgorde bij de start
+#   aantal acties (u32), per actie: actie (u8), speler index (u16), aantal kaarten (u16), kaartcodes (u8 elk)
+
+ARCHIVE_MAGIC = b'LBRP\x01'
+DEFAULT_FLUSH_INTERVAL = 0.5 # Seconden tussen twee batches naar de schijf
+NO_VALUE = 0xFFFF # Speler index, naam lengte of aantal kaarten dat None voorstelt
+
+_DATA_FILE = 'games.bin'
+_INDEX_FILE = 'games.idx'
+_INDEX_ENTRY = struct.Struct('>QQIId8s') # seed, offset, lengte, aantal acties, tijdstip, lobbycode
+_GAME_HEADER = struct.Struct('>QB') # seed, lengte lobbycode
+_ACTION = struct.Struct('>BHH') # actie, speler index, aantal kaarten
+_ACTION_CODES = {action: code for code, action in enumerate(GAME_ACTIONS)}
+
+
+class ReplayArchive:
+    """
+    Append-only archief met de GameRecords van afgelopen spellen.
+    Args:
+        directory (str): Map voor games.bin en games.idx (wordt aangemaakt).
+        flush_interval (float): Seconden tussen twee batches die de achtergrond thread wegschrijft.
+    """
+
+    def __init__(self, directory, flush_interval=DEFAULT_FLUSH_INTERVAL):
+        self.directory = directory
+        self.flush_interval = flush_interval
+        os.makedirs(directory, exist_ok=True)
+        self._guard = threading.Lock()
+        self._data_file = open(os.path.join(directory, _DATA_FILE), 'a+b')
+        self._index_file = open(os.path.join(directory, _INDEX_FILE), 'a+b')
+        self._data_map = None
+        self._index_map = None
+
+        data_size = os.fstat(self._data_file.fileno()).st_size
+        if data_size == 0:
+            self._data_file.write(ARCHIVE_MAGIC)
+            self._data_file.flush()
+            data_size = len(ARCHIVE_MAGIC)
+        elif self._read(self._data_file, 0, len(ARCHIVE_MAGIC)) != ARCHIVE_MAGIC:
+            raise ValueError(f"{self._data_file.name} is geen replay archief.")
+
+        # Een crash tijdens het schrijven kan een half index record of een index record
+        # zonder (volledig) blok achterlaten: die worden afgekapt
+        index_size = os.fstat(self._index_file.fileno()).st_size
+        self._count = index_size // _INDEX_ENTRY.size
+        while self._count:
+            _, offset, length, _, _, _ = _INDEX_ENTRY.unpack(
+                self._read(self._index_file, (self._count - 1) * _INDEX_ENTRY.size, _INDEX_ENTRY.size))
+            if offset + length <= data_size:
+                break
+            self._count -= 1
+        if self._count * _INDEX_ENTRY.size != index_size:
+            self._index_file.truncate(self._count * _INDEX_ENTRY.size)
+
+        # Seed -> spel nummer, zodat hetzelfde spel niet twee keer gearchiveerd wordt
+        self._game_ids = {}
+        for game_id in range(self._count):
+            seed = _INDEX_ENTRY.unpack(self._read(self._index_file, game_id * _INDEX_ENTRY.size, _INDEX_ENTRY.size))[0]
+            self._game_ids[seed] = game_id
+        # Een half geschreven blok na het laatste spel wordt afgekapt: nieuwe blokken komen direct
+        # na het laatste spel, op de offset die append() alvast in het index record zet
+        data_size = len(ARCHIVE_MAGIC)
+        if self._count:
+            _, offset, length, _, _, _ = _INDEX_ENTRY.unpack(
+                self._read(self._index_file, (self._count - 1) * _INDEX_ENTRY.size, _INDEX_ENTRY.size))
+            data_size = offset + length
+        self._data_file.truncate(data_size)
+
+        self._written = self._count # Spellen die al in de bestanden staan
+        self._data_size = data_size # Grootte van games.bin als alle wachtende blokken geschreven zijn
+        self._pending = {} # { spel nummer: (index record, blok) } nog niet geschreven, oplopend
+        self._wake = threading.Event()
+        self._closed = False
+        self._writer = threading.Thread(target=self._run_writer, name='replay-archive', daemon=True)
+        self._writer.start()
+
+    def __len__(self):
+        return self._count
+
+    def append(self, record):
+        """
+        Voegt het GameRecord van een afgelopen spel toe aan het archief. Het blok wordt op de
+        achtergrond geschreven; het spel is direct te lezen.
+        Raises:
+            ValueError: Als het record niet in het formaat past; er wordt dan niets geschreven.
+        Returns:
+            int: Het nummer van het spel in het archief. Als het spel (dezelfde seed) al
+                 gearchiveerd is, het nummer van dat spel.
+        """
+        with self._guard:
+            game_id = self._game_ids.get(record.seed)
+            if game_id is not None:
+                return game_id
+            block = _encode_game(record)
+            entry = _INDEX_ENTRY.pack(record.seed, self._data_size, len(block), len(record.actions),
+                                      time.time(), record.lobby_code.encode('ascii'))
+            game_id = self._count
+            self._pending[game_id] = (entry, block)
+            self._data_size += len(block)
+            self._game_ids[record.seed] = game_id
+            self._count += 1
+            return game_id
+
+    def game_info(self, game_id):
+        """Retourneert de gegevens uit de index van één spel als dict, of None als het niet bestaat."""
+        with self._guard:
+            entry = self._index_entry(game_id)
+        if entry is None:
+            return None
+        seed, _, _, action_count, finished_at, lobby_code = entry
+        return {
+            "gameId": game_id,
+            "lobbyCode": lobby_code.rstrip(b'\0').decode('ascii'),
+            "seed": seed,
+            "actionCount": action_count,
+            "finishedAt": finished_at
+        }
+
+    def recent(self, limit=20):
+        """Retourneert game_info van de laatste 'limit' spellen, nieuwste eerst."""
+        return [self.game_info(game_id) for game_id in range(self._count - 1, max(self._count - limit, 0) - 1, -1)]
+
+    def load(self, game_id, action_count=None):
+        """
+        Leest het GameRecord van een spel, of None als het niet bestaat.
+        Args:
+            action_count (int): Optioneel alleen de eerste 'action_count' acties inlezen.
+        """
+        with self._guard:
+            pending = self._pending.get(game_id)
+            if pending is not None:
+                return _decode_game(pending[1], 0, action_count)
+            entry = self._index_entry(game_id)
+            if entry is None:
+                return None
+            _, offset, length, _, _, _ = entry
+            data_map = self._map('_data_map', self._data_file, offset + length)
+            return _decode_game(data_map, offset, action_count)
+
+    def close(self):
+        """Schrijft de wachtende spellen weg, stopt de achtergrond thread en sluit de bestanden."""
+        if self._closed:
+            return
+        self._closed = True
+        self._wake.set()
+        self._writer.join()
+        with self._guard:
+            for data_map in (self._data_map, self._index_map):
+                if data_map is not None:
+                    data_map.close()
+            self._data_map = self._index_map = None
+            self._data_file.close()
+            self._index_file.close()
+
+    def _run_writer(self):
+        while True:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            closing = self._closed # Eerst lezen: spellen van vóór close() komen zo altijd nog in deze batch
+            self._write_pending()
+            if closing:
+                return
+
+    def _write_pending(self):
+        with self._guard:
+            batch = list(self._pending.items())
+        if not batch:
+            return
+        # Alleen deze thread schrijft; append() voegt intussen alleen spellen toe aan _pending
+        self._data_file.write(b''.join(block for _, (_, block) in batch))
+        self._data_file.flush()
+        os.fsync(self._data_file.fileno()) # De blokken moeten er staan voordat de index ernaar verwijst
+        self._index_file.write(b''.join(entry for _, (entry, _) in batch))
+        self._index_file.flush()
+        with self._guard:
+            for game_id, _ in batch:
+                del self._pending[game_id]
+            self._written += len(batch)
+
+    def _index_entry(self, game_id):
+        pending = self._pending.get(game_id)
+        if pending is not None:
+            return _INDEX_ENTRY.unpack(pending[0])
+        if not 0 <= game_id < self._written:
+            return None
+        index_map = self._map('_index_map', self._index_file, self._written * _INDEX_ENTRY.size)
+        return _INDEX_ENTRY.unpack_from(index_map, game_id * _INDEX_ENTRY.size)
+
+    def _map(self, attribute, file, size):
+        """Retourneert een mmap van 'file' van minstens 'size' bytes; mapt opnieuw als het bestand gegroeid is."""
+        current = getattr(self, attribute)
+        if current is None or len(current) < size:
+            if current is not None:
+                current.close()
+            current = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+            setattr(self, attribute, current)
+        return current
+
+    @staticmethod
+    def _read(file, offset, length):
+        file.seek(offset)
+        return file.read(length)
+
+
+def _encode_game(record):
+    """Codeert een GameRecord als blok voor games.bin (zie bovenaan dit bestand)."""
+    # Spelertabel: eerst de startspelers, daarna ids die alleen in acties voorkomen
+    player_table = [(str(player_id), name) for player_id, name in record.players]
+    player_indexes = {player_id: index for index, (player_id, _) in enumerate(player_table)}
+    encoded_actions = []
+    for action, player_id, cards in record.actions:
+        if cards is not None and len(cards) >= NO_VALUE:
+            # Past niet in het formaat (en kan geen geldige zet zijn); liever geen archief dan een half blok
+            raise ValueError(f"Actie '{action}' met {len(cards)} kaarten past niet in het replay archief.")
+        if player_id is None:
+            player_index = NO_VALUE
+        else:
+            player_id = str(player_id) # Niet-tekst ids (van een client) passen nooit op een speler
+            player_index = player_indexes.get(player_id)
+            if player_index is None:
+                player_index = player_indexes[player_id] = len(player_table)
+                player_table.append((player_id, None))
+        encoded_actions.append(_ACTION.pack(_ACTION_CODES[action], player_index,
+                                            NO_VALUE if cards is None else len(cards)))
+        if cards:
+            encoded_actions.append(bytes(cards))
+
+    lobby_code = record.lobby_code.encode('ascii')
+    parts = [_GAME_HEADER.pack(record.seed, len(lobby_code)), lobby_code, struct.pack('>H', len(player_table))]
+    for player_id, name in player_table:
+        # Echte ids en namen zijn kort; extreem lange waarden van een client worden afgekapt
+        encoded_id = player_id.encode('utf-8')[:0xFF]
+        parts.append(struct.pack('>B', len(encoded_id)) + encoded_id)
+        if name is None:
+            parts.append(struct.pack('>H', NO_VALUE))
+        else:
+            encoded_name = name.encode('utf-8')[:NO_VALUE - 1]
+            parts.append(struct.pack('>H', len(encoded_name)) + encoded_name)
+    parts.append(struct.pack('>HI', len(record.players), len(record.actions)))
+    parts.extend(encoded_actions)
+    return b''.join(parts)
+
+
+def _decode_game(data, offset, action_count=None):
+    """Leest een GameRecord uit een blok dat op 'offset' in 'data' begint."""
+    seed, code_length = _GAME_HEADER.unpack_from(data, offset)
+    offset += _GAME_HEADER.size
+    lobby_code = data[offset:offset + code_length].decode('ascii')
+    offset += code_length
+    (table_size,) = struct.unpack_from('>H', data, offset)
+    offset += 2
+    player_table = []
+    for _ in range(table_size):
+        id_length = data[offset]
+        player_id = data[offset + 1:offset + 1 + id_length].decode('utf-8', 'replace')
+        offset += 1 + id_length
+        (name_length,) = struct.unpack_from('>H', data, offset)
+        offset += 2
+        name = None
+        if name_length != NO_VALUE:
+            name = data[offset:offset + name_length].decode('utf-8', 'replace')
+            offset += name_length
+        player_table.append((player_id, name))
+    player_count, stored_action_count = struct.unpack_from('>HI', data, offset)
+    offset += 6
+
+    if action_count is None or action_count > stored_action_count:
+        action_count = stored_action_count
+    actions = []
+    for _ in range(action_count):
+        action_code, player_index, card_count = _ACTION.unpack_from(data, offset)
+        offset += _ACTION.size
+        cards = None
+        if card_count != NO_VALUE:
+            cards = tuple(data[offset:offset + card_count])
+            offset += card_count
+        player_id = player_table[player_index][0] if player_index != NO_VALUE else None
+        actions.append((GAME_ACTIONS[action_code], player_id, cards))
+    return GameRecord(lobby_code, seed, tuple(player_table[:player_count]), actions)
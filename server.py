@@ -0,0 +1,166 @@
+import argparse
+import importlib.util
+import os
+import signal
+import subprocess
+import sys
+import time
+
+# --- Productie entry point ---
+# 'python app.py' start de development server (debug, reloader). Voor productie start
+# je de server met dit script:
+#
+#   python server.py --async-mode eventlet --port 5000
+#   python server.py --async-mode gevent --workers 4 --port 5000 --public-url 'https://liarsbar.example:{port}'
+#
+# Async modes:
+#   eventlet / gevent - elke verbinding is een greenlet in plaats van een thread; hiermee houdt
+#                       één proces tienduizenden (idle) websockets open. Vereist het package.
+#   threading         - de werkzeug server met een thread per verbinding; alleen voor kleine
+#                       aantallen spelers. Flask-SocketIO is een WSGI extensie, dus een asyncio
+#                       (ASGI) stack is met deze app niet mogelijk.
+#
+# Met --workers N start dit script N worker processen op opeenvolgende poorten. De workers
+# verdelen de lobbies onderling via de consistent-hash ring uit sharding.py; zet een load
+# balancer met sticky sessions ervoor. Met een gedeelde lobby store (LOBBY_STORE_URL) en
+# een message queue (SOCKETIO_MESSAGE_QUEUE) kan elke worker elke lobby bedienen.
+#
+# Afsluiten (SIGTERM of Ctrl-C): de worker laat geen nieuwe lobbies en spelers meer toe, wacht
+# tot lopende events verwerkt zijn en lobbies leeg zijn (maximaal --drain-timeout seconden) en
+# stopt dan. Een tweede signaal stopt direct.
+
+ASYNC_MODES = ('eventlet', 'gevent', 'threading')
+DEFAULT_PORT = 5000
+DEFAULT_DRAIN_TIMEOUT = 60.0
+DRAIN_POLL_INTERVAL = 0.5
+
+
+def _patch_async_mode(async_mode):
+    """Monkey patcht de standaard library voor eventlet of gevent; moet vóór het importeren van app gebeuren."""
+    if async_mode == 'eventlet':
+        import eventlet
+        eventlet.monkey_patch()
+    elif async_mode == 'gevent':
+        from gevent import monkey
+        monkey.patch_all()
+
+
+def _raise_file_limit():
+    """Verhoogt het maximaal aantal open bestanden (elke websocket is er één) naar de harde limiet."""
+    try:
+        import resource
+    except ImportError: # Niet beschikbaar op Windows
+        return
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if hard != resource.RLIM_INFINITY and soft < hard:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+
+
+def _configure_environment(args):
+    """Zet de opties als LIARSBAR_* omgevingsvariabelen, die app.py bij het importeren inleest."""
+    os.environ['LIARSBAR_SOCKETIO_ASYNC_MODE'] = args.async_mode
+    os.environ['LIARSBAR_SOCKETIO_PING_INTERVAL'] = str(args.ping_interval)
+    os.environ['LIARSBAR_SOCKETIO_PING_TIMEOUT'] = str(args.ping_timeout)
+    os.environ['LIARSBAR_SOCKETIO_MAX_HTTP_BUFFER_SIZE'] = str(args.max_buffer_size)
+
+
+def run_worker(args, port):
+    """Start één worker proces op 'port' en blokkeert tot de server gestopt is."""
+    _configure_environment(args)
+    _patch_async_mode(args.async_mode)
+    _raise_file_limit()
+    import app as liarsbar
+
+    draining = []
+
+    def drain():
+        liarsbar.server_draining.set()
+        liarsbar.socketio.emit('error_message', {'message': 'De server wordt herstart. Lopende spellen kunnen nog even doorgaan.'})
+        deadline = time.monotonic() + args.drain_timeout
+        while time.monotonic() < deadline:
+            busy = liarsbar.lobby_actors.active_lobbies()
+            # Lobbies in een gedeelde store blijven bestaan, daarop hoeft niet gewacht te worden
+            open_lobbies = 0 if liarsbar.lobby_store.shared else len(liarsbar.lobby_store.lobby_codes())
+            if not busy and not open_lobbies:
+                break
+            liarsbar.socketio.sleep(DRAIN_POLL_INTERVAL)
+        print(f"Worker op poort {port} is leeg, server stopt.")
+        # Stop de server via een KeyboardInterrupt in de hoofdthread (zie handle_shutdown_signal);
+        # dat werkt in elke async mode
+        os.kill(os.getpid(), signal.SIGINT)
+
+    def handle_shutdown_signal(signum, frame):
+        if draining:
+            raise KeyboardInterrupt # Tweede signaal, of drain() is klaar: nu stoppen
+        draining.append(signum)
+        print(f"Worker op poort {port} sluit af: nieuwe lobbies geweigerd, lopende lobbies worden afgewacht "
+              f"(maximaal {args.drain_timeout:.0f}s).")
+        liarsbar.socketio.start_background_task(drain)
+
+    signal.signal(signal.SIGTERM, handle_shutdown_signal)
+    signal.signal(signal.SIGINT, handle_shutdown_signal)
+
+    print(f"Liar's Bar worker gestart op {args.host}:{port} (async mode {liarsbar.socketio.async_mode}).")
+    try:
+        if args.async_mode == 'threading':
+            print("Waarschuwing: async mode 'threading' gebruikt de werkzeug server en is niet geschikt voor veel verbindingen.")
+            liarsbar.socketio.run(liarsbar.app, host=args.host, port=port, debug=False, use_reloader=False,
+                                  log_output=False, allow_unsafe_werkzeug=True)
+        else:
+            liarsbar.socketio.run(liarsbar.app, host=args.host, port=port, debug=False, use_reloader=False,
+                                  log_output=False)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        liarsbar.close_lobbies()
+
+
+def run_supervisor(args):
+    """Start args.workers worker processen op opeenvolgende poorten en wacht tot ze allemaal gestopt zijn."""
+    ports = [args.port + index for index in range(args.workers)]
+    shards = [args.public_url.format(port=port) for port in ports]
+    workers = []
+    for index, port in enumerate(ports):
+        env = dict(os.environ, LOBBY_SHARDS=','.join(shards), LOBBY_SHARD=shards[index])
+        command = [sys.executable, os.path.abspath(__file__), *sys.argv[1:], '--worker-index', str(index)]
+        workers.append(subprocess.Popen(command, env=env))
+
+    def forward_signal(signum, frame):
+        for worker in workers:
+            if worker.poll() is None:
+                worker.send_signal(signum)
+
+    signal.signal(signal.SIGTERM, forward_signal)
+    signal.signal(signal.SIGINT, forward_signal)
+    exit_code = 0
+    for worker in workers:
+        exit_code = worker.wait() or exit_code
+    return exit_code
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Productie server voor Liar's Bar.")
+    parser.add_argument('--host', default='0.0.0.0', help="Adres waarop de server luistert.")
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help="Poort (van de eerste worker).")
+    parser.add_argument('--async-mode', default='eventlet', choices=ASYNC_MODES, help="Concurrency model van de server.")
+    parser.add_argument('--workers', type=int, default=1, help="Aantal worker processen.")
+    parser.add_argument('--public-url', default='http://127.0.0.1:{port}',
+                        help="Publiek adres van een worker, met {port} voor de poort (voor lobby redirects).")
+    parser.add_argument('--ping-interval', type=float, default=25, help="Seconden tussen pings naar een client.")
+    parser.add_argument('--ping-timeout', type=float, default=20, help="Seconden wachten op een pong.")
+    parser.add_argument('--max-buffer-size', type=int, default=100_000, help="Maximale grootte van een bericht van een client (bytes).")
+    parser.add_argument('--drain-timeout', type=float, default=DEFAULT_DRAIN_TIMEOUT,
+                        help="Maximaal aantal seconden wachten op lopende lobbies bij het afsluiten.")
+    parser.add_argument('--worker-index', type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.async_mode != 'threading' and importlib.util.find_spec(args.async_mode) is None:
+        parser.error(f"async mode '{args.async_mode}' vereist het '{args.async_mode}' package.")
+
+    if args.workers > 1 and args.worker_index is None:
+        sys.exit(run_supervisor(args))
+    run_worker(args, args.port + (args.worker_index or 0))
+
+
+if __name__ == '__main__':
+    main()
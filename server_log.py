@@ -0,0 +1,179 @@
+import json
+import sys
+import threading
+import time
+import uuid
+
+# --- Gestructureerde log van de server ---
+# Wat de server doet (verbindingen, lobbies, spellen) wordt gelogd als JSON records met een
+# niveau, een eventnaam en velden, één record per regel. Een handler zet het record alleen
+# in een buffer (een tuple erbij onder een lock, een paar microseconden); een achtergrond
+# thread codeert de records en schrijft ze per batch weg, net als de WAL in persistence.py.
+# Zo wacht een event nooit op stdout of een bestand.
+#
+# Drukke events (zoals elke nieuwe verbinding) kunnen gesampled worden: met LOG_SAMPLING
+# { "socket_connected": 10 } wordt één op de tien records geschreven, met "sampled": 10
+# erbij zodat tellingen te reconstrueren zijn.
+#
+# Records over een lobby krijgen naast de lobbycode een correlatie id ("lobbyId"). De code
+# wordt na het verwijderen van een lobby hergebruikt; de id is uniek per lobby, zodat alle
+# records van één lobby (van aanmaken tot opruimen) terug te vinden zijn.
+#
+# Een record:
+#   {"ts": 1760000000.123, "level": "info", "event": "lobby_created", "lobby": "ABCD", "lobbyId": "3f2a...", "player": "Anna"}
+
+LEVELS = {'debug': 10, 'info': 20, 'warning': 30, 'error': 40}
+DEFAULT_LOG_LEVEL = 'info'
+DEFAULT_FLUSH_INTERVAL = 0.25 # Seconden tussen twee batches
+DEFAULT_MAX_PENDING = 10_000 # Records in de buffer; daarboven worden nieuwe records weggegooid (en geteld)
+DEFAULT_SAMPLING = {
+    'socket_connected': 10,
+    'player_name_set': 10,
+}
+
+
+def log_to_stderr(level, event, lobby=None, **fields):
+    """
+    Schrijft één record direct naar stderr, in hetzelfde formaat als ServerLog. Standaard log
+    van modules die ook zonder server gebruikt worden (scripts, benchmarks); de server geeft
+    ze ServerLog.log mee.
+    """
+    record = {'ts': round(time.time(), 3), 'level': level, 'event': event}
+    if lobby:
+        record['lobby'] = lobby
+    record.update(fields)
+    sys.stderr.write(json.dumps(record, ensure_ascii=False, default=str) + '\n')
+
+
+class ServerLog:
+    """
+    Gestructureerde log met een achtergrond thread die in batches schrijft.
+    Args:
+        path (str): Bestand waar de records aan toegevoegd worden, of None voor stdout.
+        level (str): Laagste niveau dat gelogd wordt (zie LEVELS).
+        flush_interval (float): Seconden tussen twee batches.
+        sampling (dict): { "event": n } schrijft één op de n records van dat event.
+        max_pending (int): Maximaal aantal records dat op de achtergrond thread wacht.
+    """
+
+    def __init__(self, path=None, level=DEFAULT_LOG_LEVEL, flush_interval=DEFAULT_FLUSH_INTERVAL,
+                 sampling=None, max_pending=DEFAULT_MAX_PENDING):
+        if level not in LEVELS:
+            raise ValueError(f"Onbekend log niveau '{level}', kies uit {', '.join(LEVELS)}.")
+        self.path = path
+        self.min_level = LEVELS[level]
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.sampling = dict(DEFAULT_SAMPLING if sampling is None else sampling)
+        self._sample_counts = dict.fromkeys(self.sampling, 0)
+        self._lobby_ids = {} # { "lobby_code": correlatie id } van de lobbies die nu bestaan
+        self._guard = threading.Lock()
+        self._pending = [] # (tijd, niveau, event, lobbycode, correlatie id, velden)
+        self._dropped = 0
+        self._wake = threading.Event()
+        self._closed = False
+        self._writer = None
+
+    def start(self):
+        """Start de achtergrond thread die de records wegschrijft."""
+        if self._writer is None:
+            self._writer = threading.Thread(target=self._run_writer, name='server-log', daemon=True)
+            self._writer.start()
+
+    def log(self, level, event, lobby=None, **fields):
+        """Zet een record in de buffer (als het niveau gelogd wordt en het record niet weggesampled wordt)."""
+        if LEVELS[level] < self.min_level:
+            return
+        every = self.sampling.get(event)
+        with self._guard:
+            if every:
+                count = self._sample_counts[event]
+                self._sample_counts[event] = count + 1
+                if count % every:
+                    return
+                fields['sampled'] = every
+            if len(self._pending) >= self.max_pending:
+                self._dropped += 1
+                return
+            lobby_id = None
+            if lobby:
+                lobby_id = self._lobby_ids.get(lobby)
+                if lobby_id is None:
+                    # Bijv. een lobby van een vorige run of (met een gedeelde store) van een andere worker
+                    lobby_id = self._lobby_ids[lobby] = uuid.uuid4().hex[:16]
+            self._pending.append((time.time(), level, event, lobby, lobby_id, fields))
+            if len(self._pending) == self.max_pending // 2:
+                self._wake.set() # Een piek: niet wachten tot het volgende interval
+
+    def debug(self, event, lobby=None, **fields):
+        self.log('debug', event, lobby, **fields)
+
+    def info(self, event, lobby=None, **fields):
+        self.log('info', event, lobby, **fields)
+
+    def warning(self, event, lobby=None, **fields):
+        self.log('warning', event, lobby, **fields)
+
+    def error(self, event, lobby=None, **fields):
+        self.log('error', event, lobby, **fields)
+
+    def bind_lobby(self, lobby_code):
+        """Geeft een (nieuwe) lobby een eigen correlatie id; records over de lobby krijgen die mee."""
+        with self._guard:
+            lobby_id = self._lobby_ids[lobby_code] = uuid.uuid4().hex[:16]
+        return lobby_id
+
+    def forget_lobby(self, lobby_code):
+        """
+        Vergeet de correlatie id van een verwijderde lobby (de code kan hergebruikt worden).
+        Records die al in de buffer staan houden hun id.
+        """
+        with self._guard:
+            self._lobby_ids.pop(lobby_code, None)
+
+    def close(self):
+        """Schrijft alle wachtende records weg en stopt de achtergrond thread."""
+        if self._closed:
+            return
+        self._closed = True
+        if self._writer is None:
+            self._write_pending() # Nooit gestart: schrijf direct
+            return
+        self._wake.set()
+        self._writer.join()
+
+    def _run_writer(self):
+        while True:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            closing = self._closed # Eerst lezen: records van vóór close() komen zo altijd nog in deze batch
+            self._write_pending()
+            if closing:
+                return
+
+    def _write_pending(self):
+        with self._guard:
+            pending, self._pending = self._pending, []
+            dropped, self._dropped = self._dropped, 0
+        if dropped:
+            pending.append((time.time(), 'warning', 'log_records_dropped', None, None, {'count': dropped}))
+        if not pending:
+            return
+        lines = []
+        for timestamp, level, event, lobby, lobby_id, fields in pending:
+            record = {'ts': round(timestamp, 3), 'level': level, 'event': event}
+            if lobby:
+                record['lobby'] = lobby
+                record['lobbyId'] = lobby_id
+            record.update(fields)
+            lines.append(json.dumps(record, ensure_ascii=False, default=str))
+        text = '\n'.join(lines) + '\n'
+        try:
+            if self.path:
+                with open(self.path, 'a', encoding='utf-8') as log_file:
+                    log_file.write(text)
+            else:
+                sys.stdout.write(text)
+                sys.stdout.flush()
+        except OSError:
+            pass # Een volle schijf of gesloten stdout mag de server niet stoppen
@@ -0,0 +1,90 @@
+import bisect
+import hashlib
+import random
+import string
+
+# --- Verdeling van lobbies over workers (shards) ---
+# In plaats van een gedeelde lobby store kan elke worker zijn eigen lobbies lokaal in het
+# geheugen houden. Een consistent-hash ring bepaalt bij welke worker (shard) een lobbycode
+# hoort. Een worker maakt alleen lobbycodes aan die op de eigen shard uitkomen, en een
+# client die een lobby van een andere shard wil joinen, krijgt een 'lobby_redirect' met
+# het adres van die shard. Alle events van een lobby blijven zo op één worker.
+#
+# Omdat de ring consistent is, verhuist bij het toevoegen of weghalen van een shard maar
+# een klein deel van de codes naar een andere shard.
+#
+# LOBBY_SHARDS: komma-gescheiden lijst met de publieke adressen van alle shards,
+#               bijv. 'http://host:5001,http://host:5002'. Leeg = één shard, geen routering.
+# LOBBY_SHARD:  het adres van deze worker uit LOBBY_SHARDS.
+
+DEFAULT_VIRTUAL_NODES = 64 # Punten per shard op de ring, voor een gelijkmatige verdeling
+LOBBY_CODE_LENGTH = 4
+
+
+def _ring_hash(key):
+    """Stabiele 64-bits hash (gelijk in elk proces, in tegenstelling tot hash())."""
+    return int.from_bytes(hashlib.blake2b(key.encode('utf-8'), digest_size=8).digest(), 'big')
+
+
+class ShardRing:
+    """
+    Consistent-hash ring die lobbycodes op shards afbeeldt.
+    Args:
+        shards (list): De adressen van alle shards (dezelfde volgorde is niet nodig).
+        virtual_nodes (int): Aantal punten per shard op de ring.
+    """
+
+    def __init__(self, shards, virtual_nodes=DEFAULT_VIRTUAL_NODES):
+        if not shards:
+            raise ValueError("Een ShardRing heeft minstens één shard nodig.")
+        self.shards = sorted(set(shards))
+        points = sorted(
+            (_ring_hash(f"{shard}#{index}"), shard)
+            for shard in self.shards
+            for index in range(virtual_nodes)
+        )
+        self._hashes = [point for point, _ in points]
+        self._owners = [shard for _, shard in points]
+
+    def shard_for(self, lobby_code):
+        """Retourneert de shard die eigenaar is van een lobbycode."""
+        index = bisect.bisect(self._hashes, _ring_hash(lobby_code))
+        return self._owners[index % len(self._owners)]
+
+
+class LobbyRouter:
+    """
+    Routering van lobbies voor één worker.
+    Args:
+        shards (list): Adressen van alle shards; leeg of None betekent één shard.
+        own_shard (str): Het adres van deze worker.
+    """
+
+    def __init__(self, shards=None, own_shard=None):
+        if shards and own_shard not in shards:
+            raise ValueError(f"LOBBY_SHARD '{own_shard}' komt niet voor in LOBBY_SHARDS.")
+        self.ring = ShardRing(shards) if shards and len(shards) > 1 else None
+        self.own_shard = own_shard
+
+    def owner_of(self, lobby_code):
+        """Retourneert het adres van de shard van een lobby, of None als deze worker de eigenaar is."""
+        if self.ring is None:
+            return None
+        owner = self.ring.shard_for(lobby_code)
+        return None if owner == self.own_shard else owner
+
+    def generate_code(self, is_taken):
+        """
+        Genereert een lobbycode die op deze shard uitkomt en nog niet in gebruik is.
+        Bij N shards zijn gemiddeld N pogingen nodig.
+        """
+        while True:
+            code = ''.join(random.choices(string.ascii_uppercase, k=LOBBY_CODE_LENGTH))
+            if self.owner_of(code) is None and not is_taken(code):
+                return code
+
+
+def create_lobby_router(shards_setting=None, own_shard=None):
+    """Maakt de router voor LOBBY_SHARDS en LOBBY_SHARD (zie bovenaan dit bestand)."""
+    shards = [shard.strip().rstrip('/') for shard in (shards_setting or '').split(',') if shard.strip()]
+    return LobbyRouter(shards, own_shard.rstrip('/') if own_shard else None)
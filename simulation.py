@@ -0,0 +1,210 @@
+import argparse
+import json
+import random
+import time
+
+from game_logic import (
+    apply_action,
+    create_new_game,
+    replay_game,
+    _get_player_by_id
+)
+from game_model import JOKER, GameRecord
+from odds import estimate_lie_probability
+
+# --- Headless simulatie van complete spellen ---
+# Speelt spellen af met game_logic.py zonder sockets of Flask. Elke speler wordt
+# bestuurd door een policy met een eigen geseede random generator, zodat een
+# simulatie met dezelfde seed altijd exact hetzelfde verloopt. Dezelfde policies
+# besturen de bots in app.py (zie bots.py).
+# Acties gaan via game_logic.apply_action, net als in de handlers van app.py.
+#
+# Een spel uit productie kan hier nagespeeld worden vanuit zijn GameRecord (JSON, zie
+# GameRecord.to_wire):
+#   python simulation.py --replay record.json [--actions 42]
+
+# Spellen met 3 of meer spelers kunnen eindeloos doorgaan (een nieuwe ronde maakt
+# iedereen weer levend), daarom stopt een simulatie na een maximaal aantal acties.
+DEFAULT_MAX_ACTIONS = 500
+
+# Instellingen van de standaard policies
+POLICY_PRESETS = {
+    'random': {'bluff_chance': 0.5, 'liar_call_chance': 0.5},
+    'honest': {'bluff_chance': 0.0, 'liar_call_chance': 0.2},
+    'aggressive': {'bluff_chance': 0.8, 'liar_call_chance': 0.7},
+}
+
+
+class Policy:
+    """
+    Bepaalt de keuzes van één gesimuleerde speler.
+    Args:
+        rng (random.Random): De eigen random generator van deze speler.
+        bluff_chance (float): Kans dat de speler blufft terwijl hij passende kaarten heeft.
+        liar_call_chance (float): Kans om 'LIAR!' te roepen op een claim van één kaart;
+                                  per extra geclaimde kaart wordt de kans groter.
+    """
+
+    __slots__ = ('rng', 'bluff_chance', 'liar_call_chance')
+
+    def __init__(self, rng, bluff_chance=0.5, liar_call_chance=0.5):
+        self.rng = rng
+        self.bluff_chance = bluff_chance
+        self.liar_call_chance = liar_call_chance
+
+    def choose_cards(self, game_state, player):
+        """Retourneert de kaartcodes die de speler neerlegt (altijd 1 tot 5 kaarten uit zijn hand)."""
+        hand = player.hand
+        matching = [card for card in hand if card == game_state.deck_type or card == JOKER]
+        if matching and self.rng.random() >= self.bluff_chance:
+            return matching[:self.rng.randint(1, len(matching))]
+        cards = list(hand)
+        self.rng.shuffle(cards)
+        return cards[:self.rng.randint(1, min(3, len(cards)))]
+
+    def calls_liar(self, game_state, player):
+        """Retourneert True als de speler 'LIAR!' roept, False als hij de claim gelooft."""
+        claimed_amount = game_state.last_claim.claimed_amount or 1
+        chance = self.liar_call_chance + 0.15 * (claimed_amount - 1)
+        return self.rng.random() < chance
+
+
+# Eigen policies: { "naam": factory(rng) }. Een policy is elk object met de methodes
+# choose_cards(game_state, player) en calls_liar(game_state, player), zoals Policy.
+_POLICY_FACTORIES = {}
+
+
+def register_policy(name, factory):
+    """Registreert een eigen policy; factory(rng) maakt een policy met de gegeven random generator."""
+    _POLICY_FACTORIES[name] = factory
+
+
+def policy_names():
+    """Retourneert de namen van alle beschikbare policies."""
+    return list(POLICY_PRESETS) + [name for name in _POLICY_FACTORIES if name not in POLICY_PRESETS]
+
+
+class OddsPolicy(Policy):
+    """
+    Policy die 'LIAR!' roept als de geschatte kans dat de claim gelogen is (zie odds.py)
+    boven 'liar_threshold' ligt, in plaats van op een vaste kans.
+    """
+
+    __slots__ = ('liar_threshold',)
+
+    def __init__(self, rng, bluff_chance=0.2, liar_threshold=0.5):
+        super().__init__(rng, bluff_chance=bluff_chance, liar_call_chance=0.0)
+        self.liar_threshold = liar_threshold
+
+    def calls_liar(self, game_state, player):
+        lie_probability = estimate_lie_probability(game_state, player.id)
+        return lie_probability is not None and lie_probability > self.liar_threshold
+
+
+def make_policy(name, seed):
+    """Maakt een policy (uit POLICY_PRESETS of register_policy) met een eigen geseede random generator."""
+    if name in _POLICY_FACTORIES:
+        return _POLICY_FACTORIES[name](random.Random(seed))
+    if name not in POLICY_PRESETS:
+        raise ValueError(f"Onbekende policy '{name}', kies uit {', '.join(policy_names())}.")
+    return Policy(random.Random(seed), **POLICY_PRESETS[name])
+
+
+register_policy('odds', OddsPolicy)
+
+
+def choose_action(game_state, policy):
+    """
+    Bepaalt de volgende actie van de speler die aan de beurt is.
+    Returns:
+        tuple: (str actie, str player_id, list kaarten of None), of None als er niets te doen is.
+    """
+    player_id = game_state.current_turn
+    player = _get_player_by_id(game_state, player_id)
+    if not player:
+        return None
+    phase = game_state.phase
+    if phase == 'awaitingPlay':
+        if not player.hand:
+            return None # Zonder kaarten is er niets te leggen
+        return 'make_play', player_id, policy.choose_cards(game_state, player)
+    if phase == 'awaitingLiarCall':
+        action = 'call_liar' if policy.calls_liar(game_state, player) else 'believe_claim'
+        return action, player_id, None
+    if phase == 'resolvingDiceRoll':
+        return 'roll_dice', player_id, None
+    return None
+
+
+def simulate_game(player_count, seed, seat_policies=('random',), max_actions=DEFAULT_MAX_ACTIONS, action_hook=None):
+    """
+    Speelt één compleet spel af.
+    Args:
+        player_count (int): Aantal spelers (2 t/m 4).
+        seed (int): Seed voor het spel en de policies; dezelfde seed geeft hetzelfde spel.
+        seat_policies (tuple): Policy per stoel (zie policy_names()); wordt herhaald als er
+                               meer spelers dan namen zijn.
+        max_actions (int): Maximaal aantal acties voordat de simulatie stopt.
+        action_hook (callable): Optioneel, wordt na elke actie aangeroepen als
+                                action_hook(actie, duur_in_seconden).
+    Returns:
+        dict: { 'game_state', 'actions', 'rejected', 'winner', 'finished' }
+    """
+    player_data = [(f"sim-{seat}", f"Speler {seat + 1}") for seat in range(player_count)]
+    policies = {
+        player_id: make_policy(seat_policies[seat % len(seat_policies)], seed * 31 + seat)
+        for seat, (player_id, _) in enumerate(player_data)
+    }
+    game_state = create_new_game(f"SIM{seed}", player_data, seed=seed)
+
+    actions = 0
+    rejected = 0
+    while actions < max_actions and game_state.phase != 'gameOver':
+        chosen = choose_action(game_state, policies[game_state.current_turn]) if game_state.current_turn in policies else None
+        if chosen is None:
+            break
+        action, player_id, cards = chosen
+        if action_hook is None:
+            success, _ = apply_action(game_state, action, player_id, cards)
+        else:
+            started = time.perf_counter()
+            success, _ = apply_action(game_state, action, player_id, cards)
+            action_hook(action, time.perf_counter() - started)
+        actions += 1
+        if not success:
+            rejected += 1
+
+    alive_players = [p for p in game_state.players if p.alive]
+    finished = game_state.phase == 'gameOver'
+    return {
+        'game_state': game_state,
+        'actions': actions,
+        'rejected': rejected,
+        'winner': alive_players[0].id if finished and len(alive_players) == 1 else None,
+        'finished': finished
+    }
+
+
+def replay_record_file(path, action_count=None):
+    """Speelt een als JSON bewaard GameRecord na en retourneert de GameState."""
+    with open(path, encoding='utf-8') as record_file:
+        record = GameRecord.from_wire(json.load(record_file))
+    return replay_game(record, action_count)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Speelt een bewaard Liar's Bar spel na.")
+    parser.add_argument('--replay', required=True, help="JSON bestand met een GameRecord.")
+    parser.add_argument('--actions', type=int, help="Alleen de eerste N acties afspelen.")
+    args = parser.parse_args()
+
+    game_state = replay_record_file(args.replay, args.actions)
+    for line in game_state.log.entries():
+        print(line)
+    print(f"Fase: {game_state.phase}, aan de beurt: {game_state.current_turn}")
+    for player in game_state.players:
+        print(f"  {player.name} ({player.id}): {'levend' if player.alive else 'uit'}, hand {player.to_wire(True)['hand']}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,318 @@
+# --- Versiebeheer van de GameState stroom ---
+# Elke lobby krijgt een oplopend revisienummer. Een client ontvangt bij het joinen
+# (of na een resync) een volledige snapshot, en daarna alleen een compacte patch
+# met de velden die sinds zijn vorige revisie veranderd zijn.
+#
+# Het publieke deel van de staat (met de handen van alle spelers verborgen) is voor
+# iedere ontvanger gelijk. Dit deel wordt per revisie één keer opgebouwd en één keer
+# gedifft; per ontvanger komt daar alleen zijn eigen speler record (met hand) bij.
+# Met een codec (zie wire_codec.py) wordt ook het gedeelde deel maar één keer gecodeerd.
+
+# Velden die apart behandeld worden in een patch
+LOG_KEY = 'log'
+LOG_SEQ_KEY = 'logSeq'
+PLAYERS_KEY = 'players'
+
+_SEPARATELY_PATCHED_KEYS = (LOG_KEY, LOG_SEQ_KEY, PLAYERS_KEY)
+
+# Cache sleutel van het gecodeerde gedeelde deel van een snapshot
+_SNAPSHOT_PART = 'snapshot'
+
+
+def project_shared_state(game_state):
+    """
+    Bouwt het publieke deel van de GameState dat voor alle ontvangers gelijk is:
+    de handen van alle spelers zijn verborgen. De log wordt meegegeven als lijst van
+    de regels in de buffer, met in 'logSeq' het volgnummer van de laatste regel.
+    """
+    shared_state = game_state.to_wire(None)
+    shared_state[LOG_KEY] = game_state.log.entries()
+    shared_state[LOG_SEQ_KEY] = game_state.log.last_seq
+    return shared_state
+
+
+class _ViewerCursor:
+    """Houdt bij wat een specifieke ontvanger als laatste van de lobby heeft gekregen."""
+
+    __slots__ = ('revision', 'own_record', 'log_seq', 'shared')
+
+    def __init__(self, revision, own_record, log_seq, shared):
+        self.revision = revision
+        self.own_record = own_record # Het eigen speler record (met hand) zoals verzonden
+        self.log_seq = log_seq # Volgnummer van de laatst verzonden logregel
+        # Het publieke deel van de laatst verzonden revisie (gedeeld, niet gekopieerd), zodat
+        # een ontvanger die revisies gemist heeft (zie resume_for) één patch kan krijgen
+        self.shared = shared
+
+
+class LobbyStateStream:
+    """
+    Beheert de revisies van één lobby en bepaalt per ontvanger of een volledige
+    snapshot of een patch verstuurd moet worden.
+    """
+
+    def __init__(self, codec=None):
+        """
+        Args:
+            codec: Optioneel een codec uit wire_codec.py. Payloads zijn dan al gecodeerd;
+                   zonder codec zijn het dicts die Flask-SocketIO zelf encodeert.
+        """
+        self.revision = 0
+        self._codec = codec
+        self._viewers = {}
+        self._dirty = True # De GameState is gewijzigd sinds het publieke deel is opgebouwd
+        self._shared = None # Publiek deel van de huidige revisie
+        self._shared_patch = {} # Verschil van het publieke deel met de vorige revisie
+        self._positions = {} # Speler ID -> index in de 'players' lijst van het publieke deel
+        self._base_patches = {} # Log volgnummer van een ontvanger -> gedeelde patch inclusief log
+        self._snapshots = {} # Ontvanger -> snapshot van de huidige revisie
+        self._encoded_parts = {} # Cache sleutel -> gecodeerde velden van een gedeeld deel
+
+    def __getstate__(self):
+        """Bij opslaan in een gedeelde lobby store worden de afgeleide caches niet meegenomen."""
+        state = self.__dict__.copy()
+        state['_base_patches'] = {}
+        state['_snapshots'] = {}
+        state['_encoded_parts'] = {}
+        return state
+
+    def mark_dirty(self):
+        """
+        Markeert de GameState als gewijzigd. Het publieke deel wordt pas opnieuw
+        opgebouwd (als nieuwe revisie) wanneer er iets naar een ontvanger gaat.
+        """
+        self._dirty = True
+
+    def drop_viewer(self, viewer_id):
+        """Vergeet een ontvanger (bij disconnect of resync), zodat hij opnieuw een snapshot krijgt."""
+        self._viewers.pop(viewer_id, None)
+        self._snapshots.pop(viewer_id, None)
+
+    def _set_shared(self, shared_state):
+        """Stelt het publieke deel in en leegt alles wat daarvan afgeleid en gecachet is."""
+        self._shared = shared_state
+        self._positions = {p['id']: index for index, p in enumerate(shared_state[PLAYERS_KEY])}
+        self._base_patches = {}
+        self._snapshots = {}
+        self._encoded_parts = {}
+
+    def _current_shared(self, game_state):
+        """
+        Retourneert het publieke deel van de huidige revisie. Na een wijziging wordt dit
+        één keer opgebouwd als nieuwe revisie, samen met de gedeelde patch. Logregels die
+        zonder nieuwe revisie zijn toegevoegd (chat) worden alleen in de log bijgewerkt.
+        """
+        if self._dirty or self._shared is None:
+            previous_shared = self._shared
+            self.revision += 1
+            self._set_shared(project_shared_state(game_state))
+            self._shared_patch = compute_state_patch(previous_shared, self._shared) if previous_shared is not None else {}
+            self._dirty = False
+        elif self._shared[LOG_SEQ_KEY] != game_state.log.last_seq:
+            shared_state = dict(self._shared)
+            shared_state[LOG_KEY] = game_state.log.entries()
+            shared_state[LOG_SEQ_KEY] = game_state.log.last_seq
+            self._set_shared(shared_state)
+        return self._shared
+
+    def _own_record(self, game_state, viewer_id):
+        """Retourneert het speler record van de ontvanger met zijn hand zichtbaar (of None)."""
+        position = self._positions.get(viewer_id)
+        if position is None:
+            return None
+        return game_state.players[position].to_wire(True, game_state.started)
+
+    def _assemble(self, part_key, shared_part, viewer_part):
+        """
+        Voegt het gedeelde deel en het deel van één ontvanger samen tot de payload.
+        Velden in 'viewer_part' vervangen die in 'shared_part'. Met een codec wordt het
+        gedeelde deel per revisie één keer gecodeerd (onder 'part_key').
+        """
+        if self._codec is None:
+            payload = dict(shared_part)
+            payload.update(viewer_part)
+            return payload
+        encoded_fields = self._encoded_parts.get(part_key)
+        if encoded_fields is None:
+            encoded_fields = self._codec.encode_fields(shared_part)
+            if part_key is not None:
+                self._encoded_parts[part_key] = encoded_fields
+        return self._codec.splice(encoded_fields, viewer_part)
+
+    def _base_patch(self, log_seq):
+        """
+        Retourneert de patch die gelijk is voor alle ontvangers die de vorige revisie
+        hebben en logregels tot en met 'log_seq'. Deze wordt per log volgnummer maar één
+        keer opgebouwd; normaal gesproken zitten alle ontvangers op hetzelfde volgnummer.
+        """
+        patch = self._base_patches.get(log_seq)
+        if patch is None:
+            patch = self._base_patches[log_seq] = self._with_log(self._shared_patch, log_seq)
+        return patch
+
+    def _with_log(self, shared_patch, log_seq):
+        """Vult een patch van het publieke deel aan met de logregels na 'log_seq'."""
+        patch = dict(shared_patch)
+        shared_state = self._shared
+        current_log_seq = shared_state[LOG_SEQ_KEY]
+        if log_seq != current_log_seq:
+            changed = patch['set'] = dict(patch.get('set', {}))
+            changed[LOG_SEQ_KEY] = current_log_seq
+            # Alleen de regels na het laatst verzonden volgnummer.
+            # Als er meer nieuwe regels zijn dan de buffer bevat, sturen we de hele buffer.
+            log = shared_state[LOG_KEY]
+            newer_count = current_log_seq - log_seq
+            if 0 <= newer_count <= len(log):
+                patch['logAppend'] = log[len(log) - newer_count:]
+            else:
+                changed[LOG_KEY] = log
+        return patch
+
+    def snapshot_for(self, viewer_id, game_state, acknowledged_log_seq=None):
+        """
+        Retourneert een volledige snapshot voor een ontvanger en markeert deze als bijgewerkt.
+        Zolang de GameState niet wijzigt, wordt dezelfde snapshot hergebruikt.
+        Args:
+            acknowledged_log_seq (int): Optioneel het laatste log volgnummer dat de ontvanger
+                                        al heeft. De snapshot bevat dan alleen nieuwere regels
+                                        en 'logBase' geeft aan waar deze op aansluiten.
+        Returns:
+            De publieke staat aangevuld met het huidige 'revision' nummer
+            (een dict, of gecodeerd als de stroom een codec heeft).
+        """
+        shared_state = self._current_shared(game_state)
+        own_record = self._own_record(game_state, viewer_id)
+        self._viewers[viewer_id] = _ViewerCursor(self.revision, own_record, shared_state[LOG_SEQ_KEY], shared_state)
+
+        if acknowledged_log_seq is None:
+            snapshot = self._snapshots.get(viewer_id)
+            if snapshot is not None:
+                return snapshot
+
+        viewer_part = {'revision': self.revision}
+        if own_record is not None:
+            players = list(shared_state[PLAYERS_KEY])
+            players[self._positions[viewer_id]] = own_record
+            viewer_part[PLAYERS_KEY] = players
+        if acknowledged_log_seq is not None:
+            log = shared_state[LOG_KEY]
+            newer_count = shared_state[LOG_SEQ_KEY] - acknowledged_log_seq
+            if 0 <= newer_count <= len(log):
+                viewer_part[LOG_KEY] = log[len(log) - newer_count:]
+                viewer_part['logBase'] = acknowledged_log_seq
+
+        snapshot = self._assemble(_SNAPSHOT_PART, shared_state, viewer_part)
+        if acknowledged_log_seq is None:
+            self._snapshots[viewer_id] = snapshot
+        return snapshot
+
+    def message_for(self, viewer_id, game_state):
+        """
+        Bepaalt wat een ontvanger bij de huidige revisie moet krijgen.
+        Returns:
+            tuple: (str event_naam, payload) waarbij event_naam
+                   'game_state_update' (snapshot) of 'game_state_patch' is,
+                   of (None, None) als de ontvanger de huidige revisie al heeft.
+        """
+        self._current_shared(game_state)
+        cursor = self._viewers.get(viewer_id)
+        if cursor is not None and cursor.revision == self.revision:
+            return None, None # Bijv. al bijgewerkt door resume_for
+        if cursor is None or cursor.revision != self.revision - 1:
+            # Nieuwe ontvanger, of hij mist meer dan één revisie
+            return 'game_state_update', self.snapshot_for(viewer_id, game_state)
+        return 'game_state_patch', self._viewer_patch(viewer_id, cursor, self._base_patch(cursor.log_seq),
+                                                      ('patch', cursor.log_seq), game_state)
+
+    def resume_for(self, viewer_id, game_state, revision, log_seq):
+        """
+        Bepaalt wat een ontvanger die de verbinding kwijt was moet krijgen om weer bij te zijn.
+        Heeft de client nog precies de revisie die hij als laatste van ons kreeg, dan is dat
+        één patch met alles wat sindsdien veranderd is (over meerdere revisies heen);
+        anders een volledige snapshot.
+        Args:
+            revision (int): De revisie die de client heeft (None = geen).
+            log_seq (int): Het laatste log volgnummer van de client.
+        Returns:
+            tuple: (str event_naam, payload), zoals message_for.
+        """
+        shared_state = self._current_shared(game_state)
+        cursor = self._viewers.get(viewer_id)
+        if cursor is None or revision is None or cursor.revision != revision or cursor.log_seq != log_seq:
+            return 'game_state_update', self.snapshot_for(viewer_id, game_state, log_seq)
+        base_patch = self._with_log(compute_state_patch(cursor.shared, shared_state), cursor.log_seq)
+        return 'game_state_patch', self._viewer_patch(viewer_id, cursor, base_patch, None, game_state)
+
+    def _viewer_patch(self, viewer_id, cursor, base_patch, part_key, game_state):
+        """
+        Maakt van een gedeelde patch de patch voor één ontvanger (met zijn eigen hand) en zet
+        zijn cursor op de huidige revisie. Met 'part_key' None wordt het gedeelde deel niet gecachet.
+        """
+        viewer_part = {}
+        own_record = self._own_record(game_state, viewer_id)
+        if own_record is not None:
+            changed = base_patch.get('set')
+            if changed and PLAYERS_KEY in changed:
+                # De samenstelling is veranderd: de volledige lijst, met de eigen hand erin
+                changed = viewer_part['set'] = dict(changed)
+                players = changed[PLAYERS_KEY] = list(changed[PLAYERS_KEY])
+                players[self._positions[viewer_id]] = own_record
+            else:
+                changed_players = base_patch.get(PLAYERS_KEY)
+                if own_record != cursor.own_record or (changed_players and viewer_id in changed_players):
+                    changed_players = dict(changed_players) if changed_players else {}
+                    changed_players[viewer_id] = own_record
+                    viewer_part[PLAYERS_KEY] = changed_players
+
+        viewer_part['baseRevision'] = cursor.revision
+        viewer_part['revision'] = self.revision
+        patch = self._assemble(part_key, base_patch, viewer_part)
+        cursor.revision = self.revision
+        cursor.own_record = own_record
+        cursor.log_seq = self._shared[LOG_SEQ_KEY]
+        cursor.shared = self._shared
+        return patch
+
+
+def compute_state_patch(previous_state, public_state):
+    """
+    Berekent het verschil tussen het publieke deel van de vorige en de huidige revisie.
+    De log en 'logSeq' worden per ontvanger aangevuld (zie LobbyStateStream._base_patch).
+    Returns:
+        dict: Een patch met (alleen indien van toepassing) de sleutels
+              'set' (gewijzigde velden), 'unset' (verdwenen velden) en
+              'players' (gewijzigde spelers op ID, of de volledige lijst in 'set'
+              als de samenstelling veranderd is).
+    """
+    patch = {}
+
+    changed = {}
+    for key, value in public_state.items():
+        if key in _SEPARATELY_PATCHED_KEYS:
+            continue
+        if key not in previous_state or previous_state[key] != value:
+            changed[key] = value
+    removed = [
+        key for key in previous_state
+        if key not in public_state and key not in _SEPARATELY_PATCHED_KEYS
+    ]
+    if changed:
+        patch['set'] = changed
+    if removed:
+        patch['unset'] = removed
+
+    # Spelers: als de volgorde/samenstelling gelijk is sturen we alleen gewijzigde records
+    players = public_state.get(PLAYERS_KEY, [])
+    previous_players = previous_state.get(PLAYERS_KEY, [])
+    old_ids = [p['id'] for p in previous_players]
+    new_ids = [p['id'] for p in players]
+    if old_ids != new_ids:
+        patch.setdefault('set', {})[PLAYERS_KEY] = players
+    else:
+        changed_players = {
+            new['id']: new for old, new in zip(previous_players, players) if old != new
+        }
+        if changed_players:
+            patch['players'] = changed_players
+
+    return patch
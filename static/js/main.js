@@ -17,6 +17,7 @@ document.addEventListener('DOMContentLoaded', () => {
     const currentLobbyCodeSpan = document.getElementById('currentLobbyCode');
     const playersInLobbyUl = document.getElementById('playersInLobby');
     const startGameBtn = document.getElementById('startGameBtn');
+    const addBotBtn = document.getElementById('addBotBtn');
     const playerListDiv = document.getElementById('player-list');
     const deckTypeCardsDiv = document.getElementById('deck-type-cards');
     const pileDisplayP = document.getElementById('currentClaim');
@@ -36,6 +37,14 @@ document.addEventListener('DOMContentLoaded', () => {
     const messageBoxCloseBtn = document.getElementById('messageBoxCloseBtn');
     const playerDiceStatusContainer = document.getElementById('dice-status-container'); 
     const restartGameBtn = document.getElementById('restartGameBtn'); // NIEUW: Restart game knop
+    const gameActionsDiv = document.getElementById('game-actions');
+    const replayControls = document.getElementById('replay-controls');
+    const replayPrevBtn = document.getElementById('replayPrevBtn');
+    const replayNextBtn = document.getElementById('replayNextBtn');
+    const replayStepInfo = document.getElementById('replayStepInfo');
+    const replayActionText = document.getElementById('replayActionText');
+    const showOddsToggle = document.getElementById('showOddsToggle');
+    const claimOddsP = document.getElementById('claimOdds');
 
     // Elementen voor eliminatie animatie
     const eliminationOverlay = document.getElementById('elimination-animation-overlay');
@@ -43,11 +52,32 @@ document.addEventListener('DOMContentLoaded', () => {
 
     let selectedCards = []; // Houdt de geselecteerde kaarten in de hand van de speler bij
     let currentLobbyCode = null; // Houdt de huidige lobbycode bij
-    let myPlayerId = null; // Houdt de socket ID van de huidige speler bij
+    let myPlayerId = null; // Speler id: de socket ID waarmee we de lobby binnenkwamen (blijft gelijk na een resume)
+    let eliminationOdds = {}; // Kans op een 6 bij de volgende worp per speler id (met 'Toon kansen')
 
     // Houdt de alive status van spelers bij tussen updates
     let lastKnownPlayerStates = {};
 
+    // Maximaal aantal logregels dat de client bewaart (gelijk aan de buffer op de server)
+    const MAX_LOG_ENTRIES = 200;
+
+    // Na een 'lobby_redirect' komt de client op de worker van de lobby binnen met
+    // ?lobby=CODE&name=NAAM; de naam wordt dan automatisch ingesteld en de lobby gejoined.
+    // Met ?lobby=CODE&resume=TOKEN (een stoel op een andere worker) nemen we de stoel daar weer in.
+    const redirectParams = new URLSearchParams(window.location.search);
+    let pendingJoinCode = redirectParams.get('lobby');
+    const pendingPlayerName = redirectParams.get('name');
+    const pendingResumeToken = redirectParams.get('resume');
+    if (pendingJoinCode || pendingPlayerName || pendingResumeToken) {
+        window.history.replaceState(null, '', window.location.pathname);
+    }
+
+    // Met ?replay=NUMMER toont de pagina een gearchiveerd spel dat je stap voor stap doorloopt
+    const replayId = redirectParams.get('replay');
+    let replaySteps = []; // Per stapnummer: { action, state } (de state bevat de log tot en met die stap)
+    let replayStepCount = 0; // Aantal acties in het spel; stap n is de staat na n acties
+    let replayStep = 0;
+
     // --- Message Box Functie ---
     function showMessageBox(message) {
         messageText.textContent = message;
@@ -58,16 +88,106 @@ document.addEventListener('DOMContentLoaded', () => {
         messageBox.classList.add('hidden');
     });
 
+    // Onze stoel in een lobby ({ lobbyCode, playerId, resumeToken }), per tabblad bewaard zodat
+    // we na een verbroken verbinding of een herladen pagina dezelfde plaats terugkrijgen
+    const SEAT_STORAGE_KEY = 'liarsbarSeat';
+
+    function storedSeat() {
+        try {
+            return JSON.parse(sessionStorage.getItem(SEAT_STORAGE_KEY));
+        } catch (error) {
+            return null;
+        }
+    }
+
+    function storeSeat(data) {
+        if (data.resumeToken) {
+            sessionStorage.setItem(SEAT_STORAGE_KEY, JSON.stringify({
+                lobbyCode: data.lobbyCode, playerId: data.playerId, resumeToken: data.resumeToken
+            }));
+        }
+    }
+
+    if (pendingResumeToken) {
+        // sessionStorage hoort bij de worker (origin); neem de stoel mee naar deze worker
+        storeSeat({ lobbyCode: pendingJoinCode, playerId: null, resumeToken: pendingResumeToken });
+        pendingJoinCode = null;
+    }
+
     // --- Socket.IO Event Handlers ---
 
     socket.on('connect', () => {
         console.log('Verbonden met server!');
+        const seat = replayId ? null : storedSeat();
+        if (seat) {
+            // Terug naar onze stoel; met de revisie die we nog hebben krijgen we alleen wat we gemist hebben
+            const gameState = socket.currentGameState;
+            socket.emit('resume_session', {
+                resumeToken: seat.resumeToken,
+                revision: gameState ? gameState.revision : null,
+                logSeq: gameState ? gameState.logSeq : null
+            });
+            return;
+        }
         myPlayerId = socket.id; // Sla de eigen socket ID op
+        if (pendingPlayerName && !playerNameInput.disabled) {
+            playerNameInput.value = pendingPlayerName;
+            socket.emit('set_player_name', { name: pendingPlayerName });
+        }
     });
 
     socket.on('disconnect', () => {
         console.log('Verbinding verbroken met server.');
-        showMessageBox('Verbinding met de server verbroken. Probeer de pagina opnieuw te laden.');
+        if (storedSeat()) {
+            showMessageBox('Verbinding met de server verbroken. Opnieuw verbinden...');
+        } else {
+            showMessageBox('Verbinding met de server verbroken. Probeer de pagina opnieuw te laden.');
+        }
+    });
+
+    socket.on('session_resumed', (data) => {
+        console.log(`Teruggekeerd in lobby ${data.lobbyCode}.`);
+        myPlayerId = data.playerId;
+        currentLobbyCode = data.lobbyCode;
+        messageBox.classList.add('hidden');
+        nameStatus.classList.add('hidden');
+        playerNameInput.disabled = true;
+        setPlayerNameBtn.disabled = true;
+        lobbyControls.classList.remove('hidden');
+        currentLobbyCodeSpan.textContent = data.lobbyCode;
+        lobbyInfo.classList.remove('hidden');
+        createLobbyBtn.disabled = true;
+        joinLobbyBtn.disabled = true;
+        lobbyCodeInput.disabled = true;
+        startGameBtn.classList.toggle('hidden', !data.isHost || data.started);
+        addBotBtn.classList.toggle('hidden', !data.isHost || data.started);
+        playersInLobbyUl.innerHTML = '';
+        data.players.forEach(player_name => {
+            const li = document.createElement('li');
+            li.textContent = player_name;
+            playersInLobbyUl.appendChild(li);
+        });
+        if (data.started) {
+            lobbySection.classList.add('hidden');
+            gameSection.classList.remove('hidden');
+        }
+    });
+
+    socket.on('resume_failed', (data) => {
+        // De stoel is intussen vrijgegeven: begin opnieuw
+        sessionStorage.removeItem(SEAT_STORAGE_KEY);
+        myPlayerId = socket.id;
+        currentLobbyCode = null;
+        socket.currentGameState = null;
+        showMessageBox(`${data.message} Laad de pagina opnieuw om een nieuwe lobby te kiezen.`);
+    });
+
+    socket.on('lobby_closed', (data) => {
+        // De server heeft de lobby opgeruimd (te lang inactief, of de server is vol)
+        sessionStorage.removeItem(SEAT_STORAGE_KEY);
+        currentLobbyCode = null;
+        socket.currentGameState = null;
+        showMessageBox(`${data.message} Laad de pagina opnieuw om een nieuwe lobby te kiezen.`);
     });
 
     socket.on('name_set', (data) => {
@@ -76,6 +196,21 @@ document.addEventListener('DOMContentLoaded', () => {
         playerNameInput.disabled = true; // Naam kan niet meer gewijzigd worden
         setPlayerNameBtn.disabled = true;
         lobbyControls.classList.remove('hidden'); // Toon de lobby controls
+        if (pendingJoinCode) {
+            lobbyCodeInput.value = pendingJoinCode;
+            socket.emit('join_lobby', { lobbyCode: pendingJoinCode });
+            pendingJoinCode = null;
+        }
+    });
+
+    socket.on('lobby_redirect', (data) => {
+        // De lobby draait op een andere worker; ga daarheen en join daar opnieuw (of neem
+        // daar onze stoel weer in)
+        console.log(`Lobby ${data.lobbyCode} staat op ${data.url}, doorsturen...`);
+        const params = data.resumeToken
+            ? new URLSearchParams({ lobby: data.lobbyCode, resume: data.resumeToken })
+            : new URLSearchParams({ lobby: data.lobbyCode, name: data.name });
+        window.location.href = `${data.url}/?${params.toString()}`;
     });
 
     socket.on('error_message', (data) => {
@@ -84,23 +219,29 @@ document.addEventListener('DOMContentLoaded', () => {
 
     socket.on('lobby_created', (data) => {
         currentLobbyCode = data.lobbyCode;
+        myPlayerId = data.playerId;
+        storeSeat(data);
         currentLobbyCodeSpan.textContent = data.lobbyCode;
         lobbyInfo.classList.remove('hidden');
         createLobbyBtn.disabled = true;
         joinLobbyBtn.disabled = true;
         lobbyCodeInput.disabled = true;
         startGameBtn.classList.remove('hidden'); // Toon start game knop voor maker
+        addBotBtn.classList.remove('hidden'); // De maker kan lege plaatsen met bots vullen
         console.log(`Lobby ${data.lobbyCode} aangemaakt.`);
     });
 
     socket.on('lobby_joined', (data) => {
         currentLobbyCode = data.lobbyCode;
+        myPlayerId = data.playerId;
+        storeSeat(data);
         currentLobbyCodeSpan.textContent = data.lobbyCode;
         lobbyInfo.classList.remove('hidden');
         createLobbyBtn.disabled = true;
         joinLobbyBtn.disabled = true;
         lobbyCodeInput.disabled = true;
         startGameBtn.classList.add('hidden'); // Verberg start game knop voor joiner
+        addBotBtn.classList.add('hidden');
         console.log(`Lobby ${data.lobbyCode} gejoined.`);
     });
 
@@ -131,9 +272,61 @@ document.addEventListener('DOMContentLoaded', () => {
         lastKnownPlayerStates = {};
     });
 
-    socket.on('game_state_update', (gameState) => {
+    // De server kan GameState payloads als MessagePack versturen (WIRE_ENCODING 'msgpack').
+    // Deze komen binnen als binaire data; JSON payloads zijn al gewone objecten.
+    function decodeWirePayload(payload) {
+        if (payload instanceof ArrayBuffer || ArrayBuffer.isView(payload)) {
+            return MessagePack.decode(payload);
+        }
+        return payload;
+    }
+
+    socket.on('game_state_update', (payload) => {
+        // Volledige snapshot (bij start, herstart of na een resync)
+        const gameState = decodeWirePayload(payload);
         console.log('Game State Update:', gameState);
-        
+        const previousState = socket.currentGameState;
+        if (gameState.logBase !== undefined && previousState && previousState.logSeq === gameState.logBase) {
+            // De server stuurde alleen de logregels die we nog niet hadden
+            gameState.log = previousState.log.concat(gameState.log).slice(-MAX_LOG_ENTRIES);
+        }
+        renderGameState(gameState);
+    });
+
+    socket.on('game_state_patch', (payload) => {
+        // Alleen de gewijzigde velden sinds de vorige revisie
+        const patch = decodeWirePayload(payload);
+        const gameState = socket.currentGameState;
+        if (!gameState || gameState.revision !== patch.baseRevision) {
+            // We hebben een revisie gemist: vraag een volledige snapshot op
+            if (currentLobbyCode) {
+                socket.emit('request_game_state', {
+                    lobbyCode: currentLobbyCode,
+                    logSeq: gameState ? gameState.logSeq : null
+                });
+            }
+            return;
+        }
+        renderGameState(applyGameStatePatch(gameState, patch));
+    });
+
+    function applyGameStatePatch(gameState, patch) {
+        const newState = Object.assign({}, gameState, patch.set || {});
+        (patch.unset || []).forEach(key => delete newState[key]);
+        if (patch.players) {
+            newState.players = newState.players.map(player => patch.players[player.id] || player);
+        }
+        if (patch.logAppend) {
+            newState.log = newState.log.concat(patch.logAppend).slice(-MAX_LOG_ENTRIES);
+        }
+        newState.revision = patch.revision;
+        return newState;
+    }
+
+    function renderGameState(gameState) {
+        // Bewaar de actuele staat: patches worden hierop toegepast
+        socket.currentGameState = gameState;
+
         // Initialiseer lastKnownPlayerStates als het nog leeg is (eerste game_state_update)
         if (Object.keys(lastKnownPlayerStates).length === 0 && gameState.players.length > 0) {
             gameState.players.forEach(player => {
@@ -173,6 +366,44 @@ document.addEventListener('DOMContentLoaded', () => {
 
         // Render onthulde kaarten sectie
         renderRevealedCardsInfo(gameState);
+
+        // Vraag (als de speler dat wil) de kans op een leugen en op een 6 op
+        requestOdds(gameState);
+    }
+
+    function requestOdds(gameState) {
+        claimOddsP.classList.add('hidden'); // Tot het antwoord bij de huidige claim binnen is
+        if (!showOddsToggle.checked) {
+            eliminationOdds = {};
+            renderPlayerDiceStatus(gameState);
+            return;
+        }
+        if (currentLobbyCode && gameState.phase !== 'gameOver') {
+            socket.emit('request_odds', { lobbyCode: currentLobbyCode });
+        }
+    }
+
+    socket.on('odds_update', (data) => {
+        const gameState = socket.currentGameState;
+        if (!showOddsToggle.checked || !gameState || data.lobbyCode !== currentLobbyCode) {
+            return;
+        }
+        eliminationOdds = data.eliminationOdds || {};
+        renderPlayerDiceStatus(gameState);
+        // Negeer een kans bij een claim die intussen niet meer de laatste is
+        if (gameState.phase !== 'awaitingLiarCall' || !gameState.lastClaimDetails
+            || gameState.lastClaimDetails.player !== data.claimPlayer || gameState.pile.length !== data.pileSize
+            || data.lieProbability === null) {
+            return;
+        }
+        claimOddsP.textContent = `Kans dat de claim een leugen is: ${Math.round(data.lieProbability * 100)}%`;
+        claimOddsP.classList.remove('hidden');
+    });
+
+    showOddsToggle.addEventListener('change', () => {
+        if (socket.currentGameState) {
+            requestOdds(socket.currentGameState);
+        }
     });
 
     socket.on('chat_message', (data) => {
@@ -184,10 +415,12 @@ document.addEventListener('DOMContentLoaded', () => {
     });
 
     socket.on('game_over', (data) => {
+        const replayLink = data.replayId !== null && data.replayId !== undefined
+            ? ` Bekijk de replay via ${window.location.origin}/?replay=${data.replayId}` : '';
         if (data.winner && data.winner !== 'geen') {
-            showMessageBox(`Spel afgelopen! De winnaar is: ${data.winner}!`);
+            showMessageBox(`Spel afgelopen! De winnaar is: ${data.winner}!${replayLink}`);
         } else {
-            showMessageBox('Spel afgelopen! Geen winnaar (mogelijk alle spelers uitgeschakeld).');
+            showMessageBox(`Spel afgelopen! Geen winnaar (mogelijk alle spelers uitgeschakeld).${replayLink}`);
         }
         // Uitschakelen van actieknoppen
         makePlayBtn.disabled = true;
@@ -245,6 +478,13 @@ document.addEventListener('DOMContentLoaded', () => {
                     playerStatusDiv.appendChild(diceAttemptsSpan);
             }
 
+            if (player.connected === false) {
+                const connectionSpan = document.createElement('span');
+                connectionSpan.classList.add('ml-2', 'text-sm', 'text-yellow-400');
+                connectionSpan.textContent = '(verbinding verbroken)';
+                playerStatusDiv.appendChild(connectionSpan);
+            }
+
             // Toon "Jij" label voor de huidige speler
             if (player.id === myPlayerId) {
                 const youSpan = document.createElement('span');
@@ -286,6 +526,13 @@ document.addEventListener('DOMContentLoaded', () => {
                 diceNumbersDiv.appendChild(diceFaceSpan);
             }
             playerDiceDiv.appendChild(diceNumbersDiv);
+
+            if (eliminationOdds[player.id] !== undefined) {
+                const oddsSpan = document.createElement('span');
+                oddsSpan.classList.add('ml-2', 'text-sm', 'text-indigo-300');
+                oddsSpan.textContent = `Kans op een 6: ${Math.round(eliminationOdds[player.id] * 100)}%`;
+                playerDiceDiv.appendChild(oddsSpan);
+            }
             playerDiceStatusContainer.appendChild(playerDiceDiv);
         });
     }
@@ -550,6 +797,76 @@ document.addEventListener('DOMContentLoaded', () => {
     }
 
 
+    // --- Replay Viewer ---
+
+    const REPLAY_ACTION_LABELS = {
+        make_play: 'legt kaarten',
+        call_liar: "roept 'LIAR!'",
+        believe_claim: 'gelooft de claim',
+        roll_dice: 'werpt de dobbelsteen',
+        leave: 'verlaat het spel'
+    };
+
+    async function loadReplayPage(start) {
+        // Haalt een reeks stappen vanaf 'start' op en bouwt per stap de volledige log op
+        const response = await fetch(`/replay/${encodeURIComponent(replayId)}?start=${start}`);
+        if (!response.ok) {
+            throw new Error(`Replay ${replayId} niet gevonden.`);
+        }
+        const page = await response.json();
+        replayStepCount = page.actionCount;
+        let log = page.log;
+        page.steps.forEach((step, index) => {
+            log = log.concat(step.logAppend).slice(-MAX_LOG_ENTRIES);
+            step.state.log = log;
+            replaySteps[page.start + index] = step;
+        });
+    }
+
+    async function showReplayStep(stepNumber) {
+        if (stepNumber < 0 || stepNumber > replayStepCount) {
+            return;
+        }
+        if (!replaySteps[stepNumber]) {
+            // Bij terugstappen de voorgaande reeks ophalen, anders de reeks vanaf deze stap
+            const start = stepNumber < replayStep ? Math.max(stepNumber - 49, 0) : stepNumber;
+            await loadReplayPage(start);
+        }
+        replayStep = stepNumber;
+        const step = replaySteps[stepNumber];
+        // Toon de hand van de speler die aan de beurt is
+        myPlayerId = step.state.currentTurn;
+        renderGameState(step.state);
+
+        replayStepInfo.textContent = `Stap ${stepNumber} van ${replayStepCount}`;
+        if (step.action) {
+            const action = step.action;
+            const cards = action.cards ? `: ${action.cards.join(', ')}` : '';
+            replayActionText.textContent = `${action.playerName || 'Onbekende speler'} ${REPLAY_ACTION_LABELS[action.action] || action.action}${cards}`;
+        } else {
+            replayActionText.textContent = 'Begin van het spel';
+        }
+        replayPrevBtn.disabled = stepNumber === 0;
+        replayNextBtn.disabled = stepNumber === replayStepCount;
+    }
+
+    function startReplay() {
+        lobbySection.classList.add('hidden');
+        gameSection.classList.remove('hidden');
+        gameActionsDiv.classList.add('hidden'); // Geen acties en chat in een replay
+        chatInput.parentElement.classList.add('hidden');
+        replayControls.classList.remove('hidden');
+        replayPrevBtn.addEventListener('click', () => showReplayStep(replayStep - 1));
+        replayNextBtn.addEventListener('click', () => showReplayStep(replayStep + 1));
+        loadReplayPage(0)
+            .then(() => showReplayStep(0))
+            .catch(error => showMessageBox(error.message));
+    }
+
+    if (replayId !== null) {
+        startReplay();
+    }
+
     // --- Event Listeners voor Knoppen en Input ---
 
     setPlayerNameBtn.addEventListener('click', () => {
@@ -584,6 +901,12 @@ document.addEventListener('DOMContentLoaded', () => {
         }
     });
 
+    addBotBtn.addEventListener('click', () => {
+        if (currentLobbyCode) {
+            socket.emit('add_bot', { lobbyCode: currentLobbyCode });
+        }
+    });
+
     makePlayBtn.addEventListener('click', () => {
         if (selectedCards.length === 0) {
             showMessageBox('Selecteer minimaal 1 kaart om te leggen.');
@@ -0,0 +1,33 @@
+import random
+
+from game_logic import apply_action, create_new_game
+from simulation import Policy, choose_action
+
+
+def _game_awaiting_play(seed=1):
+    """Spel met drie spelers waarin de eerste in de beurtvolgorde kaarten moet leggen."""
+    game_state = create_new_game('TEST', [('a', 'A'), ('b', 'B'), ('c', 'C')], seed=seed)
+    game_state.phase = 'awaitingPlay'
+    game_state.current_turn = game_state.turn_ring[0]
+    return game_state
+
+
+def test_choose_action_with_empty_hand_returns_none():
+    game_state = _game_awaiting_play()
+    player = game_state.player_index[game_state.current_turn]
+    player.hand = []
+    assert choose_action(game_state, Policy(random.Random(1))) is None
+
+
+def test_leave_skips_players_without_cards():
+    game_state = _game_awaiting_play()
+    leaver_id, empty_id, next_id = game_state.turn_ring
+    game_state.player_index[empty_id].hand = []
+
+    success, _ = apply_action(game_state, 'leave', leaver_id)
+
+    assert success
+    assert game_state.phase == 'awaitingPlay'
+    assert game_state.current_turn == next_id
+    action = choose_action(game_state, Policy(random.Random(1)))
+    assert action is not None and action[0] == 'make_play'
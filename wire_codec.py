@@ -0,0 +1,155 @@
+import json
+
+from server_log import log_to_stderr
+
+# --- Codering van GameState payloads ---
+# Het grootste deel van een GameState payload is voor alle spelers gelijk. In plaats van
+# Flask-SocketIO per speler een complete dict te laten encoderen, wordt het gedeelde deel
+# één keer gecodeerd (per veld) en per speler alleen het eigen deel erbij geplakt.
+#
+# Ondersteunde coderingen (app.config['WIRE_ENCODING']):
+#   'json'    - standaard json module (geen extra dependencies)
+#   'orjson'  - snellere JSON encoder, als het 'orjson' package geïnstalleerd is
+#   'msgpack' - MessagePack als binaire payload, als het 'msgpack' package geïnstalleerd is.
+#               De frontend herkent binaire payloads en decodeert ze met msgpack.
+
+try:
+    import orjson
+except ImportError: # Optionele dependency
+    orjson = None
+
+try:
+    import msgpack
+except ImportError: # Optionele dependency
+    msgpack = None
+
+WIRE_ENCODINGS = ('json', 'orjson', 'msgpack')
+DEFAULT_WIRE_ENCODING = 'json'
+
+_codecs = {}
+
+
+class EncodedJson:
+    """Een al gecodeerde JSON payload, die packet_json ongewijzigd in het Socket.IO packet plakt."""
+
+    __slots__ = ('text',)
+
+    def __init__(self, text):
+        self.text = text
+
+
+class JsonCodec:
+    """Codeert payloads als JSON tekst met de standaard json module."""
+
+    name = 'json'
+
+    def _dumps(self, value):
+        return json.dumps(value, separators=(',', ':'))
+
+    def encode(self, payload):
+        """Codeert een complete payload."""
+        return EncodedJson(self._dumps(payload))
+
+    def encode_fields(self, fields):
+        """Codeert de velden van een gedeeld deel los, zodat ze per ontvanger hergebruikt kunnen worden."""
+        return {key: self._dumps(key) + ':' + self._dumps(value) for key, value in fields.items()}
+
+    def splice(self, encoded_fields, viewer_fields):
+        """
+        Plakt de gecodeerde gedeelde velden en de velden van één ontvanger samen tot een payload.
+        Velden in 'viewer_fields' vervangen het gedeelde veld met dezelfde naam.
+        """
+        parts = [fragment for key, fragment in encoded_fields.items() if key not in viewer_fields]
+        parts.extend(self._dumps(key) + ':' + self._dumps(value) for key, value in viewer_fields.items())
+        return EncodedJson('{' + ','.join(parts) + '}')
+
+
+class OrjsonCodec(JsonCodec):
+    """Codeert payloads als JSON tekst met orjson."""
+
+    name = 'orjson'
+
+    def _dumps(self, value):
+        return orjson.dumps(value).decode('utf-8')
+
+
+class MsgpackCodec:
+    """Codeert payloads als MessagePack. Socket.IO verstuurt deze als binaire bijlage."""
+
+    name = 'msgpack'
+
+    def encode(self, payload):
+        return msgpack.packb(payload)
+
+    def encode_fields(self, fields):
+        return {key: msgpack.packb(key) + msgpack.packb(value) for key, value in fields.items()}
+
+    def splice(self, encoded_fields, viewer_fields):
+        parts = [fragment for key, fragment in encoded_fields.items() if key not in viewer_fields]
+        parts.extend(msgpack.packb(key) + msgpack.packb(value) for key, value in viewer_fields.items())
+        return _msgpack_map_header(len(parts)) + b''.join(parts)
+
+
+def _msgpack_map_header(size):
+    """Retourneert de MessagePack header van een map met 'size' key/value paren."""
+    if size < 16:
+        return bytes((0x80 | size,))
+    if size < 0x10000:
+        return b'\xde' + size.to_bytes(2, 'big')
+    return b'\xdf' + size.to_bytes(4, 'big')
+
+
+def encoded_size(payload):
+    """
+    Grootte van een gecodeerde payload: bytes voor MessagePack, tekens voor JSON (gelijk aan
+    bytes zolang de tekst ASCII is). Zonder codec (een dict) 0.
+    """
+    if isinstance(payload, EncodedJson):
+        return len(payload.text)
+    if isinstance(payload, (bytes, bytearray)):
+        return len(payload)
+    return 0
+
+
+def get_wire_codec(encoding=DEFAULT_WIRE_ENCODING, log=log_to_stderr):
+    """
+    Retourneert de codec voor een codering uit WIRE_ENCODINGS.
+    Als het benodigde package niet geïnstalleerd is, wordt teruggevallen op 'json' (met een
+    waarschuwing via log, zie ServerLog.log; één keer per codering).
+    """
+    if encoding not in WIRE_ENCODINGS:
+        raise ValueError(f"Onbekende WIRE_ENCODING '{encoding}', kies uit {', '.join(WIRE_ENCODINGS)}.")
+    codec = _codecs.get(encoding)
+    if codec is None:
+        if encoding == 'orjson' and orjson is None:
+            log('warning', 'wire_encoding_unavailable', encoding=encoding, error="orjson is niet geïnstalleerd, JSON wordt gebruikt.")
+            codec = get_wire_codec('json')
+        elif encoding == 'msgpack' and msgpack is None:
+            log('warning', 'wire_encoding_unavailable', encoding=encoding, error="msgpack is niet geïnstalleerd, JSON wordt gebruikt.")
+            codec = get_wire_codec('json')
+        else:
+            codec = {'json': JsonCodec, 'orjson': OrjsonCodec, 'msgpack': MsgpackCodec}[encoding]()
+        _codecs[encoding] = codec
+    return codec
+
+
+class _PacketJson:
+    """
+    JSON module voor Socket.IO packets (SocketIO(json=packet_json)). Gedraagt zich als de
+    standaard json module, maar plakt EncodedJson argumenten ongewijzigd in het packet.
+    """
+
+    @staticmethod
+    def dumps(obj, *args, **kwargs):
+        if isinstance(obj, list) and any(isinstance(item, EncodedJson) for item in obj):
+            return '[' + ','.join(
+                item.text if isinstance(item, EncodedJson) else json.dumps(item, *args, **kwargs)
+                for item in obj
+            ) + ']'
+        return json.dumps(obj, *args, **kwargs)
+
+    @staticmethod
+    def loads(s, *args, **kwargs):
+        return json.loads(s, *args, **kwargs)
+
+packet_json = _PacketJson()